@@ -3,7 +3,7 @@ from django.contrib import admin
 from .models import (
     BaseCategorys, Category, Brand, BaseColor, Color, Size,
     CategoryAttribute, ProductAttribute, Product, ProductPackage,
-    Gallery, Comment
+    Gallery, Comment, ImageJob, StockReservation, StockReservationItem
 )
 
 class BaseCategorysAdmin(admin.ModelAdmin):
@@ -33,4 +33,6 @@ admin.site.register(Gallery)
 admin.site.register(Comment)
 admin.site.register(CategoryAttribute)
 admin.site.register(ProductAttribute)
-
+admin.site.register(ImageJob)
+admin.site.register(StockReservation)
+admin.site.register(StockReservationItem)
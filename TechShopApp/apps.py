@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class TechshopappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'TechShopApp'
+
+    def ready(self):
+        # ثبت signal ها
+        from . import signals  # noqa: F401
+        # زمان serializer ها برای Server-Timing و /metrics
+        from .metrics import install
+        install()
+        # خطای اتصال replica ها آنها را از pool خارج می‌کند
+        from . import replicas
+        replicas.install()
@@ -0,0 +1,191 @@
+"""
+Async read path of the catalog for ASGI deployments (main/asgi.py).
+
+    GET /store/async/products/            GET /store/async/products/{id}/
+    GET /store/async/categories/          GET /store/async/categories/{id}/
+    GET /store/async/brands/              GET /store/async/brands/{id}/
+    GET /store/async/product-packages/    GET /store/async/product-packages/{id}/
+
+The responses are the same as the ViewSet routes without the `async/` prefix:
+the views reuse the ViewSet's get_queryset(), serializers, ?fields= /
+?expand= handling and keyset pagination. Only the database access differs:
+the page is read with aiterator(), a detail object with aget(), and the
+relations the serializer walks are loaded with aprefetch_related_objects().
+Serializers then run on fully loaded objects. A relation the prefetches do
+not cover (a nested ?expand=) raises SynchronousOnlyOperation in the event
+loop; that response is serialized again in a sync_to_async thread.
+
+Django's async ORM still runs each query in its sync_to_async database
+thread, so at most ASYNC_READ_CONCURRENCY requests (default 32) of a worker
+are inside a view at once; the others wait on a semaphore instead of piling
+up on the database. JSON only (no orjson / msgpack negotiation) and no
+taxonomy response cache.
+
+Settings:
+- ASYNC_READ_CONCURRENCY (default 32)
+"""
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db.models import Prefetch, aprefetch_related_objects
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from . import counters
+from .models import Category, CategoryAttribute, ProductAttribute
+from .views import BrandViewSet, CategoryViewSet, ProductPackageViewSet, ProductViewSet
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def limiter():
+    """
+    The semaphore of the running event loop (asyncio primitives belong to one loop).
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(getattr(settings, 'ASYNC_READ_CONCURRENCY', 32))
+    return semaphore
+
+
+async def serialize(serializer):
+    try:
+        return serializer.data
+    except SynchronousOnlyOperation:
+        return await sync_to_async(lambda: serializer.data)()
+
+
+def split_prefetches(queryset):
+    """
+    (queryset without prefetch_related, its lookups) for aprefetch_related_objects().
+    """
+    return queryset.prefetch_related(None), list(queryset._prefetch_related_lookups)
+
+
+class AsyncReadView(View):
+    """
+    list / retrieve of `viewset_class`, async. `prefetch` adds the lookups its
+    serializers need that the sync ViewSet leaves to lazy loading.
+    """
+    viewset_class = None
+    prefetch = {'list': (), 'retrieve': ()}
+    http_method_names = ['get']
+
+    def get_viewset(self, request, action, pk=None):
+        viewset = self.viewset_class(
+            request=request, action=action, format_kwarg=None, args=(), kwargs={'pk': pk} if pk else {},
+        )
+        viewset.headers = {}
+        return viewset
+
+    async def get_base_queryset(self, viewset):
+        return viewset.get_queryset()
+
+    async def get(self, request, pk=None):
+        request = Request(request)
+        action = 'retrieve' if pk is not None else 'list'
+        viewset = self.get_viewset(request, action, pk)
+        try:
+            async with limiter():
+                queryset = (await self.get_base_queryset(viewset)).prefetch_related(*self.prefetch[action])
+                queryset = viewset.filter_queryset(queryset)
+                if pk is None:
+                    data = await self.list(viewset, queryset)
+                else:
+                    data = await self.retrieve(viewset, queryset, pk)
+        except (APIException, Http404) as exc:
+            response = exception_handler(exc, {'view': viewset, 'request': request})
+            return self.render(response.data, response.status_code)
+        return self.render(data)
+
+    async def list(self, viewset, queryset):
+        queryset, lookups = split_prefetches(queryset)
+        paginator = viewset.paginator
+        rows = await paginator.apaginate_queryset(queryset, viewset.request, view=viewset)
+        await aprefetch_related_objects(rows, *lookups)
+        data = await serialize(viewset.get_serializer(rows, many=True))
+        return paginator.get_paginated_response(data).data
+
+    async def retrieve(self, viewset, queryset, pk):
+        queryset, lookups = split_prefetches(queryset)
+        try:
+            instance = await queryset.aget(pk=pk)
+        except (queryset.model.DoesNotExist, ValueError):
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+        await aprefetch_related_objects([instance], *lookups)
+        return await serialize(viewset.get_serializer(instance))
+
+    def render(self, data, status=200):
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def ordered(queryset):
+    return queryset.order_by('id')
+
+
+class AsyncProductView(AsyncReadView):
+    viewset_class = ProductViewSet
+
+    async def get_base_queryset(self, viewset):
+        # فیلتر دسته بندی زیر درخت را با یک کوئری پیدا می‌کند (ProductFilter)
+        if viewset.action == 'list' and 'category' in viewset.request.query_params:
+            return await sync_to_async(viewset.get_queryset)()
+        return viewset.get_queryset()
+
+    async def list(self, viewset, queryset):
+        data = await super().list(viewset, queryset)
+        if viewset.request.query_params.get('facets', '1').lower() not in ('0', 'false', 'no'):
+            data['facets'] = await sync_to_async(viewset.product_filter.facets)()
+        return data
+
+    async def retrieve(self, viewset, queryset, pk):
+        data = await super().retrieve(viewset, queryset, pk)
+        for package in data.get('product_packages', ()):
+            if 'id' in package:
+                counters.increment(package['id'], 'views_count')
+        return data
+
+
+class AsyncCategoryView(AsyncReadView):
+    viewset_class = CategoryViewSet
+    prefetch = {
+        'list': (
+            Prefetch('categoryattribute_set', queryset=ordered(CategoryAttribute.objects)),
+            Prefetch('attributes', queryset=ordered(CategoryAttribute.objects)),
+        ),
+        'retrieve': (
+            Prefetch('subcategories', queryset=ordered(Category.objects)),
+            Prefetch('subcategories__categoryattribute_set', queryset=ordered(CategoryAttribute.objects)),
+            Prefetch('subcategories__attributes', queryset=ordered(CategoryAttribute.objects)),
+            Prefetch('categoryattribute_set', queryset=ordered(CategoryAttribute.objects)),
+            Prefetch('attributes', queryset=ordered(CategoryAttribute.objects)),
+        ),
+    }
+
+
+class AsyncBrandView(AsyncReadView):
+    viewset_class = BrandViewSet
+    prefetch = {
+        'list': (Prefetch('category', queryset=ordered(Category.objects)),),
+        'retrieve': (Prefetch('category', queryset=ordered(Category.objects)),),
+    }
+
+
+PACKAGE_PREFETCH = (
+    'product',
+    Prefetch('product__categories', queryset=ordered(Category.objects)),
+    Prefetch('product__attributes', queryset=ordered(ProductAttribute.objects.select_related('attribute'))),
+)
+
+
+class AsyncProductPackageView(AsyncReadView):
+    viewset_class = ProductPackageViewSet
+    prefetch = {'list': PACKAGE_PREFETCH, 'retrieve': PACKAGE_PREFETCH}
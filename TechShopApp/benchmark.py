@@ -0,0 +1,300 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks never touch the configured database: they run inside a throw-away
+test database created the same way `manage.py test` does.
+"""
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import OperationalError, connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.serializers import BaseSerializer
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """
+    Create an empty, migrated test database for the duration of the block.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+@contextmanager
+def scratch_counters():
+    """
+    Buffer view / sale counters in a temporary journal for the block and flush
+    them before it ends, so nothing is left for the scratch database after it
+    is destroyed (or for the real one).
+    """
+    from . import counters
+
+    with tempfile.TemporaryDirectory() as directory:
+        buffer = counters.CounterBuffer(directory=directory, interval=0)
+        previous, counters._buffer = counters._buffer, buffer
+        try:
+            yield buffer
+            buffer.flush()
+        finally:
+            counters._buffer = previous
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Sum the time spent in `serializer.data` and in compiled fast_serializers
+    plans (outermost calls only, so nested serializers are not counted twice).
+    Yields a list with the seconds so far.
+    """
+    from .fast_serializers import Plan
+
+    spent = [0.0]
+    depth = threading.local()
+    original = BaseSerializer.data
+    original_serialize = Plan.serialize
+
+    def timing(func):
+        def timed(*args, **kwargs):
+            level = getattr(depth, 'level', 0)
+            depth.level = level + 1
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                depth.level = level
+                if not level:
+                    spent[0] += time.perf_counter() - started
+        return timed
+
+    BaseSerializer.data = property(timing(original.fget))
+    Plan.serialize = timing(original_serialize)
+    try:
+        yield spent
+    finally:
+        BaseSerializer.data = original
+        Plan.serialize = original_serialize
+
+
+def measure(func, repeat=5, before=None):
+    """
+    Run `func` `repeat` times and return latency (ms), serialization time and
+    query statistics. `before` runs ahead of every repeat, outside the numbers.
+    """
+    timings = []
+    query_counts = []
+    db_times = []
+    serialize_times = []
+
+    def timed_query(execute, sql, params, many, context):
+        # زمان captured_queries فقط سه رقم اعشار ثانیه دارد؛ اینجا دقیق اندازه گیری می‌شود
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            db_time[0] += time.perf_counter() - started
+
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        reset_queries()
+        db_time = [0.0]
+        with CaptureQueriesContext(connection) as queries, serializer_timer() as serialized, \
+                connection.execute_wrapper(timed_query):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+        db_times.append(db_time[0] * 1000)
+        serialize_times.append(serialized[0] * 1000)
+        status_code = getattr(result, 'status_code', 200)
+        if status_code >= 400:
+            raise RuntimeError(f"benchmarked request failed with HTTP {status_code}")
+    return {
+        'queries': max(query_counts),
+        'db_ms': round(statistics.median(db_times), 3),
+        'serialize_ms': round(statistics.median(serialize_times), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+    }
+
+
+def serializer_throughput(serializer_class, queryset, rows=500, repeat=5):
+    """
+    Rows per second of `serializer_class(many=True).data` against the compiled
+    fast_serializers plan over the first `rows` rows of `queryset` (queries
+    included on both sides; the queryset carries the view's prefetches).
+    """
+    from rest_framework.renderers import JSONRenderer
+
+    from .fast_serializers import compile_serializer
+
+    plan = compile_serializer(serializer_class)
+    if plan is None:
+        raise ValueError(f"{serializer_class.__name__} cannot be compiled")
+    ids = list(queryset.order_by('id').values_list('id', flat=True)[:rows])
+    page = queryset.filter(id__in=ids).order_by('id')
+
+    def drf():
+        return serializer_class(page.all(), many=True).data
+
+    def fast():
+        return plan.serialize_queryset(page.all())
+
+    stats = {'rows': len(ids), 'identical': JSONRenderer().render(drf()) == JSONRenderer().render(fast())}
+    for name, func in (('drf', drf), ('fast', fast)):
+        timings = []
+        for _ in range(repeat):
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+        seconds = statistics.median(timings)
+        stats[name] = {
+            'queries': len(queries),
+            'ms': round(seconds * 1000, 3),
+            'rows_per_second': round(len(ids) / seconds, 1) if seconds else 0.0,
+        }
+    stats['speedup'] = round(stats['fast']['rows_per_second'] / stats['drf']['rows_per_second'], 2) \
+        if stats['drf']['rows_per_second'] else 0.0
+    return stats
+
+
+def reservation_stress(package_ids, threads=8, attempts=200, seed=1):
+    """
+    Hammer inventory.reserve() from `threads` threads, each making `attempts`
+    single-unit reservations on random packages, and return throughput stats.
+
+    Lock errors (sqlite serialises writers; MySQL may time out a lock wait) are
+    retried and counted, they are not part of the reserve() contract.
+    """
+    from .inventory import InsufficientStock, reserve
+
+    results = {'reserved': 0, 'rejected': 0, 'retries': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local = {'reserved': 0, 'rejected': 0, 'retries': 0}
+        barrier.wait()
+        try:
+            for _ in range(attempts):
+                package_id = rng.choice(package_ids)
+                while True:
+                    try:
+                        reserve([(package_id, 1)])
+                        local['reserved'] += 1
+                    except InsufficientStock:
+                        local['rejected'] += 1
+                    except OperationalError:
+                        local['retries'] += 1
+                        continue
+                    break
+        finally:
+            connection.close()
+            with lock:
+                for key, value in local.items():
+                    results[key] += value
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    seconds = time.perf_counter() - started
+    results['seconds'] = round(seconds, 3)
+    results['reservations_per_second'] = round(results['reserved'] / seconds, 1) if seconds else 0.0
+    return results
+
+
+def load_stats(latencies, seconds, errors):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+    }
+
+
+def wsgi_load(paths, concurrency=16, requests=400):
+    """
+    `requests` GETs spread round-robin over `paths`, sent by `concurrency`
+    threads through Django's WSGI handler (one test Client per thread).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.test import Client
+
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(index):
+        client = Client()
+        local = []
+        try:
+            for number in range(index, requests, concurrency):
+                started = time.perf_counter()
+                response = client.get(paths[number % len(paths)])
+                local.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    with lock:
+                        errors[0] += 1
+        finally:
+            connection.close()
+            with lock:
+                latencies.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return load_stats(latencies, time.perf_counter() - started, errors[0])
+
+
+def asgi_load(paths, concurrency=16, requests=400):
+    """
+    The same load as wsgi_load() as `concurrency` coroutines on one event loop
+    through Django's ASGI handler (async middleware and views).
+    """
+    import asyncio
+
+    from django.test import AsyncClient
+
+    latencies, errors = [], [0]
+
+    async def worker(index):
+        client = AsyncClient()
+        for number in range(index, requests, concurrency):
+            started = time.perf_counter()
+            response = await client.get(paths[number % len(paths)])
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors[0] += 1
+
+    async def run():
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    return load_stats(latencies, time.perf_counter() - started, errors[0])
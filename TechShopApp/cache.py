@@ -0,0 +1,134 @@
+"""
+Server-side response cache for the taxonomy endpoints
+(/base-categories/, /categories/, /brands/, /colors/, /base-colors/, /sizes/).
+
+Cached list/retrieve responses are keyed by the absolute URL (path + query
+params) and by the current *version* of every model the endpoint depends on.
+Signals bump a model's version when one of its rows or M2M links changes, so
+exactly the endpoints that show that model miss on the next request; nothing
+relies on a TTL.
+
+The storage is any Django cache alias (TAXONOMY_CACHE_ALIAS in settings):
+LocMemCache for a single process, FileBasedCache when several workers on
+one host must share entries, versions and counters.
+
+Misses are built from the primary database even on replica reads (see
+replicas.py): the entries never expire, so rows from a lagging replica
+would stay cached under the new version.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .replicas import primary_reads
+
+CACHE_ALIAS = getattr(settings, 'TAXONOMY_CACHE_ALIAS', 'default')
+KEY_PREFIX = 'taxonomy'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def version_key(model):
+    return f'{KEY_PREFIX}:version:{model._meta.label_lower}'
+
+
+def counter_key(namespace, kind):
+    return f'{KEY_PREFIX}:stats:{namespace}:{kind}'
+
+
+def current_versions(models):
+    """
+    Version token of each model; a missing token (never set or evicted) gets a
+    fresh one so an old entry can never match again.
+    """
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    get_cache().set(version_key(model), time.time_ns(), None)
+
+
+def invalidate(model):
+    """
+    Invalidate every cached response that depends on `model`. The version is
+    bumped now and again after commit, so a request running between the write
+    and the commit cannot keep the old rows cached.
+    """
+    bump_version(model)
+    transaction.on_commit(lambda: bump_version(model))
+
+
+def count(namespace, kind):
+    cache = get_cache()
+    key = counter_key(namespace, kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_stats(namespaces):
+    cache = get_cache()
+    keys = {(ns, kind): counter_key(ns, kind) for ns in namespaces for kind in ('hits', 'misses')}
+    values = cache.get_many(keys.values())
+    return {
+        ns: {kind: values.get(keys[(ns, kind)], 0) for kind in ('hits', 'misses')}
+        for ns in namespaces
+    }
+
+
+class CachedResponseMixin:
+    """
+    Cache GET list/retrieve responses of a ViewSet.
+
+    cache_namespace     name used in keys and hit/miss counters
+    cache_dependencies  models whose changes must invalidate the responses
+    """
+    cache_namespace = None
+    cache_dependencies = ()
+
+    def get_cache_key(self, request):
+        versions = current_versions(self.cache_dependencies)
+        raw = '|'.join([request.build_absolute_uri(), *map(str, versions)])
+        return f'{KEY_PREFIX}:response:{self.cache_namespace}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def cached(self, request, build):
+        if request.method != 'GET':
+            return build()
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            count(self.cache_namespace, 'hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        count(self.cache_namespace, 'misses')
+        # پاسخ بدون TTL ذخیره می‌شود؛ replica عقب مانده نباید ردیف های قدیمی را زیر نسخه جدید بگذارد
+        with primary_reads():
+            response = build()
+        if response.status_code == 200:
+            cache.set(key, response.data, None)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
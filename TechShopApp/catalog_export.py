@@ -0,0 +1,129 @@
+"""
+Streaming catalog export (the format read back by catalog_import).
+
+One row per package, with its product's columns repeated; products without
+packages get one row without package columns. Products are read in id order
+in keyset chunks (`id > last_id LIMIT n`), and every chunk loads its packages,
+category links and attribute values with one query each, so memory depends on
+the chunk size only. (QuerySet.iterator() would not be enough on MySQL: the
+driver buffers the whole result set on the client.)
+
+export_rows() yields plain dicts; jsonl_lines() / csv_lines() turn them into
+text chunks for StreamingHttpResponse or a file. Everything is generated
+lazily, so the first bytes leave after the first chunk, not after the dump.
+"""
+import csv
+import io
+import json
+
+from .models import CategoryAttribute, Product, ProductAttribute, ProductPackage
+
+FORMATS = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+PRODUCT_COLUMNS = ['product_id', 'name', 'description', 'is_active', 'brand', 'categories']
+PACKAGE_COLUMNS = [
+    'package_id', 'price', 'final_price', 'discount', 'is_active_discount', 'quantity', 'weight',
+    'is_active_package', 'color', 'size', 'storage', 'sold_count', 'views_count',
+]
+
+
+def size_label(size):
+    if size is None:
+        return None
+    return size.size or (str(size.number_size) if size.number_size is not None else size.size_numrical)
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """
+    Yield one dict per package (or per product without packages).
+    """
+    queryset = (queryset if queryset is not None else Product.objects.all()).select_related('brand').order_by('id')
+    last_id = 0
+    while True:
+        products = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not products:
+            return
+        last_id = products[-1].id
+        ids = [product.id for product in products]
+
+        packages = {}
+        for package in ProductPackage.objects.filter(product_id__in=ids).select_related('color', 'size').order_by('id'):
+            packages.setdefault(package.product_id, []).append(package)
+        categories = {}
+        through = Product.categories.through.objects.filter(product_id__in=ids)
+        for product_id, name in through.order_by('category_id').values_list('product_id', 'category__name'):
+            categories.setdefault(product_id, []).append(name)
+        attributes = {}
+        values = ProductAttribute.objects.filter(product_id__in=ids).order_by('id')
+        for product_id, title, value in values.values_list('product_id', 'attribute__title', 'value'):
+            attributes.setdefault(product_id, {})[title] = value
+
+        for product in products:
+            base = {
+                'product_id': product.id,
+                'name': product.name,
+                'description': product.description,
+                'is_active': product.is_active,
+                'brand': product.brand.name if product.brand else None,
+                'categories': categories.get(product.id, []),
+                'attributes': attributes.get(product.id, {}),
+            }
+            for package in packages.get(product.id) or [None]:
+                if package is None:
+                    yield base
+                    continue
+                yield {
+                    **base,
+                    'package_id': package.id,
+                    'price': package.price,
+                    'final_price': package.final_price,
+                    'discount': package.discount,
+                    'is_active_discount': package.is_active_discount,
+                    'quantity': package.quantity,
+                    'weight': package.weight,
+                    'is_active_package': package.is_active_package,
+                    'color': package.color.name if package.color else None,
+                    'size': size_label(package.size),
+                    'storage': package.storage,
+                    'sold_count': package.sold_count,
+                    'views_count': package.views_count,
+                }
+
+
+def batched(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def jsonl_lines(rows, rows_per_chunk=500):
+    for chunk in batched(rows, rows_per_chunk):
+        yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk)
+
+
+def csv_lines(rows, rows_per_chunk=500):
+    # ستون های ویژگی از جدول کوچک CategoryAttribute خوانده می‌شوند تا header قبل از داده ها ثابت باشد
+    titles = sorted(set(CategoryAttribute.objects.values_list('title', flat=True)))
+    columns = PRODUCT_COLUMNS + PACKAGE_COLUMNS + [f'attr:{title}' for title in titles]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    for chunk in batched(rows, rows_per_chunk):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in chunk:
+            row = dict(row, categories='|'.join(row['categories']))
+            for title, value in row.pop('attributes').items():
+                row[f'attr:{title}'] = value
+            writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def export_lines(fmt, queryset=None, chunk_size=2000):
+    rows = export_rows(queryset, chunk_size=chunk_size)
+    return jsonl_lines(rows) if fmt == 'jsonl' else csv_lines(rows)
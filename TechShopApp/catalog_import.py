@@ -0,0 +1,347 @@
+"""
+Streaming bulk import of products, packages and attribute values.
+
+The input is read one row at a time (CSV or JSON lines) and written in batches,
+so memory depends on the batch size and not on the file size. One row is one
+package of a product; the product columns are repeated on each of its rows:
+
+    name*          product name (the upsert key of Product)
+    description, is_active, brand (name or en_name)
+    categories     names or en_names; list in JSONL, "a|b" in CSV
+    attributes     {title: value} in JSONL, one "attr:<title>" column per title in CSV
+    price          package columns; a row without price only upserts the product
+    discount, is_active_discount, quantity, weight, is_active_package
+    color (name), size (size, number or size_numrical), storage (e.g. "256")
+
+Taxonomy references are resolved through lookup maps loaded once, never with
+a query per row. Products are matched by name and packages by
+(product, color, size, storage); matches are bulk_update()d, the rest
+bulk_create()d. Signals do not run for bulk writes, so final_price is computed
+here and each batch refreshes its ProductSummary rows and search index.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Brand, Category, CategoryAttribute, Color, Product, ProductAttribute, ProductPackage, Size
+)
+from .search import index_products
+from .summary import refresh_product_summaries, sync_package_ratings
+
+PACKAGE_FIELDS = ('price', 'discount', 'is_active_discount', 'quantity', 'weight', 'is_active_package')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on', 'بله'}
+MAX_REPORTED_ERRORS = 100
+NAME_LENGTH = Product._meta.get_field('name').max_length
+ATTRIBUTE_VALUE_LENGTH = ProductAttribute._meta.get_field('value').max_length
+
+
+class RowError(Exception):
+    pass
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    products_created: int = 0
+    products_updated: int = 0
+    packages_created: int = 0
+    packages_updated: int = 0
+    attributes: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # فقط MAX_REPORTED_ERRORS خطای اول
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds, 1) if self.seconds else 0.0
+
+
+# _______________________________________ reading _______________________________________
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row dict) from a CSV or JSON lines text stream.
+    """
+    if fmt == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as exc:
+                    yield number, RowError(f"invalid JSON: {exc}")
+        return
+    reader = csv.DictReader(stream)
+    for number, row in enumerate(reader, start=2):
+        attributes = {key[5:]: value for key, value in row.items() if key and key.startswith('attr:') and value}
+        row = {key: value for key, value in row.items() if key and not key.startswith('attr:') and value != ''}
+        if 'categories' in row:
+            row['categories'] = [name for name in row['categories'].split('|') if name]
+        if attributes:
+            row['attributes'] = attributes
+        yield number, row
+
+
+def to_bool(value):
+    return value if isinstance(value, bool) else str(value).strip().lower() in TRUE_VALUES
+
+
+def to_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} must be an integer, got {value!r}")
+
+
+def attribute_value(title, value):
+    value = str(value)
+    if len(value) > ATTRIBUTE_VALUE_LENGTH:
+        raise RowError(f"attribute {title!r} is longer than {ATTRIBUTE_VALUE_LENGTH} characters")
+    return value
+
+
+# _______________________________________ lookups _______________________________________
+
+class Lookups:
+    """
+    In-memory maps from the names used in import files to taxonomy ids.
+    """
+
+    def __init__(self):
+        self.categories = {}
+        for pk, name, en_name in Category.objects.values_list('id', 'name', 'en_name'):
+            self.categories[name.casefold()] = pk
+            self.categories.setdefault(en_name.casefold(), pk)
+        self.brands = {}
+        for pk, name, en_name in Brand.objects.values_list('id', 'name', 'en_name'):
+            self.brands[name.casefold()] = pk
+            self.brands[en_name.casefold()] = pk
+        self.colors = {name.casefold(): pk for pk, name in Color.objects.values_list('id', 'name')}
+        self.sizes = {}
+        for pk, size, number, text in Size.objects.values_list('id', 'size', 'number_size', 'size_numrical'):
+            for key in (size, number, text):
+                if key not in (None, ''):
+                    self.sizes.setdefault(str(key).casefold(), pk)
+        self.attributes = {
+            (category_id, title.casefold()): pk
+            for pk, category_id, title in CategoryAttribute.objects.values_list('id', 'category_id', 'title')
+        }
+        self.storages = {code for code, _ in ProductPackage.STORAGE_CHOICES}
+
+    def resolve(self, mapping, value, label):
+        if value in (None, ''):
+            return None
+        try:
+            return mapping[str(value).strip().casefold()]
+        except KeyError:
+            raise RowError(f"unknown {label} {value!r}")
+
+    def attribute(self, category_ids, title):
+        for category_id in category_ids:
+            pk = self.attributes.get((category_id, title.strip().casefold()))
+            if pk:
+                return pk
+        raise RowError(f"attribute {title!r} is not defined for the product's categories")
+
+
+# _______________________________________ parsing _______________________________________
+
+def parse_row(row, lookups):
+    """
+    Validate one row and turn it into plain values with resolved ids.
+    """
+    if isinstance(row, RowError):
+        raise row
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise RowError("name is required")
+    if len(name) > NAME_LENGTH:
+        raise RowError(f"name is longer than {NAME_LENGTH} characters")
+    product = {}
+    if 'description' in row:
+        product['description'] = str(row['description'])
+    if 'is_active' in row:
+        product['is_active'] = to_bool(row['is_active'])
+    if 'brand' in row:
+        product['brand_id'] = lookups.resolve(lookups.brands, row['brand'], 'brand')
+    categories = [lookups.resolve(lookups.categories, value, 'category') for value in row.get('categories') or ()]
+    attributes = {
+        lookups.attribute(categories, title): attribute_value(title, value)
+        for title, value in (row.get('attributes') or {}).items()
+    }
+
+    package = None
+    if row.get('price') not in (None, ''):
+        storage = row.get('storage') or None
+        if storage is not None and str(storage) not in lookups.storages:
+            raise RowError(f"unknown storage {storage!r}")
+        package = {
+            'price': to_int(row['price'], 'price'),
+            'discount': to_int(row.get('discount') or 0, 'discount'),
+            'is_active_discount': to_bool(row.get('is_active_discount', False)),
+            'quantity': to_int(row.get('quantity') or 0, 'quantity'),
+            'weight': to_int(row.get('weight') or 0, 'weight'),
+            'is_active_package': to_bool(row.get('is_active_package', True)),
+            'color_id': lookups.resolve(lookups.colors, row.get('color'), 'color'),
+            'size_id': lookups.resolve(lookups.sizes, row.get('size'), 'size'),
+            'storage': str(storage) if storage is not None else None,
+        }
+        if package['price'] < 0 or package['quantity'] < 0 or package['weight'] < 0:
+            raise RowError("price, quantity and weight must not be negative")
+        if not 0 <= package['discount'] <= 99:
+            raise RowError("discount must be between 0 and 99")
+    return name, product, categories, attributes, package
+
+
+def package_key(product_id, color_id, size_id, storage):
+    return (product_id, color_id, size_id, storage)
+
+
+# _______________________________________ writing _______________________________________
+
+def write_batch(parsed, stats):
+    """
+    Upsert one batch of parsed rows in a single transaction.
+    """
+    products, categories, attributes, packages = {}, {}, {}, {}
+    for name, product, category_ids, attribute_values, package in parsed:
+        products.setdefault(name, {}).update(product)
+        categories.setdefault(name, set()).update(category_ids)
+        attributes.setdefault(name, {}).update(attribute_values)
+        if package:
+            packages[(name, package['color_id'], package['size_id'], package['storage'])] = package
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {p.name: p for p in Product.objects.filter(name__in=list(products))}
+        created, updated, changed_fields = [], [], set()
+        for name, values in products.items():
+            instance = existing.get(name)
+            if instance is None:
+                created.append(Product(name=name, **values))
+                continue
+            for key, value in values.items():
+                setattr(instance, key, value)
+            changed_fields.update(values)
+            instance.updated_date = now
+            updated.append(instance)
+        Product.objects.bulk_create(created)
+        if updated:
+            Product.objects.bulk_update(updated, sorted(changed_fields | {'updated_date'}))
+        stats.products_created += len(created)
+        stats.products_updated += len(updated)
+        product_ids = {
+            name: pk for pk, name in Product.objects.filter(name__in=list(products)).values_list('id', 'name')
+        }
+
+        through = Product.categories.through
+        through.objects.bulk_create(
+            [
+                through(product_id=product_ids[name], category_id=category_id)
+                for name, category_ids in categories.items() for category_id in category_ids
+            ],
+            ignore_conflicts=True,
+        )
+
+        write_packages(packages, product_ids, stats)
+        write_attributes(attributes, product_ids, stats)
+
+        ids = list(product_ids.values())
+        refresh_product_summaries(ids)
+        sync_package_ratings(ids)
+        index_products(ids)
+
+
+def write_packages(packages, product_ids, stats):
+    existing = {}
+    for package in ProductPackage.objects.filter(product_id__in=list(product_ids.values())).order_by('id'):
+        existing.setdefault(package_key(package.product_id, package.color_id, package.size_id, package.storage), package)
+
+    created, updated = [], []
+    for (name, *rest), values in packages.items():
+        product_id = product_ids[name]
+        final_price = ProductPackage.calculate_final_price(
+            values['price'], values['discount'], values['is_active_discount'],
+        )
+        instance = existing.get(package_key(product_id, *rest))
+        if instance is None:
+            created.append(ProductPackage(product_id=product_id, final_price=final_price, **values))
+            continue
+        for key in PACKAGE_FIELDS:
+            setattr(instance, key, values[key])
+        instance.final_price = final_price
+        updated.append(instance)
+    ProductPackage.objects.bulk_create(created)
+    ProductPackage.objects.bulk_update(updated, [*PACKAGE_FIELDS, 'final_price'])
+    stats.packages_created += len(created)
+    stats.packages_updated += len(updated)
+
+
+def write_attributes(attributes, product_ids, stats):
+    wanted = {
+        (product_ids[name], attribute_id): value
+        for name, values in attributes.items() for attribute_id, value in values.items()
+    }
+    if not wanted:
+        return
+    existing = {
+        (value.product_id, value.attribute_id): value
+        for value in ProductAttribute.objects.filter(product_id__in={pid for pid, _ in wanted})
+    }
+    created, updated = [], []
+    for (product_id, attribute_id), value in wanted.items():
+        instance = existing.get((product_id, attribute_id))
+        if instance is None:
+            created.append(ProductAttribute(product_id=product_id, attribute_id=attribute_id, value=value))
+        elif instance.value != value:
+            instance.value = value
+            updated.append(instance)
+    # بدون RETURNING (MySQL) شناسه ردیف های جدید برگردانده نمی‌شود، پس دوباره خوانده می‌شوند
+    ProductAttribute.objects.bulk_create(created)
+    ProductAttribute.objects.bulk_update(updated, ['value'])
+    through = Product.attributes.through
+    through.objects.bulk_create(
+        [
+            through(product_id=product_id, productattribute_id=pk)
+            for pk, product_id, attribute_id in ProductAttribute.objects.filter(
+                product_id__in={pid for pid, _ in wanted},
+            ).values_list('id', 'product_id', 'attribute_id')
+            if (product_id, attribute_id) in wanted
+        ],
+        ignore_conflicts=True,
+    )
+    stats.attributes += len(wanted)
+
+
+def import_catalog(stream, fmt, batch_size=1000, on_batch=None):
+    """
+    Import every row of `stream`. Invalid rows are skipped and counted (the
+    first ones are kept in stats.errors as (line, message)); valid rows are
+    written batch by batch.
+    """
+    stats = ImportStats()
+    lookups = Lookups()
+    started = time.perf_counter()
+    batch = []
+    for number, row in read_rows(stream, fmt):
+        stats.rows += 1
+        try:
+            batch.append(parse_row(row, lookups))
+        except RowError as exc:
+            stats.error_count += 1
+            if len(stats.errors) < MAX_REPORTED_ERRORS:
+                stats.errors.append((number, str(exc)))
+        if len(batch) >= batch_size:
+            write_batch(batch, stats)
+            batch = []
+            stats.seconds = time.perf_counter() - started
+            if on_batch:
+                on_batch(stats)
+    if batch:
+        write_batch(batch, stats)
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -0,0 +1,79 @@
+"""
+Helpers around the materialized category tree (Category.tree_path / depth).
+"""
+from .cache import invalidate
+from .models import Category
+
+
+def compute_tree_paths(rows):
+    """
+    Compute {id: (tree_path, depth)} from (id, parent_id) pairs.
+
+    Returns (paths, problems); categories caught in a parent cycle or pointing
+    to a missing parent are reported in `problems` and left out of `paths`.
+    """
+    parents = dict(rows)
+    paths = {}
+    problems = []
+    for pk in parents:
+        chain = []
+        current = pk
+        seen = set()
+        while current is not None and current not in paths:
+            if current in seen:
+                problems.append(f"category {pk}: parent cycle through {current}")
+                break
+            if current not in parents:
+                problems.append(f"category {chain[-1]}: missing parent {current}")
+                break
+            seen.add(current)
+            chain.append(current)
+            current = parents[current]
+        else:
+            prefix = paths[current][0] if current is not None else ''
+            for node in reversed(chain):
+                prefix = f"{prefix}{node}/"
+                paths[node] = (prefix, prefix.count('/') - 1)
+    return paths, problems
+
+
+def check_category_tree():
+    """
+    Compare the stored paths with the ones derived from Category.parent.
+    Returns (expected_paths, problems, stale_ids).
+    """
+    stored = {pk: (path, depth) for pk, path, depth in Category.objects.values_list('id', 'tree_path', 'depth')}
+    expected, problems = compute_tree_paths(Category.objects.values_list('id', 'parent_id'))
+    stale = [pk for pk, value in expected.items() if stored.get(pk) != value]
+    return expected, problems, stale
+
+
+def rebuild_category_tree(batch_size=1000):
+    """
+    Rewrite every stale path. Returns (rewritten_count, problems).
+    """
+    expected, problems, stale = check_category_tree()
+    categories = []
+    for pk in stale:
+        path, depth = expected[pk]
+        categories.append(Category(pk=pk, tree_path=path, depth=depth))
+    Category.objects.bulk_update(categories, ['tree_path', 'depth'], batch_size=batch_size)
+    if categories:
+        # bulk_update سیگنال ندارد و CategorySerializer مسیر و عمق را برمی‌گرداند
+        invalidate(Category)
+    return len(categories), problems
+
+
+def build_tree(rows):
+    """
+    Nest flat category dicts (ordered by tree_path so parents come first)
+    into a list of root nodes with `children`.
+    """
+    nodes = {}
+    roots = []
+    for row in rows:
+        node = dict(row, children=[])
+        nodes[node['id']] = node
+        parent = nodes.get(node['parent'])
+        (parent['children'] if parent else roots).append(node)
+    return roots
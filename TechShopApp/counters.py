@@ -0,0 +1,253 @@
+"""
+Write-behind counters for ProductPackage.views_count and sold_count.
+
+increment() only adds the delta to an in-process buffer and appends one line
+to a per-process journal file; no row is locked and ProductPackage.save()
+(and its final_price calculation) never runs. A background thread flushes
+the buffer every COUNTER_FLUSH_INTERVAL seconds:
+
+1. the buffer is swapped out and the journal renamed to `<batch>.pending`;
+2. one transaction records the batch id in CounterFlush and applies all
+   deltas as `UPDATE ... SET views_count = views_count + CASE id ... END`;
+3. the pending file is removed.
+
+If the process dies before step 2 commits, the journal / pending file is still
+on disk and recover() (run before every flush and by `manage.py
+flush_counters`) applies it. If it dies after the commit, the batch id is
+already in CounterFlush and the file is skipped, so every increment is
+applied exactly once.
+
+Settings:
+- COUNTER_FLUSH_INTERVAL (default 5): seconds between flushes, 0 disables the thread
+- COUNTER_JOURNAL_DIR (default BASE_DIR/.counters)
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import CounterFlush, ProductPackage
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('views_count', 'sold_count')
+UPDATE_CHUNK = 500
+
+
+def journal_dir():
+    return str(getattr(settings, 'COUNTER_JOURNAL_DIR', settings.BASE_DIR / '.counters'))
+
+
+def read_journal(path):
+    """
+    Sum the deltas of a journal file. A torn last line (crash mid-write) is skipped.
+    """
+    deltas = Counter()
+    with open(path, encoding='ascii', errors='ignore') as journal:
+        for line in journal:
+            parts = line.split()
+            if len(parts) == 3 and parts[1] in FIELDS and line.endswith('\n'):
+                try:
+                    deltas[(int(parts[0]), parts[1])] += int(parts[2])
+                except ValueError:
+                    continue
+    return deltas
+
+
+def apply_deltas(batch_id, deltas):
+    """
+    Apply a batch once. Returns False when the batch was already applied.
+    """
+    with transaction.atomic():
+        _, created = CounterFlush.objects.get_or_create(batch_id=batch_id, defaults={'rows': len(deltas)})
+        if not created:
+            return False
+        by_package = {}
+        for (pk, field), amount in deltas.items():
+            if amount:
+                by_package.setdefault(pk, {})[field] = amount
+        ids = sorted(by_package)  # ترتیب ثابت قفل ردیف ها برای جلوگیری از deadlock
+        for start in range(0, len(ids), UPDATE_CHUNK):
+            chunk = ids[start:start + UPDATE_CHUNK]
+            updates = {}
+            for field in FIELDS:
+                whens = [When(pk=pk, then=Value(by_package[pk][field])) for pk in chunk if field in by_package[pk]]
+                if whens:
+                    updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+            ProductPackage.objects.filter(pk__in=chunk).update(**updates)
+    return True
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover(directory=None):
+    """
+    Apply every journal left behind by a dead process and every pending batch.
+    Returns the number of files applied.
+    """
+    directory = directory or journal_dir()
+    if not os.path.isdir(directory):
+        return 0
+    applied = 0
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        try:
+            if name.startswith('journal-') and name.endswith('.log'):
+                pid = int(name.split('-')[1])
+                if pid == os.getpid() or process_alive(pid):
+                    continue
+                pending = path[:-len('.log')] + '.pending'
+                os.replace(path, pending)
+                path, name = pending, os.path.basename(pending)
+            if not name.endswith('.pending'):
+                continue
+            apply_deltas(name[:-len('.pending')], read_journal(path))
+            os.remove(path)
+        except FileNotFoundError:
+            continue  # یک process دیگر همزمان همین فایل را اعمال کرده است
+        applied += 1
+    return applied
+
+
+class CounterBuffer:
+    def __init__(self, directory=None, interval=None):
+        self.directory = directory or journal_dir()
+        self.interval = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 5) if interval is None else interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.deltas = Counter()
+        self.unapplied = {}  # فایل pending -> deltas؛ چرخانده شده ولی هنوز commit نشده
+        self.journal = None
+        self.journal_path = None
+        self.sequence = 0
+        self.thread = None
+        self.stopped = threading.Event()
+
+    # _______________________________________ writes _______________________________________
+
+    def increment(self, package_id, field, amount=1):
+        if field not in FIELDS:
+            raise ValueError(f"unknown counter {field!r}")
+        with self.lock:
+            self.deltas[(package_id, field)] += amount
+            journal = self.open_journal()
+            journal.write(f"{package_id} {field} {amount}\n")
+            journal.flush()
+        self.start()
+
+    def open_journal(self):
+        if self.journal is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.sequence += 1
+            self.journal_path = os.path.join(
+                self.directory, f"journal-{os.getpid()}-{time.time_ns()}-{self.sequence}.log",
+            )
+            self.journal = open(self.journal_path, 'a', encoding='ascii')
+        return self.journal
+
+    # _______________________________________ reads _______________________________________
+
+    def pending(self, package_id, field):
+        key = (package_id, field)
+        with self.lock:
+            return self.deltas[key] + sum(batch[key] for batch in self.unapplied.values())
+
+    def get_counts(self, package_ids):
+        """
+        {package_id: {'views_count': n, 'sold_count': n}} including unflushed deltas.
+        """
+        rows = ProductPackage.objects.filter(pk__in=package_ids).values_list('pk', *FIELDS)
+        return {
+            pk: {field: value + self.pending(pk, field) for field, value in zip(FIELDS, values)}
+            for pk, *values in rows
+        }
+
+    # _______________________________________ flushing _______________________________________
+
+    def flush(self):
+        """
+        Apply the buffered deltas (and anything left over on disk). Returns the
+        number of package counters written.
+        """
+        with self.flush_lock:
+            with self.lock:
+                batch, self.deltas = self.deltas, Counter()
+                if self.journal is not None:
+                    self.journal.close()
+                    pending_path = self.journal_path[:-len('.log')] + '.pending'
+                    os.replace(self.journal_path, pending_path)
+                    self.unapplied[pending_path] = batch
+                    self.journal = self.journal_path = None
+            try:
+                # فایل های pending (از جمله همین batch) به ترتیب اعمال می‌شوند
+                recover(self.directory)
+            finally:
+                with self.lock:
+                    self.unapplied = {
+                        path: deltas for path, deltas in self.unapplied.items() if os.path.exists(path)
+                    }
+            return len(batch)
+
+    def start(self):
+        if self.interval <= 0 or (self.thread is not None and self.thread.is_alive()):
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='counter-flush', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                # فایل pending روی دیسک می‌ماند و در flush بعدی دوباره اعمال می‌شود
+                logger.exception("counter flush failed")
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("final counter flush failed")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = CounterBuffer()
+            atexit.register(_buffer.stop)
+        return _buffer
+
+
+def increment(package_id, field, amount=1):
+    get_buffer().increment(package_id, field, amount)
+
+
+def get_counts(package_ids):
+    return get_buffer().get_counts(package_ids)
+
+
+def pending(package_id, field):
+    return get_buffer().pending(package_id, field) if _buffer is not None else 0
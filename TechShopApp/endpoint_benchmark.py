@@ -0,0 +1,228 @@
+"""
+Per-endpoint benchmark of every GET route the API router registers.
+
+endpoint_routes() walks TechShopApp.urls.router, so a new ViewSet or @action is
+benchmarked without touching this file. run_endpoint_benchmark() requests each
+route against the current database (normally a seeded scratch database, see
+`manage.py benchmark_endpoints`) as an admin user and records, per route:
+
+    queries       SQL queries of the slowest (cold) run
+    db_ms         median time spent in SQL
+    serialize_ms  median time spent in serializer.data (includes the lazy
+                  queries run while serializing)
+    p50_ms/p95_ms request latency
+
+Detail routes use the busiest object (the product with the most comments,
+the review with the most replies, ...) so per-row queries show up. Results
+are plain JSON; compare_results() checks them against a saved baseline: more
+queries on any route is a failure (an N+1 always adds queries), slower
+latency beyond the tolerance is a warning.
+
+run_renderer_benchmark() encodes the response data of the same routes with
+each renderer (JSON, orjson, MessagePack) and records the encode time and
+payload size, see `manage.py benchmark_renderers`.
+"""
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .benchmark import measure, scratch_counters
+from .cache import get_cache
+from .models import Category, Comment, Product, ProductPackage, StockReservation
+
+# مسیرهایی که اندازه گیری نمی‌شوند و دلیلش
+SKIPPED = {
+    'product-export': "streams the whole catalog; measured by export_catalog",
+}
+
+
+def busiest_product():
+    row = Comment.objects.order_by().values('product').annotate(total=Count('id')).order_by('-total', 'product').first()
+    return Product.objects.get(pk=row['product']) if row else Product.objects.order_by('id').first()
+
+
+def sample_objects():
+    """
+    {basename: object} used for the detail routes; other ViewSets use their first row.
+    """
+    product = busiest_product()
+    review = (
+        Comment.objects.filter(product=product, parent=None, is_approved=True)
+        .annotate(total=Count('thread_replies')).order_by('-total', 'id').first()
+    )
+    return {
+        'product': product,
+        'category': Category.objects.filter(parent=None).annotate(total=Count('product')).order_by('-total', 'id').first(),
+        'productpackage': ProductPackage.objects.filter(product=product).order_by('id').first(),
+        'comment': Comment.objects.filter(product=product).order_by('id').first(),
+        'review': review,
+        'stockreservation': StockReservation.objects.order_by('id').first(),
+    }
+
+
+def query_strings(product):
+    """
+    Extra query parameters of some routes, by route name.
+    """
+    word = product.name.split()[-1]
+    return {
+        'product-search': {'q': word},
+        'review-list': {'product_id': product.pk},
+        'comment-list': {'product_id': product.pk},
+        'productpackage-list': {'product_id': product.pk},
+        'gallery-list': {'product_id': product.pk},
+    }
+
+
+def endpoint_routes(router=None):
+    """
+    (route name, viewset, basename, detail) of every GET route of the router.
+    """
+    if router is None:
+        from .urls import router
+    routes = []
+    for _, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            # mapping اکشن ها MethodMapper است و .get آن decorator است، نه dict.get
+            handler = dict(route.mapping).get('get')
+            if handler and hasattr(viewset, handler):
+                routes.append((route.name.format(basename=basename), viewset, basename, route.detail))
+    return routes
+
+
+def benchmark_user():
+    user, _ = User.objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True, 'is_superuser': True},
+    )
+    return user
+
+
+def ensure_reservation(user, product):
+    if StockReservation.objects.exists():
+        return
+    from .inventory import InsufficientStock, reserve
+    package = ProductPackage.objects.filter(product=product, quantity__gt=0).first() \
+        or ProductPackage.objects.filter(quantity__gt=0).first()
+    if package:
+        try:
+            reserve([(package.id, 1)], user=user)
+        except InsufficientStock:
+            pass
+
+
+def benchmark_client():
+    """
+    (client, samples, params): an admin APIClient and the objects / query
+    strings of the detail and filtered routes.
+    """
+    user = benchmark_user()
+    product = busiest_product()
+    ensure_reservation(user, product)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, sample_objects(), query_strings(product)
+
+
+def run_endpoint_benchmark(repeat=10):
+    """
+    {route name: statistics} of every GET route (see the module docstring).
+    Routes without a sample object are reported with `skipped`.
+    """
+    client, samples, params = benchmark_client()
+    results = {}
+    with scratch_counters():
+        for name, viewset, basename, detail in endpoint_routes():
+            results[name] = benchmark_route(client, name, viewset, basename, detail, samples, params, repeat)
+    return results
+
+
+def route_url(name, viewset, basename, detail, samples):
+    """
+    (url, None) of a route, or (None, reason) when it is not benchmarked.
+    """
+    if name in SKIPPED:
+        return None, SKIPPED[name]
+    kwargs = {}
+    if detail:
+        sample = samples.get(basename)
+        if sample is None and viewset.queryset is not None:
+            sample = viewset.queryset.model.objects.order_by('id').first()
+        if sample is None:
+            return None, "no sample object"
+        kwargs['pk'] = sample.pk
+    return reverse(name, kwargs=kwargs), None
+
+
+def benchmark_route(client, name, viewset, basename, detail, samples, params, repeat):
+    url, skipped = route_url(name, viewset, basename, detail, samples)
+    if url is None:
+        return {'skipped': skipped}
+
+    def request():
+        return client.get(url, params.get(name, {}))
+
+    # کش پاسخ ها قبل از هر تکرار خالی می‌شود تا کوئری، serializer و latency ساخت پاسخ اندازه گیری شود نه hit
+    return {'path': url, **measure(request, repeat=repeat, before=get_cache().clear)}
+
+
+def run_renderer_benchmark(renderers, repeat=20):
+    """
+    {route name: {renderer name: {'bytes': n, 'encode_ms': median}}} for the
+    response data of every GET route, encoded by each of `renderers`
+    ({name: renderer class}; unavailable ones are left out).
+    """
+    client, samples, params = benchmark_client()
+    renderers = {key: cls() for key, cls in renderers.items() if getattr(cls, 'available', True)}
+    results = {}
+    with scratch_counters():
+        for name, viewset, basename, detail in endpoint_routes():
+            url, skipped = route_url(name, viewset, basename, detail, samples)
+            if url is None:
+                results[name] = {'skipped': skipped}
+                continue
+            response = client.get(url, params.get(name, {}))
+            if response.status_code >= 400 or not hasattr(response, 'data'):
+                results[name] = {'skipped': f"HTTP {response.status_code}"}
+                continue
+            context = {'request': response.wsgi_request, 'response': response}
+            results[name] = {
+                key: encode_stats(renderer, response.data, context, repeat) for key, renderer in renderers.items()
+            }
+    return results
+
+
+def encode_stats(renderer, data, context, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = renderer.render(data, renderer.media_type, context)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'bytes': len(body), 'encode_ms': round(statistics.median(timings), 3)}
+
+
+def compare_results(current, baseline, latency_tolerance=0.5, latency_floor_ms=2.0):
+    """
+    Compare two {route: statistics} maps. Returns (failures, warnings):
+    failures when a route runs more queries than in the baseline, warnings when
+    its p95 grew by more than `latency_tolerance` (0.5 = 50%) and `latency_floor_ms`.
+    """
+    failures, warnings = [], []
+    for name, old in baseline.items():
+        new = current.get(name)
+        if new is None:
+            warnings.append(f"{name}: missing from this run")
+            continue
+        if 'queries' not in old or 'queries' not in new:
+            continue
+        if new['queries'] > old['queries']:
+            failures.append(f"{name}: {old['queries']} -> {new['queries']} queries")
+        limit = old['p95_ms'] * (1 + latency_tolerance)
+        if new['p95_ms'] > limit and new['p95_ms'] - old['p95_ms'] > latency_floor_ms:
+            warnings.append(f"{name}: p95 {old['p95_ms']} -> {new['p95_ms']} ms")
+    for name in current.keys() - baseline.keys():
+        warnings.append(f"{name}: new route, not in the baseline")
+    return failures, warnings
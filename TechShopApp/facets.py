@@ -0,0 +1,189 @@
+"""
+Faceted filtering for the product list.
+
+ProductFilter turns the query params into one condition per dimension. The
+product page is filtered on every dimension, while the counts of a dimension
+are computed with every filter *except* its own (disjunctive faceting), so a
+client can still see how many products the other brands or colors would give.
+
+Every facet is a single grouped query, so a response costs a fixed number of
+queries whatever the catalog size:
+
+    GET /store/products/?category=3&brand=1,2&base_color=4&storage=256&min_price=100000&in_stock=1
+"""
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Category, Product, ProductPackage
+
+# بازه های قیمت برای facet قیمت: (از، تا) - تا None یعنی بدون سقف
+PRICE_RANGES = getattr(settings, 'PRODUCT_FACET_PRICE_RANGES', [
+    (0, 1_000_000),
+    (1_000_000, 5_000_000),
+    (5_000_000, 20_000_000),
+    (20_000_000, 50_000_000),
+    (50_000_000, None),
+])
+
+# ابعادی که روی بسته ها (ProductPackage) فیلتر می‌شوند
+PACKAGE_DIMENSIONS = {
+    'base_color': 'color__base_color_id',
+    'size': 'size_id',
+    'storage': 'storage',
+}
+
+
+def category_descendants(category_ids):
+    """
+    Return the ids of the given categories plus all of their descendants,
+    matched on the materialized Category.tree_path.
+    """
+    paths = Category.objects.filter(id__in=category_ids).values_list('tree_path', flat=True)
+    subtree = Q(id__in=category_ids)
+    for path in paths:
+        if path:
+            subtree |= Q(tree_path__startswith=path)
+    return set(Category.objects.filter(subtree).values_list('id', flat=True))
+
+
+class ProductFilter:
+    """
+    Parsed catalog filters of one request.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.conditions = {}          # dimension -> condition on Product
+        self.package_conditions = {}  # dimension -> Q on ProductPackage
+
+        categories = self.id_list('category')
+        if categories:
+            # Exists به جای join تا محصول تکراری برنگردد و distinct لازم نباشد
+            self.conditions['category'] = Exists(Product.categories.through.objects.filter(
+                product_id=OuterRef('pk'), category_id__in=category_descendants(categories),
+            ))
+        brands = self.id_list('brand')
+        if brands:
+            self.conditions['brand'] = Q(brand_id__in=brands)
+        for dimension, lookup in PACKAGE_DIMENSIONS.items():
+            values = self.values(dimension) if dimension == 'storage' else self.id_list(dimension)
+            if values:
+                self.package_conditions[dimension] = Q(**{f'{lookup}__in': values})
+
+        price = Q()
+        min_price, max_price = self.number('min_price'), self.number('max_price')
+        if min_price is not None:
+            price &= Q(summary__min_final_price__gte=min_price)
+        if max_price is not None:
+            price &= Q(summary__min_final_price__lte=max_price)
+        if price:
+            self.conditions['price'] = price
+        if params.get('in_stock', '').lower() in ('1', 'true', 'yes'):
+            self.conditions['in_stock'] = Q(summary__in_stock=True)
+        min_rating = self.number('min_rating', float)
+        if min_rating is not None:
+            self.conditions['rating'] = Q(summary__rating_avg__gte=min_rating)
+
+    # _______________________________________ parsing _______________________________________
+
+    def values(self, name):
+        raw = self.params.get(name, '')
+        return [value for value in raw.split(',') if value]
+
+    def id_list(self, name):
+        try:
+            return [int(value) for value in self.values(name)]
+        except ValueError:
+            raise ValidationError({name: 'Enter a comma separated list of ids.'})
+
+    def number(self, name, cast=int):
+        value = self.params.get(name)
+        if not value:
+            return None
+        try:
+            return cast(value)
+        except ValueError:
+            raise ValidationError({name: 'Enter a number.'})
+
+    # _______________________________________ filtering _______________________________________
+
+    def package_exists(self, exclude=None):
+        conditions = [q for dimension, q in self.package_conditions.items() if dimension != exclude]
+        if not conditions:
+            return None
+        # همه شرط ها باید روی یک بسته برقرار باشند (مثلا رنگ قرمز با حافظه 256)
+        return Exists(ProductPackage.objects.filter(
+            *conditions, product_id=OuterRef('pk'), is_active_package=True,
+        ))
+
+    def apply(self, queryset, exclude=None):
+        """
+        Filter `queryset` on every dimension except `exclude`.
+        """
+        for dimension, condition in self.conditions.items():
+            if dimension != exclude:
+                queryset = queryset.filter(condition)
+        exists = self.package_exists(exclude)
+        if exists is not None:
+            queryset = queryset.filter(exists)
+        return queryset
+
+    # _______________________________________ facets _______________________________________
+
+    def product_ids(self, exclude):
+        return self.apply(Product.objects.all(), exclude=exclude).values('pk')
+
+    def facets(self):
+        return {
+            'category': self.category_facet(),
+            'brand': self.brand_facet(),
+            'base_color': self.package_facet('base_color'),
+            'size': self.package_facet('size'),
+            'storage': self.package_facet('storage'),
+            'price': self.price_facet(),
+            'in_stock': self.stock_facet(),
+        }
+
+    def category_facet(self):
+        through = Product.categories.through
+        rows = (
+            through.objects.filter(product_id__in=self.product_ids('category'))
+            .values('category_id').annotate(count=Count('product_id', distinct=True)).order_by()
+        )
+        return {row['category_id']: row['count'] for row in rows}
+
+    def brand_facet(self):
+        rows = (
+            self.product_ids('brand').exclude(brand_id=None).values('brand_id')
+            .annotate(count=Count('pk', distinct=True)).order_by()
+        )
+        return {row['brand_id']: row['count'] for row in rows}
+
+    def package_facet(self, dimension):
+        lookup = PACKAGE_DIMENSIONS[dimension]
+        packages = ProductPackage.objects.filter(
+            product_id__in=self.product_ids(dimension), is_active_package=True,
+        ).exclude(**{lookup: None})
+        # بقیه شرط های بسته باید روی همان بسته برقرار باشند
+        for other, condition in self.package_conditions.items():
+            if other != dimension:
+                packages = packages.filter(condition)
+        rows = packages.values(lookup).annotate(count=Count('product_id', distinct=True)).order_by()
+        return {row[lookup]: row['count'] for row in rows}
+
+    def price_facet(self):
+        buckets = {}
+        for low, high in PRICE_RANGES:
+            condition = Q(summary__min_final_price__gte=low)
+            if high is not None:
+                condition &= Q(summary__min_final_price__lt=high)
+            key = f"{low}-{high if high is not None else ''}"
+            buckets[key] = Count('pk', filter=condition, distinct=True)
+        return Product.objects.filter(pk__in=self.product_ids('price')).aggregate(**buckets)
+
+    def stock_facet(self):
+        return Product.objects.filter(pk__in=self.product_ids('in_stock')).aggregate(
+            in_stock=Count('pk', filter=Q(summary__in_stock=True)),
+            out_of_stock=Count('pk', filter=Q(summary__in_stock=False) | Q(summary__isnull=True)),
+        )
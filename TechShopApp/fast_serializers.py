@@ -0,0 +1,357 @@
+"""
+Fast read-only serialization for list actions.
+
+A ModelSerializer turns every row into a model instance and walks its fields
+one by one, resolving relations through prefetched managers. For a page of
+list rows that bookkeeping costs more than the SQL. compile_serializer()
+reads the serializer's fields once and builds a Plan that produces the same
+output from plain `values()` rows:
+
+    model fields           the column itself (DateTime / Choice through the
+                           DRF field, image fields through storage.url())
+    FK primary keys        the `<fk>_id` column
+    dotted sources         a join column (attribute.title -> attribute__title)
+    M2M primary keys       one query on the through table per page
+    nested serializers     flat one-to-one: join columns in the main query;
+                           otherwise one batched query per relation, compiled
+                           recursively
+
+The output (field order, None handling, URLs) is identical to the serializer
+it was compiled from; tests compare the rendered bytes. Serializers with
+fields the compiler does not know (SerializerMethodField, properties, ...)
+are not compiled and the views keep using DRF. A serializer that overrides
+to_representation() is only compiled when it exposes the extra step as a
+`finalize_representation(data, pk)` static method.
+
+Settings:
+- FAST_LIST_SERIALIZERS (default True): use compiled plans in list actions
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+from rest_framework.response import Response
+
+from .serializers import ImageVariantsField
+from .image_variants import variant_urls
+from .metrics import timer
+from .sparse_fields import apply_sparse, known_names
+
+OWNER = 'fast_owner'
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class StoredName(str):
+    """
+    The stored name of a file field, usable where a FieldFile is expected
+    (variant_urls() reads `.name` and tests truthiness).
+    """
+
+    @property
+    def name(self):
+        return str(self)
+
+
+def enabled():
+    return getattr(settings, 'FAST_LIST_SERIALIZERS', True)
+
+
+# _______________________________________ compiling _______________________________________
+
+def compile_serializer(serializer_class, fields=(), expand=()):
+    """
+    Plan for `serializer_class` (trimmed / expanded like ?fields= and ?expand=,
+    see sparse_fields.py), or None when one of its fields is not supported.
+    Unknown names are dropped before the cache lookup.
+    """
+    return compiled_plan(serializer_class, *known_names(serializer_class, fields, expand))
+
+
+@lru_cache(maxsize=256)
+def compiled_plan(serializer_class, fields, expand):
+    try:
+        return Plan(apply_sparse(serializer_class(context={}), fields, expand))
+    except NotCompilable:
+        return None
+
+
+def relation_field(model, accessor):
+    """
+    The forward field or reverse relation reached through `accessor` on instances.
+    """
+    for field in model._meta.get_fields():
+        if field.auto_created and not field.concrete:
+            if field.get_accessor_name() == accessor:
+                return field
+        elif field.name == accessor:
+            return field
+    raise NotCompilable(f"{model.__name__}.{accessor} is not a model field")
+
+
+def join_path(model, source_attrs):
+    """
+    ORM lookup path of a dotted source through non-null foreign keys, or None
+    when it does not resolve to a column (DRF then skips the field).
+    """
+    path = []
+    for index, attr in enumerate(source_attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        path.append(attr)
+        if index < len(source_attrs) - 1:
+            if not (field.many_to_one and field.concrete):
+                raise NotCompilable(f"{'.'.join(source_attrs)} crosses a non FK relation")
+            if field.null:
+                # روی FK خالی DRF فیلد را حذف می‌کند ولی join فقط None برمی‌گرداند
+                raise NotCompilable(f"{'.'.join(source_attrs)} crosses a nullable FK")
+            model = field.related_model
+        elif not field.concrete or field.is_relation:
+            return None
+    return '__'.join(path)
+
+
+def scalar_converter(field, model_field=None):
+    """
+    convert(value, request) for a scalar DRF field; None means the value is used as is.
+    """
+    if isinstance(field, drf_fields.FileField):
+        if not getattr(field, 'use_url', True) or model_field is None:
+            raise NotCompilable("file fields without use_url")
+        storage = model_field.storage
+
+        def file_url(name, request):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        return file_url
+    if type(field) in (drf_fields.IntegerField, drf_fields.CharField, drf_fields.BooleanField, drf_fields.FloatField):
+        # مقدار دیتابیس همان نوع خروجی را دارد (int / str / bool / float)
+        return None
+    if isinstance(field, (drf_fields.DateTimeField, drf_fields.DateField, drf_fields.ChoiceField, drf_fields.DecimalField)):
+        return lambda value, request: field.to_representation(value)
+    raise NotCompilable(f"unsupported field {type(field).__name__}")
+
+
+class Plan:
+    """
+    Compiled form of one serializer class; serialize() is its to_representation()
+    for a whole batch of rows.
+    """
+
+    def __init__(self, serializer):
+        serializer_class = type(serializer)
+        if not isinstance(serializer, serializers.ModelSerializer):
+            raise NotCompilable(f"{serializer_class.__name__} is not a ModelSerializer")
+        overrides = serializer_class.to_representation is not serializers.Serializer.to_representation
+        self.finalize = getattr(serializer_class, 'finalize_representation', None)
+        if overrides and self.finalize is None:
+            raise NotCompilable(f"{serializer_class.__name__} overrides to_representation()")
+        self.model = serializer.Meta.model
+        self.columns = ['pk']
+        self.steps = []  # (kind, key, ...) به ترتیب فیلدهای سریالایزر
+        self.relations = []  # (key, fetch(owner_ids, request) -> {owner_id: value})
+        for field in serializer._readable_fields:
+            self.add_field(field)
+
+    @property
+    def flat(self):
+        return not self.relations
+
+    def column(self, name):
+        if name not in self.columns:
+            self.columns.append(name)
+        return name
+
+    def add_field(self, field):
+        key = field.field_name
+        if field.source == '*':
+            raise NotCompilable(f"{key}: source='*'")
+        if isinstance(field, serializers.ListSerializer):
+            return self.add_nested_many(key, field)
+        if isinstance(field, serializers.BaseSerializer):
+            return self.add_nested_one(key, field)
+        if isinstance(field, relations.ManyRelatedField):
+            if not isinstance(field.child_relation, relations.PrimaryKeyRelatedField):
+                raise NotCompilable(f"{key}: only primary key relations")
+            return self.add_many_pks(key, field.source)
+        if len(field.source_attrs) > 1:
+            path = join_path(self.model, field.source_attrs)
+            if path is None:
+                if field.required or field.allow_null or field.default is not drf_fields.empty:
+                    raise NotCompilable(f"{key}: {field.source} is not a column")
+                return  # DRF برای هر ردیف SkipField می‌گیرد و کلید در خروجی نیست
+            return self.steps.append(('value', key, self.column(path), scalar_converter(field)))
+        try:
+            model_field = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise NotCompilable(f"{key}: {field.source} is not a model field")
+        if isinstance(field, relations.PrimaryKeyRelatedField):
+            if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+                raise NotCompilable(f"{key}: not a forward FK")
+            return self.steps.append(('value', key, self.column(model_field.attname), None))
+        if isinstance(field, ImageVariantsField):
+            group = field.group
+            return self.steps.append(('value', key, self.column(field.source),
+                                      lambda name, request: variant_urls(StoredName(name or ''), group, request)))
+        if not model_field.concrete or model_field.is_relation:
+            raise NotCompilable(f"{key}: {field.source} is not a column")
+        self.steps.append(('value', key, self.column(field.source), scalar_converter(field, model_field)))
+
+    def add_nested_one(self, key, field):
+        plan = Plan(field)
+        model_field = relation_field(self.model, field.source)
+        joinable = plan.flat and all(step[0] == 'value' for step in plan.steps)
+        if joinable and (model_field.one_to_one or (model_field.many_to_one and model_field.concrete)):
+            # یک به یک / FK ساده: ستون ها با join در همان کوئری اصلی خوانده می‌شوند
+            prefix = field.source + '__'
+            present = self.column(prefix + 'pk')
+            columns = [('value', sub_key, self.column(prefix + column), convert)
+                       for _, sub_key, column, convert in plan.steps]
+            return self.steps.append(('join', key, present, columns, plan.finalize))
+        if not (model_field.many_to_one and model_field.concrete):
+            raise NotCompilable(f"{key}: nested reverse relation with its own relations")
+        fk = self.column(model_field.attname)
+
+        def fetch(owner_ids, request):
+            rows = list(plan.values(plan.model.objects.filter(pk__in=owner_ids)))
+            return {row['pk']: data for row, data in zip(rows, plan.serialize(rows, request))}
+        self.relations.append((key, fk, fetch))
+        self.steps.append(('related_one', key, fk))
+
+    def add_nested_many(self, key, field):
+        plan = Plan(field.child)
+        model_field = relation_field(self.model, field.source)
+        if model_field.many_to_many and model_field.concrete:
+            owner = model_field.related_query_name()
+        elif model_field.one_to_many:
+            owner = model_field.field.name
+        else:
+            raise NotCompilable(f"{key}: unsupported relation")
+
+        def fetch(owner_ids, request):
+            queryset = plan.model.objects.filter(**{f'{owner}__in': owner_ids}).order_by('pk')
+            grouped = {}
+            for owner_id, row in plan.serialize_queryset(queryset, request, owner=owner):
+                grouped.setdefault(owner_id, []).append(row)
+            return grouped
+        self.relations.append((key, 'pk', fetch))
+        self.steps.append(('related_many', key))
+
+    def add_many_pks(self, key, source):
+        model_field = relation_field(self.model, source)
+        if not (model_field.many_to_many and model_field.concrete):
+            raise NotCompilable(f"{key}: only forward many to many")
+        through = model_field.remote_field.through
+        source_column = model_field.m2m_field_name() + '_id'
+        target_column = model_field.m2m_reverse_field_name() + '_id'
+
+        def fetch(owner_ids, request):
+            grouped = {}
+            rows = through.objects.filter(**{f'{source_column}__in': owner_ids}).order_by(target_column)
+            for owner_id, target_id in rows.values_list(source_column, target_column):
+                grouped.setdefault(owner_id, []).append(target_id)
+            return grouped
+        self.relations.append((key, 'pk', fetch))
+        self.steps.append(('related_many', key))
+
+    # _______________________________________ serializing _______________________________________
+
+    def values(self, queryset, extra=()):
+        """
+        `queryset` as values() rows with every column the plan reads, plus `extra`.
+        Prefetches are dropped: the relations are loaded by serialize().
+        """
+        names = list(self.columns) + [name for name in extra if name not in self.columns]
+        return queryset.prefetch_related(None).values(*names)
+
+    def serialize_queryset(self, queryset, request=None, owner=None):
+        if owner is None:
+            return self.serialize(list(self.values(queryset)), request)
+        rows = list(self.values(queryset).annotate(**{OWNER: F(owner)}))
+        return list(zip([row[OWNER] for row in rows], self.serialize(rows, request)))
+
+    def serialize(self, rows, request=None):
+        """
+        The list the serializer would return for the same objects, from values() rows.
+        """
+        related = {}
+        for key, column, fetch in self.relations:
+            ids = {row[column] for row in rows if row[column] is not None}
+            related[key] = fetch(ids, request) if ids else {}
+        output = []
+        for row in rows:
+            data = self.represent(row, self.steps, related, request)
+            if self.finalize is not None:
+                data = self.finalize(data, row['pk'])
+            output.append(data)
+        return output
+
+    @staticmethod
+    def represent(row, steps, related, request):
+        data = {}
+        for step in steps:
+            kind, key = step[0], step[1]
+            if kind == 'value':
+                value = row[step[2]]
+                convert = step[3]
+                data[key] = value if value is None or convert is None else convert(value, request)
+            elif kind == 'join':
+                _, _, present, columns, finalize = step
+                if row[present] is None:
+                    data[key] = None
+                else:
+                    nested = Plan.represent(row, columns, related, request)
+                    data[key] = finalize(nested, row[present]) if finalize is not None else nested
+            elif kind == 'related_one':
+                owner_id = row[step[2]]
+                data[key] = related[key].get(owner_id) if owner_id is not None else None
+            else:
+                data[key] = related[key].get(row['pk'], [])
+        return data
+
+
+def fast_data(serializer_class, queryset, request=None):
+    """
+    Serialize a queryset with the compiled plan, falling back to DRF.
+    """
+    plan = compile_serializer(serializer_class)
+    if plan is None:
+        return serializer_class(queryset, many=True, context={'request': request}).data
+    return plan.serialize_queryset(queryset, request)
+
+
+class FastListMixin:
+    """
+    list() through the compiled plan of get_serializer_class(). Falls back to
+    the regular ModelViewSet.list() when the serializer is not compilable or
+    FAST_LIST_SERIALIZERS is off. Works with KeysetPagination, which reads the
+    cursor values from the values() rows.
+    """
+
+    def list(self, request, *args, **kwargs):
+        sparse = self.sparse_params() if hasattr(self, 'sparse_params') else ()
+        plan = compile_serializer(self.get_serializer_class(), *sparse) if enabled() else None
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = plan.values(
+            self.filter_queryset(self.get_queryset()),
+            extra=getattr(self, 'cursor_ordering_fields', ()),
+        )
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        # همان فاز serializer که BaseSerializer.data در Server-Timing و /metrics ثبت می‌کند
+        with timer('serializer'):
+            data = plan.serialize(rows, request)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
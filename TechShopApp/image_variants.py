@@ -0,0 +1,118 @@
+"""
+Responsive image variants (smaller widths, WebP / AVIF) for uploaded images.
+
+Variants are generated lazily: the first request for
+/store/image-variants/<width>/<format>/<original name> resizes the original
+and stores the result under MEDIA_ROOT/variants/; later requests read that
+file. Upload names are random and never reused, so a variant never has to be
+invalidated and can be served with a year-long cache header.
+
+Only configured widths and formats are accepted and the original must live in
+one of the upload directories, so clients cannot make the server produce (or
+read) arbitrary files.
+
+Settings (IMAGE_VARIANTS):
+- 'widths': {group: [widths...]}   e.g. 'product': [160, 320, 640, 800]
+- 'formats': ['avif', 'webp']     formats Pillow cannot write are skipped
+"""
+import os
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, features
+
+DEFAULT_VARIANTS = {
+    'widths': {
+        'product': [160, 320, 640, 800],
+        'thumbnail': [64, 128, 300],
+    },
+    'formats': ['avif', 'webp'],
+}
+# پوشه هایی که upload_to مدل ها در آنها فایل ذخیره می‌کنند
+SOURCE_DIRECTORIES = ('uploads/', 'product-images/', 'brands/', 'categories/', 'color-images/')
+VARIANTS_DIRECTORY = 'variants'
+PIL_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP', 'jpeg': 'JPEG', 'png': 'PNG'}
+CONTENT_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+
+
+def get_config():
+    return getattr(settings, 'IMAGE_VARIANTS', DEFAULT_VARIANTS)
+
+
+@lru_cache(maxsize=None)
+def writable(fmt):
+    return fmt in PIL_FORMATS and (fmt in ('jpeg', 'png') or features.check(fmt))
+
+
+def variant_formats():
+    return [fmt for fmt in get_config()['formats'] if writable(fmt)]
+
+
+def allowed_widths():
+    return {width for widths in get_config()['widths'].values() for width in widths}
+
+
+def is_allowed(width, fmt, name):
+    normalized = os.path.normpath(name)
+    return (
+        width in allowed_widths()
+        and fmt in variant_formats()
+        and normalized == name
+        and not os.path.isabs(name)
+        and name.startswith(SOURCE_DIRECTORIES)
+    )
+
+
+def variant_path(name, width, fmt):
+    stem, _ = os.path.splitext(name)
+    return os.path.join(settings.MEDIA_ROOT, VARIANTS_DIRECTORY, stem, f"{width}.{fmt}")
+
+
+def get_or_create_variant(name, width, fmt):
+    """
+    Return the path of the variant, generating it on first use. Returns None
+    when the original does not exist.
+    """
+    target = variant_path(name, width, fmt)
+    if os.path.isfile(target):
+        return target
+    source = os.path.join(settings.MEDIA_ROOT, name)
+    if not os.path.isfile(source):
+        return None
+
+    with Image.open(source) as img:
+        img.load()
+    if img.width > width:
+        img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+    if fmt == 'jpeg' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # اول در فایل موقت می‌نویسیم تا درخواست های همزمان فایل نیمه کاره نبینند
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            img.save(out, format=PIL_FORMATS[fmt], quality=80)
+        os.replace(temp, target)
+    except BaseException:
+        os.unlink(temp)
+        raise
+    return target
+
+
+def variant_urls(file, group, request=None):
+    """
+    {format: {"<width>w": url}} for an ImageField value, or None when empty.
+    """
+    if not file:
+        return None
+    widths = get_config()['widths'][group]
+    urls = {}
+    for fmt in variant_formats():
+        urls[fmt] = {}
+        for width in widths:
+            url = reverse('image-variant', kwargs={'width': width, 'fmt': fmt, 'name': file.name})
+            urls[fmt][f"{width}w"] = request.build_absolute_uri(url) if request else url
+    return urls
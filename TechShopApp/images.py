@@ -0,0 +1,124 @@
+"""
+Background image processing.
+
+Model save() only records an ImageJob when an image field actually changed
+(see ImageJobMixin). After the transaction commits the job is handed to a
+shared thread pool, so the request returns as soon as the row is saved. The
+worker claims the job, resizes the file in place with Pillow and marks the
+job done (or failed with the error). Jobs left behind by a crash are picked
+up by `manage.py process_image_jobs`.
+
+Settings:
+- IMAGE_JOB_WORKERS (default 2): thread pool size
+- IMAGE_JOBS_ASYNC (default True): False runs jobs inline on commit (tests, scripts)
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from .metrics import observe, timer
+from .models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_JOB_WORKERS', 2),
+                thread_name_prefix='image-jobs',
+            )
+        return _executor
+
+
+def process_image(path, size, mode):
+    """
+    Resize the file at `path` in place (the same work save() used to do).
+    """
+    with Image.open(path) as img:
+        img.load()
+    if mode == 'resize':
+        img = img.resize(size, Image.LANCZOS)
+    else:
+        img.thumbnail(size, Image.LANCZOS)
+    img.save(path)
+
+
+def enqueue_image_job(instance, field_name, size, mode):
+    job = ImageJob.objects.create(
+        model_label=instance._meta.label,
+        object_id=instance.pk,
+        field_name=field_name,
+        file_name=getattr(instance, field_name).name,
+        width=size[0],
+        height=size[1],
+        mode=mode,
+    )
+    transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+def submit(job_id):
+    if getattr(settings, 'IMAGE_JOBS_ASYNC', True):
+        return get_executor().submit(run_in_worker, job_id)
+    run_job(job_id)
+
+
+def run_in_worker(job_id):
+    try:
+        return run_job(job_id)
+    finally:
+        # هر thread اتصال دیتابیس خودش را دارد
+        close_old_connections()
+
+
+def claim(job_id):
+    # فقط یک worker می‌تواند وضعیت را از pending به running ببرد
+    return ImageJob.objects.filter(pk=job_id, status=ImageJob.PENDING).update(status=ImageJob.RUNNING) == 1
+
+
+def run_job(job_id):
+    """
+    Process one job if it can still be claimed. Returns the final status or
+    None when another worker already took it.
+    """
+    if not claim(job_id):
+        return None
+    job = ImageJob.objects.get(pk=job_id)
+    job.attempts += 1
+    try:
+        model = apps.get_model(job.model_label)
+        instance = model.objects.filter(pk=job.object_id).only(job.field_name).first()
+        file = getattr(instance, job.field_name, None) if instance else None
+        if not file or file.name != job.file_name:
+            # ردیف حذف شده یا تصویر دوباره عوض شده؛ کار جدید خودش ثبت شده است
+            job.status = ImageJob.DONE
+            job.error = "skipped: image no longer current"
+        elif not os.path.isfile(file.path):
+            raise FileNotFoundError(file.path)
+        else:
+            started = time.perf_counter()
+            # با IMAGE_JOBS_ASYNC=False داخل همان درخواست اجرا می‌شود و در Server-Timing می‌آید
+            with timer('image'):
+                process_image(file.path, (job.width, job.height), job.mode)
+            observe('image_job_seconds', (('mode', job.mode),), time.perf_counter() - started)
+            job.status = ImageJob.DONE
+            job.error = ''
+    except Exception as exc:
+        logger.exception("image job %s failed", job_id)
+        job.status = ImageJob.FAILED
+        job.error = repr(exc)
+    job.save(update_fields=['status', 'attempts', 'error', 'updated_date'])
+    return job.status
@@ -0,0 +1,133 @@
+"""
+Atomic stock reservation for ProductPackage.quantity.
+
+reserve() takes stock with one conditional statement per package:
+
+    UPDATE productpackage
+       SET quantity = quantity - n, sold_count = sold_count + n
+     WHERE id = %s AND is_active_package AND quantity >= n
+
+The database evaluates the condition on the locked row, so concurrent buyers
+can never take the last unit twice and quantity never goes negative; no row is
+read into Python first. A reservation with several packages runs in one
+transaction and updates the rows in ascending id order, so two checkouts that
+share packages always lock them in the same order and cannot deadlock. If any
+package is short, the whole transaction (and every decrement already made in
+it) is rolled back.
+
+Stock stays reserved until the reservation is confirmed (checkout) or
+released. Unconfirmed reservations expire after RESERVATION_TTL seconds and
+`manage.py release_expired_reservations` gives their stock back with the
+inverse statement.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ProductPackage, StockReservation, StockReservationItem
+from .summary import refresh_product_summary
+
+DEFAULT_TTL = 15 * 60
+
+
+class InsufficientStock(Exception):
+    def __init__(self, package_id, requested):
+        self.package_id = package_id
+        self.requested = requested
+        super().__init__(f"not enough stock for package {package_id} (requested {requested})")
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'RESERVATION_TTL', DEFAULT_TTL))
+
+
+def refresh_summaries_on_commit(package_ids):
+    # موجودی کل و in_stock در ProductSummary بعد از commit و خارج از قفل ردیف ها بروز می‌شوند
+    product_ids = set(ProductPackage.objects.filter(pk__in=package_ids).values_list('product_id', flat=True))
+
+    def refresh():
+        for product_id in sorted(product_ids):
+            refresh_product_summary(product_id)
+
+    # خطای بروزرسانی خلاصه نباید رزروی را که commit شده ناموفق نشان دهد
+    transaction.on_commit(refresh, robust=True)
+
+
+def reserve(items, user=None, ttl=None):
+    """
+    Reserve stock for `items`, an iterable of (package_id, quantity) pairs.
+    Either every package is decremented or none is (InsufficientStock).
+    """
+    wanted = Counter()
+    for package_id, quantity in items:
+        if quantity < 1:
+            raise ValueError("quantity must be positive")
+        wanted[package_id] += quantity
+    if not wanted:
+        raise ValueError("nothing to reserve")
+
+    with transaction.atomic():
+        # ترتیب ثابت قفل ها (id صعودی) برای جلوگیری از deadlock
+        for package_id in sorted(wanted):
+            quantity = wanted[package_id]
+            updated = ProductPackage.objects.filter(
+                pk=package_id, is_active_package=True, quantity__gte=quantity,
+            ).update(quantity=F('quantity') - quantity, sold_count=F('sold_count') + quantity)
+            if not updated:
+                raise InsufficientStock(package_id, quantity)
+        reservation = StockReservation.objects.create(
+            user=user, expires_at=timezone.now() + (ttl or reservation_ttl()),
+        )
+        StockReservationItem.objects.bulk_create(
+            StockReservationItem(reservation=reservation, package_id=package_id, quantity=quantity)
+            for package_id, quantity in sorted(wanted.items())
+        )
+        refresh_summaries_on_commit(wanted)
+    return reservation
+
+
+def confirm(reservation_id):
+    """
+    Checkout: keep the reserved stock for good. Returns False when the
+    reservation is no longer reserved or has expired.
+    """
+    return StockReservation.objects.filter(
+        pk=reservation_id, status=StockReservation.RESERVED, expires_at__gt=timezone.now(),
+    ).update(status=StockReservation.CONFIRMED, updated_date=timezone.now()) == 1
+
+
+def release(reservation_id):
+    """
+    Give the stock of a still reserved reservation back. Returns False when it
+    was already confirmed or released (so stock is never returned twice).
+    """
+    with transaction.atomic():
+        claimed = StockReservation.objects.filter(
+            pk=reservation_id, status=StockReservation.RESERVED,
+        ).update(status=StockReservation.RELEASED, updated_date=timezone.now())
+        if not claimed:
+            return False
+        items = list(
+            StockReservationItem.objects.filter(reservation_id=reservation_id)
+            .order_by('package_id').values_list('package_id', 'quantity')
+        )
+        for package_id, quantity in items:
+            ProductPackage.objects.filter(pk=package_id).update(
+                quantity=F('quantity') + quantity, sold_count=F('sold_count') - quantity,
+            )
+        refresh_summaries_on_commit([package_id for package_id, _ in items])
+    return True
+
+
+def release_expired(now=None, limit=1000):
+    """
+    Release reservations whose TTL has passed. Returns how many were released.
+    """
+    expired = StockReservation.objects.filter(
+        status=StockReservation.RESERVED, expires_at__lte=now or timezone.now(),
+    ).order_by('expires_at').values_list('pk', flat=True)[:limit]
+    return sum(release(pk) for pk in list(expired))
@@ -0,0 +1,70 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from TechShopApp.benchmark import scratch_database
+from TechShopApp.endpoint_benchmark import compare_results, run_endpoint_benchmark
+from TechShopApp.synthetic import generate_catalog
+
+
+class Command(BaseCommand):
+    help = ("Benchmark every GET route of the API (queries, DB / serialization time, p50 / p95) on a seeded "
+            "catalog in a scratch database, and compare with a JSON baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--output', help="Write the results as JSON (use the baseline path to update it).")
+        parser.add_argument('--baseline', help="Fail when a route runs more queries than in this JSON file.")
+        parser.add_argument('--latency-tolerance', type=float, default=0.5, help="Allowed p95 growth, 0.5 = 50%%.")
+        parser.add_argument('--strict-latency', action='store_true', help="Fail on latency warnings too.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            if not os.path.isfile(options['baseline']):
+                raise CommandError(f"{options['baseline']} does not exist")
+            with open(options['baseline'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+
+        with scratch_database():
+            started = time.monotonic()
+            generate_catalog(packages=options['packages'], seed=options['seed'])
+            self.stdout.write(f"Seeded {options['packages']} packages in {time.monotonic() - started:.1f}s")
+            routes = run_endpoint_benchmark(repeat=options['repeat'])
+            vendor = connection.vendor
+
+        for name, stats in routes.items():
+            self.stdout.write(f"{name:<28} {json.dumps(stats)}")
+        report = {
+            'meta': {
+                'packages': options['packages'], 'seed': options['seed'], 'repeat': options['repeat'], 'vendor': vendor,
+            },
+            'routes': routes,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, indent=2, sort_keys=True)
+                stream.write('\n')
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is None:
+            return
+        if baseline.get('meta', {}).get('packages') != options['packages']:
+            self.stderr.write("warning: the baseline was recorded on a different catalog size")
+        failures, warnings = compare_results(
+            routes, baseline.get('routes', {}), latency_tolerance=options['latency_tolerance'],
+        )
+        for line in warnings:
+            self.stderr.write(f"warning: {line}")
+        if options['strict_latency']:
+            failures += [line for line in warnings if 'p95' in line]
+        for line in failures:
+            self.stderr.write(self.style.ERROR(line))
+        if failures:
+            raise CommandError(f"{len(failures)} endpoint regressions against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
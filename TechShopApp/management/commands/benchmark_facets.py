@@ -0,0 +1,52 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from TechShopApp.benchmark import measure, scratch_database
+from TechShopApp.models import BaseColor, Brand, Category
+from TechShopApp.synthetic import generate_catalog
+
+
+class Command(BaseCommand):
+    help = "Benchmark the faceted /store/products/ list on a synthetic catalog (in a scratch database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--packages', type=int, default=2, help="Packages per product.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            started = time.monotonic()
+            self.populate(options)
+            self.stdout.write(f"Seeded about {options['products']} products in {time.monotonic() - started:.1f}s")
+
+            client = APIClient()
+            category = Category.objects.filter(parent=None).first()
+            brand = Brand.objects.first()
+            base_color = BaseColor.objects.first()
+            queries = {
+                'no filters': '',
+                'category': f'?category={category.id}',
+                'category+brand': f'?category={category.id}&brand={brand.id}',
+                'color+storage': f'?base_color={base_color.id}&storage=256',
+                'price+stock': '?min_price=1000000&max_price=20000000&in_stock=1',
+                'all + sort': f'?category={category.id}&brand={brand.id}&base_color={base_color.id}'
+                              '&in_stock=1&ordering=min_price',
+                'no facets': '?facets=0',
+            }
+            results = {}
+            for label, query in queries.items():
+                results[label] = measure(lambda: client.get('/store/products/' + query), repeat=options['repeat'])
+                self.stdout.write(f"{label:<16} {json.dumps(results[label])}")
+        return None
+
+    def populate(self, options):
+        generate_catalog(
+            packages=options['products'] * options['packages'], packages_per_product=options['packages'],
+            seed=options['seed'], batch_size=options['batch_size'],
+        )
@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from TechShopApp.benchmark import scratch_database
+from TechShopApp.endpoint_benchmark import run_renderer_benchmark
+from TechShopApp.renderers import MessagePackRenderer, ORJSONRenderer
+from TechShopApp.synthetic import generate_catalog
+
+RENDERERS = {'json': JSONRenderer, 'orjson': ORJSONRenderer, 'msgpack': MessagePackRenderer}
+
+
+class Command(BaseCommand):
+    help = ("Encode the response of every GET route with the JSON, orjson and MessagePack renderers "
+            "on a seeded catalog in a scratch database and report encode time and payload size.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help="Write the results as JSON.")
+
+    def handle(self, *args, **options):
+        missing = [name for name, cls in RENDERERS.items() if not getattr(cls, 'available', True)]
+        for name in missing:
+            self.stderr.write(f"warning: {name} is not installed, skipped")
+
+        with scratch_database():
+            started = time.monotonic()
+            generate_catalog(packages=options['packages'], seed=options['seed'])
+            self.stdout.write(f"Seeded {options['packages']} packages in {time.monotonic() - started:.1f}s")
+            routes = run_renderer_benchmark(RENDERERS, repeat=options['repeat'])
+
+        names = [name for name in RENDERERS if name not in missing]
+        self.stdout.write(f"{'route':<28}" + ''.join(f"{name + ' ms':>12}{name + ' bytes':>15}" for name in names))
+        for route, stats in routes.items():
+            if 'skipped' in stats:
+                self.stdout.write(f"{route:<28} skipped: {stats['skipped']}")
+                continue
+            self.stdout.write(f"{route:<28}" + ''.join(
+                f"{stats[name]['encode_ms']:>12}{stats[name]['bytes']:>15}" for name in names
+            ))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump({'meta': {'packages': options['packages'], 'seed': options['seed']}, 'routes': routes},
+                          stream, indent=2, sort_keys=True)
+                stream.write('\n')
+            self.stdout.write(f"Wrote {options['output']}")
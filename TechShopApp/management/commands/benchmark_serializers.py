@@ -0,0 +1,61 @@
+import json
+import time
+
+from django.db.models import Prefetch
+from django.core.management.base import BaseCommand, CommandError
+
+from TechShopApp.benchmark import scratch_counters, scratch_database, serializer_throughput
+from TechShopApp.models import Category, Product, ProductAttribute, ProductPackage
+from TechShopApp.serializers import CategorySerializer, PPackageSerializer, ProductListSerializer
+from TechShopApp.synthetic import generate_catalog
+
+
+def cases():
+    """
+    (name, serializer, queryset) with the prefetches the list views use.
+    """
+    return [
+        ('products', ProductListSerializer, Product.objects.select_related('summary').prefetch_related(
+            Prefetch('categories', queryset=Category.objects.order_by('id')),
+            Prefetch('attributes', queryset=ProductAttribute.objects.select_related('attribute').order_by('id')),
+        )),
+        ('product-packages', PPackageSerializer, ProductPackage.objects.all()),
+        ('categories', CategorySerializer, Category.objects.all()),
+    ]
+
+
+class Command(BaseCommand):
+    help = ("Compare rows per second of the DRF serializers and the compiled values() plans "
+            "(TechShopApp/fast_serializers.py) on a seeded catalog in a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--rows', type=int, default=500, help="Rows serialized per run.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        results = {}
+        with scratch_database(), scratch_counters():
+            started = time.monotonic()
+            generate_catalog(packages=options['packages'], seed=options['seed'])
+            self.stdout.write(f"Seeded {options['packages']} packages in {time.monotonic() - started:.1f}s")
+            for name, serializer_class, queryset in cases():
+                results[name] = serializer_throughput(
+                    serializer_class, queryset, rows=options['rows'], repeat=options['repeat'],
+                )
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(f"{'serializer':<18} {'rows':>5} {'drf rows/s':>11} {'fast rows/s':>12} {'speedup':>8} {'queries':>9}")
+            for name, stats in results.items():
+                self.stdout.write(
+                    f"{name:<18} {stats['rows']:>5} {stats['drf']['rows_per_second']:>11} "
+                    f"{stats['fast']['rows_per_second']:>12} {stats['speedup']:>7}x "
+                    f"{stats['drf']['queries']:>4}/{stats['fast']['queries']:<4}"
+                )
+        different = [name for name, stats in results.items() if not stats['identical']]
+        if different:
+            raise CommandError(f"fast output differs from DRF for: {', '.join(different)}")
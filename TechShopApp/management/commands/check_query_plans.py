@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django.db import connection
+
+from TechShopApp.query_plans import check_critical_queries, critical_queries, supported
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the critical ORM queries and fail when one of them needs a full scan or an unindexed sort."
+
+    def handle(self, *args, **options):
+        if not supported():
+            self.stdout.write(self.style.WARNING(
+                f"Unsupported vendor {connection.vendor}: query plans are only checked on sqlite and MySQL"
+            ))
+            return
+        report = check_critical_queries()
+        for name in critical_queries():
+            if name in report:
+                self.stdout.write(self.style.ERROR(f"{name}: {', '.join(report[name])}"))
+            else:
+                self.stdout.write(f"{name}: ok")
+        if report:
+            raise CommandError(f"{len(report)} queries have a bad plan")
+        self.stdout.write(self.style.SUCCESS("All query plans use indexes"))
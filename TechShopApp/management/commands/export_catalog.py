@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from TechShopApp.catalog_export import FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = "Stream every product with its packages and attribute values as JSON lines or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=sorted(FORMATS), default='jsonl')
+        parser.add_argument('--output', '-o', help="File to write; defaults to stdout.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Products read per query.")
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['type'], chunk_size=options['chunk_size'])
+        if not options['output']:
+            for chunk in lines:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in lines:
+                output.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported to {options['output']}"))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from TechShopApp.counters import journal_dir, recover
+from TechShopApp.models import CounterFlush
+
+
+class Command(BaseCommand):
+    help = "Apply counter journals left behind by stopped or crashed workers and prune old flush records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune-days', type=int, default=7, help="Delete CounterFlush records older than this.")
+
+    def handle(self, *args, **options):
+        applied = recover(journal_dir())
+        pruned, _ = CounterFlush.objects.filter(
+            created_date__lt=timezone.now() - timedelta(days=options['prune_days']),
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Applied {applied} journal files, pruned {pruned} flush records."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from TechShopApp.synthetic import generate_catalog
+
+
+class Command(BaseCommand):
+    help = "Fill the database with a seeded synthetic catalog (categories, brands, products, packages, comments, ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=10_000, help="Number of ProductPackage rows, e.g. 1000000.")
+        parser.add_argument('--packages-per-product', type=float, default=5, help="Mean of the skewed package count.")
+        parser.add_argument('--comments', type=float, default=3, help="Mean comments per product (long tail).")
+        parser.add_argument('--gallery', type=float, default=3, help="Mean gallery images per product.")
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1, help="Same seed, same data; names are prefixed with s<seed>-.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Packages written per transaction.")
+        parser.add_argument('--images', action='store_true', help="Also write the placeholder image files under MEDIA_ROOT.")
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{stats.counts.get('productpackage', 0)} packages, {stats.rows_per_second} rows/s")
+
+        try:
+            stats = generate_catalog(
+                packages=options['packages'], packages_per_product=options['packages_per_product'],
+                comments=options['comments'], gallery=options['gallery'], users=options['users'],
+                seed=options['seed'], batch_size=options['batch_size'], images=options['images'],
+                on_batch=progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        counts = ', '.join(f"{name} {count}" for name, count in stats.counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts} in {stats.seconds:.1f}s ({stats.rows_per_second} rows/s)"
+        ))
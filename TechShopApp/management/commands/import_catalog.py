@@ -0,0 +1,37 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from TechShopApp.catalog_import import import_catalog
+
+
+class Command(BaseCommand):
+    help = "Stream-import products, packages and attribute values from a CSV or JSON lines file (upsert by product name)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON lines (.jsonl) file.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+        if not os.path.isfile(path):
+            raise CommandError(f"{path} does not exist")
+
+        def progress(stats):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{stats.rows} rows, {stats.rows_per_second} rows/s")
+
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            stats = import_catalog(stream, fmt, batch_size=options['batch_size'], on_batch=progress)
+
+        for line, message in stats.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if stats.error_count > len(stats.errors):
+            self.stderr.write(f"... and {stats.error_count - len(stats.errors)} more invalid rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.rows - stats.error_count}/{stats.rows} rows in {stats.seconds:.1f}s "
+            f"({stats.rows_per_second} rows/s): products +{stats.products_created} ~{stats.products_updated}, "
+            f"packages +{stats.packages_created} ~{stats.packages_updated}, attribute values {stats.attributes}."
+        ))
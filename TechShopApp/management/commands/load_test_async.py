@@ -0,0 +1,62 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from TechShopApp.benchmark import asgi_load, scratch_counters, scratch_database, wsgi_load
+from TechShopApp.endpoint_benchmark import busiest_product
+from TechShopApp.models import Brand, Category, ProductPackage
+from TechShopApp.synthetic import generate_catalog
+
+
+def catalog_paths(prefix):
+    """
+    List and detail URLs of the endpoints that have an async variant.
+    """
+    product = busiest_product()
+    category = Category.objects.filter(parent=None).order_by('id').first()
+    brand = Brand.objects.order_by('id').first()
+    package = ProductPackage.objects.filter(product=product).order_by('id').first()
+    return [
+        f'{prefix}products/?facets=0', f'{prefix}products/{product.pk}/',
+        f'{prefix}categories/', f'{prefix}categories/{category.pk}/',
+        f'{prefix}brands/', f'{prefix}brands/{brand.pk}/',
+        f'{prefix}product-packages/', f'{prefix}product-packages/{package.pk}/',
+    ]
+
+
+class Command(BaseCommand):
+    help = ("Load test the catalog read endpoints in-process on a seeded scratch database: the WSGI ViewSets "
+            "with a thread pool against the async views (/store/async/...) through the ASGI handler. "
+            "Reports requests per second and p50 / p99 latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--packages', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=800)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        with scratch_database(), scratch_counters():
+            started = time.monotonic()
+            generate_catalog(packages=options['packages'], seed=options['seed'])
+            self.stdout.write(f"Seeded {options['packages']} packages in {time.monotonic() - started:.1f}s")
+            load = {'concurrency': options['concurrency'], 'requests': options['requests']}
+            # یک دور گرم کردن برای هر مسیر تا کش ها و import ها در نتیجه نیایند
+            wsgi_load(catalog_paths('/store/'), concurrency=1, requests=8)
+            asgi_load(catalog_paths('/store/async/'), concurrency=1, requests=8)
+            results = {
+                'wsgi': wsgi_load(catalog_paths('/store/'), **load),
+                'asgi': asgi_load(catalog_paths('/store/async/'), **load),
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'path':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<6} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9} "
+                f"{stats['p50_ms']:>9} {stats['p99_ms']:>9}"
+            )
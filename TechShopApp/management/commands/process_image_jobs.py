@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from TechShopApp.images import run_in_worker, run_job
+from TechShopApp.models import ImageJob, ImageJobMixin
+
+
+class Command(BaseCommand):
+    help = "Drain the image processing backlog (pending, stale or failed ImageJobs) with a worker pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Thread pool size; 0 processes jobs in this thread.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--retry-failed', action='store_true', help="Queue failed jobs again.")
+        parser.add_argument(
+            '--stale-minutes', type=int, default=10,
+            help="Jobs 'running' for longer than this are assumed lost (worker crash) and queued again.",
+        )
+        parser.add_argument('--reprocess', action='store_true', help="Queue a job for every stored image.")
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = ImageJob.objects.filter(status=ImageJob.RUNNING, updated_date__lt=stale_before).update(
+            status=ImageJob.PENDING,
+        )
+        if options['retry_failed']:
+            requeued += ImageJob.objects.filter(status=ImageJob.FAILED).update(status=ImageJob.PENDING)
+        if options['reprocess']:
+            self.stdout.write(f"Queued {self.queue_all_images()} images for reprocessing")
+        if requeued:
+            self.stdout.write(f"Re-queued {requeued} stale/failed jobs")
+
+        started = time.monotonic()
+        counts = {ImageJob.DONE: 0, ImageJob.FAILED: 0}
+        last_id = 0
+        pool = ThreadPoolExecutor(max_workers=options['workers']) if options['workers'] > 0 else None
+        try:
+            while True:
+                ids = list(
+                    ImageJob.objects.filter(status=ImageJob.PENDING, id__gt=last_id)
+                    .order_by('id').values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                last_id = ids[-1]
+                statuses = pool.map(run_in_worker, ids) if pool else map(run_job, ids)
+                for status in statuses:
+                    if status in counts:
+                        counts[status] += 1
+        finally:
+            if pool:
+                pool.shutdown()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {counts[ImageJob.DONE]} images, {counts[ImageJob.FAILED]} failed in {elapsed:.1f}s"
+        ))
+
+    def queue_all_images(self):
+        jobs = []
+        for model in apps.get_app_config('TechShopApp').get_models():
+            if not issubclass(model, ImageJobMixin):
+                continue
+            for field, (size, mode) in model.image_jobs.items():
+                rows = model.objects.exclude(**{field: ''}).exclude(**{field: None}).values_list('pk', field)
+                jobs += [
+                    ImageJob(
+                        model_label=model._meta.label, object_id=pk, field_name=field, file_name=name,
+                        width=size[0], height=size[1], mode=mode,
+                    )
+                    for pk, name in rows.iterator()
+                ]
+        ImageJob.objects.bulk_create(jobs, batch_size=1000)
+        return len(jobs)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from TechShopApp.category_tree import check_category_tree, rebuild_category_tree
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized category tree (Category.tree_path / depth) and check it for consistency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report problems, do not write anything.")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            _, problems, stale = check_category_tree()
+            for problem in problems:
+                self.stderr.write(problem)
+            if stale:
+                self.stderr.write(f"{len(stale)} categories have a stale tree path: {stale[:20]}")
+            if problems or stale:
+                raise CommandError("Category tree is inconsistent.")
+            self.stdout.write(self.style.SUCCESS("Category tree is consistent."))
+            return
+
+        rewritten, problems = rebuild_category_tree()
+        for problem in problems:
+            self.stderr.write(problem)
+        self.stdout.write(self.style.SUCCESS(f"Rewrote {rewritten} category paths."))
+        if problems:
+            raise CommandError("Some categories could not be placed in the tree.")
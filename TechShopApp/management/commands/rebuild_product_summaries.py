@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from TechShopApp.summary import rebuild_product_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the ProductSummary row of every product in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Products per grouped query / upsert.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rebuild_product_summaries(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} product summaries in {elapsed:.2f}s"))
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from TechShopApp.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute product rating sums / counts from the comments and repair the rows that drifted."
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        repaired = reconcile_ratings()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Repaired the rating of {repaired} products in {elapsed:.2f}s"))
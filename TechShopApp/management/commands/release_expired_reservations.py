@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from TechShopApp.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = "Give back the stock of reservations that were not checked out before they expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            released = release_expired(limit=options['batch_size'])
+            total += released
+            if released < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f"Released {total} expired reservations."))
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from TechShopApp.benchmark import reservation_stress, scratch_database
+from TechShopApp.models import Product, ProductPackage
+
+
+class Command(BaseCommand):
+    help = "Concurrent stock reservation stress test (in a scratch database): checks for overselling, reports reservations/s."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=200, help="Reservations tried per thread.")
+        parser.add_argument('--packages', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=500, help="Initial quantity of each package.")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            product = Product.objects.create(name="stress", description="-", is_active=True)
+            ProductPackage.objects.bulk_create(
+                ProductPackage(product=product, price=1000, final_price=1000, quantity=options['stock'],
+                               is_active_package=True)
+                for _ in range(options['packages'])
+            )
+            package_ids = list(ProductPackage.objects.values_list('id', flat=True))
+            results = reservation_stress(package_ids, threads=options['threads'], attempts=options['attempts'])
+
+            rows = list(ProductPackage.objects.values_list('quantity', 'sold_count'))
+            initial = options['stock'] * options['packages']
+            remaining = sum(quantity for quantity, _ in rows)
+            sold = sum(sold_count for _, sold_count in rows)
+            self.stdout.write(json.dumps({**results, 'remaining': remaining, 'sold': sold}))
+            if sold != results['reserved'] or remaining + sold != initial:
+                raise CommandError("stock and reservations do not add up: oversold or lost update")
+        self.stdout.write(self.style.SUCCESS("No overselling."))
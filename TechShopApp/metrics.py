@@ -0,0 +1,396 @@
+"""
+Per-request performance metrics.
+
+RequestMetricsMiddleware measures every request and splits its time into
+
+    db          SQL time (and the number of queries), all database aliases
+    serializer  time in serializer.data (outermost serializers; includes the
+                lazy queries they run)
+    render      DRF / template response rendering
+    image       ImageJobMixin.queue_image_jobs() and inline image processing
+
+The numbers go out twice: as a `Server-Timing` header on the response (shown
+by browser dev tools) and as Prometheus histograms labelled with the view and
+action, served in text format by `/metrics`.
+
+Aggregation is in-process and lock-free on the hot path: each thread writes
+to its own shard and /metrics sums the shards. The shards of finished threads
+are folded into one total when /metrics is read, so a server that starts a
+thread per request does not pile them up. With several WSGI worker
+processes set METRICS_MULTIPROCESS_DIR: every process writes its totals to
+<dir>/metrics-<pid>.json at most every METRICS_FLUSH_INTERVAL seconds, and
+/metrics (in any worker) merges all files, like prometheus_client's
+multiprocess mode. Totals of exited workers stay in their files, so counters
+never go backwards.
+
+Settings:
+- METRICS_ENABLED (default True)
+- SERVER_TIMING_HEADER (default 'staff': staff users only, everyone under
+  DEBUG; True / False for everyone / nobody)
+- METRICS_MULTIPROCESS_DIR (default None: single process)
+- METRICS_FLUSH_INTERVAL (default 5 seconds)
+- METRICS_TOKEN (default None: /metrics only for logged in staff users;
+  otherwise scrapers send `Authorization: Bearer <token>`)
+"""
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+PREFIX = 'techshop_'
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+HISTOGRAMS = {
+    'request_duration_seconds': ("Request latency.", TIME_BUCKETS),
+    'request_db_seconds': ("SQL time per request.", TIME_BUCKETS),
+    'request_queries': ("SQL queries per request.", QUERY_BUCKETS),
+    'request_serializer_seconds': ("Serializer time per request.", TIME_BUCKETS),
+    'request_render_seconds': ("Response rendering time per request.", TIME_BUCKETS),
+    'request_image_seconds': ("Image job queueing / inline processing time per request.", TIME_BUCKETS),
+    'image_job_seconds': ("Duration of one image processing job.", TIME_BUCKETS),
+}
+PHASES = ('db', 'serializer', 'render', 'image')
+
+
+# _______________________________________ aggregation _______________________________________
+
+class Registry:
+    """
+    Histograms sharded per thread: {(metric, labels): [bucket counts..., +Inf count, sum]}.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = []  # [(thread, shard)]
+        self.retired = {}  # مجموع shard های thread های تمام شده
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def shard(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = {}
+            # قفل فقط برای اولین ثبت هر thread گرفته می‌شود
+            with self.lock:
+                self.shards.append((threading.current_thread(), shard))
+        return shard
+
+    def observe(self, metric, labels, value):
+        buckets = HISTOGRAMS[metric][1]
+        shard = self.shard()
+        values = shard.get((metric, labels))
+        if values is None:
+            values = shard[(metric, labels)] = [0] * (len(buckets) + 2)
+        values[bisect_left(buckets, value)] += 1
+        values[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            self.retire_finished()
+            shards = [shard for thread, shard in self.shards]
+            merged = {key: list(values) for key, values in self.retired.items()}
+        for shard in shards:
+            for key, values in list(shard.items()):
+                merge_values(merged, key, values)
+        return merged
+
+    def retire_finished(self):
+        """
+        Fold the shards of threads that have exited into `retired` (called with the lock held).
+        """
+        alive = []
+        for thread, shard in self.shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                # thread تمام شده دیگر در shard خود نمی‌نویسد
+                for key, values in shard.items():
+                    merge_values(self.retired, key, values)
+        self.shards = alive
+
+    # _______________________________________ multiprocess _______________________________________
+
+    def flush(self, directory, force=False):
+        """
+        Write this process' totals to its file (at most every METRICS_FLUSH_INTERVAL seconds).
+        """
+        now = time.monotonic()
+        if not force and now - self.last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            return
+        self.last_flush = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        rows = [[metric, [list(pair) for pair in labels], values] for (metric, labels), values in self.snapshot().items()]
+        with open(path + '.tmp', 'w', encoding='utf-8') as stream:
+            json.dump(rows, stream)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+        if not directory:
+            return self.snapshot()
+        self.flush(directory, force=True)
+        merged = {}
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path, encoding='utf-8') as stream:
+                    rows = json.load(stream)
+            except (OSError, ValueError):
+                continue  # فایلی که همین حالا در حال جایگزینی است
+            for metric, labels, values in rows:
+                if metric in HISTOGRAMS:
+                    merge_values(merged, (metric, tuple(tuple(pair) for pair in labels)), values)
+        return merged
+
+
+def merge_values(merged, key, values):
+    total = merged.get(key)
+    if total is None:
+        merged[key] = list(values)
+    else:
+        for index, value in enumerate(values):
+            total[index] += value
+
+
+registry = Registry()
+
+
+def observe(metric, labels, value):
+    registry.observe(metric, labels, value)
+
+
+def render_prometheus(histograms):
+    lines = []
+    by_metric = {}
+    for (metric, labels), values in sorted(histograms.items()):
+        by_metric.setdefault(metric, []).append((labels, values))
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        name = PREFIX + metric
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, values in by_metric.get(metric, []):
+            label_text = ','.join(f'{key}="{escape_label(value)}"' for key, value in labels)
+            separator = ',' if label_text else ''
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], values):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_text}{separator}le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_text}}} {values[-1]}')
+            lines.append(f'{name}_count{{{label_text}}} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# _______________________________________ per request _______________________________________
+
+class RequestMetrics:
+    def __init__(self):
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.active = set()
+        self.labels = (('view', 'unresolved'), ('action', ''))
+        self.render_started = None
+
+
+_current = ContextVar('request_metrics', default=None)
+
+
+@contextmanager
+def timer(phase):
+    """
+    Add the time of the block to `phase` of the current request. Nested timers
+    of the same phase are counted once.
+    """
+    current = _current.get()
+    if current is None or phase in current.active:
+        yield
+        return
+    current.active.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.durations[phase] += time.perf_counter() - started
+        current.active.discard(phase)
+
+
+def timed_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of every connection: counts the query for the request of
+    the current context (also inside the sync_to_async threads of async views).
+    """
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.durations['db'] += time.perf_counter() - started
+        current.queries += 1
+
+
+def instrument(connection, **kwargs):
+    if timed_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_query)
+
+
+def install():
+    """
+    Time serializer.data and SQL everywhere (called once from AppConfig.ready()).
+    """
+    from django.db.backends.signals import connection_created
+    from rest_framework.serializers import BaseSerializer
+
+    # اتصال های async view ها در thread های sync_to_async ساخته می‌شوند
+    connection_created.connect(instrument, dispatch_uid='request-metrics')
+    original = BaseSerializer.data
+    if getattr(original.fget, 'instrumented', False):
+        return
+
+    def data(serializer):
+        with timer('serializer'):
+            return original.fget(serializer)
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+def view_labels(request, view_func):
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    method = request.method.lower()
+    if cls is None:
+        return (('view', f'{view_func.__module__}.{view_func.__name__}'), ('action', method))
+    # ViewSet ها نگاشت متد به اکشن دارند (list, retrieve, gallery, ...)
+    actions = getattr(view_func, 'actions', None) or {}
+    return (('view', cls.__name__), ('action', actions.get(method, method)))
+
+
+def timing_needs_user():
+    """
+    SERVER_TIMING_HEADER: True (everyone), False (nobody) or 'staff' (staff
+    users, everyone under DEBUG). Returns the decision, or None when it
+    depends on request.user.
+    """
+    setting = getattr(settings, 'SERVER_TIMING_HEADER', 'staff')
+    if setting != 'staff':
+        return bool(setting)
+    return True if settings.DEBUG else None
+
+
+def show_server_timing(request):
+    show = timing_needs_user()
+    if show is None:
+        user = getattr(request, 'user', None)
+        show = bool(user is not None and user.is_staff)
+    return show
+
+
+def server_timing(current, total):
+    parts = [f'db;dur={current.durations["db"] * 1000:.1f};desc="{current.queries} queries"']
+    parts += [f'{phase};dur={current.durations[phase] * 1000:.1f}' for phase in PHASES[1:]]
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class RequestMetricsMiddleware:
+    """
+    Sync and async capable, so async views are not pushed through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+        for connection in connections.all():
+            instrument(connection)
+        current = RequestMetrics()
+        token = _current.set(current)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, current, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return await self.get_response(request)
+        current = RequestMetrics()
+        token = _current.set(current)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+        show = timing_needs_user()
+        if show is None and hasattr(request, 'auser'):
+            # request.user بار اول session و کاربر را با کوئری sync می‌خواند
+            show = (await request.auser()).is_staff
+        return self.finish(request, response, current, total, show)
+
+    def finish(self, request, response, current, total, show_timing=None):
+        match = getattr(request, 'resolver_match', None)
+        labels = view_labels(request, match.func) if match is not None else current.labels
+        observe('request_duration_seconds', labels, total)
+        observe('request_queries', labels, current.queries)
+        for phase in PHASES:
+            observe(f'request_{phase}_seconds', labels, current.durations[phase])
+        directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+        if directory:
+            registry.flush(directory)
+        if show_timing is None:
+            show_timing = show_server_timing(request)
+        if show_timing:
+            response['Server-Timing'] = server_timing(current, total)
+        return response
+
+    def process_template_response(self, request, response):
+        current = _current.get()
+        if current is not None:
+            # render بعد از این hook و بیرون از view اجرا می‌شود؛ پایانش با callback ثبت می‌شود
+            current.render_started = time.perf_counter()
+
+            def rendered(response):
+                current.durations['render'] += time.perf_counter() - current.render_started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the collected histograms.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    scraper = bool(token) and request.headers.get('Authorization') == f'Bearer {token}'
+    user = getattr(request, 'user', None)
+    if not scraper and not (user is not None and user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_prometheus(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 06:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0004_rename_value_categoryattribute_description'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_at', 'id'], name='comment_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_date', 'id'], name='product_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpackage',
+            index=models.Index(fields=['created_date', 'id'], name='package_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpackage',
+            index=models.Index(fields=['final_price', 'id'], name='package_price_id_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2 on 2026-10-18 06:59
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def fill_summaries(apps, schema_editor):
+    """
+    Build the summary of every existing product (frozen copy of
+    summary.rebuild_product_summaries() as of this migration), so the product
+    list has prices and ratings without a manual rebuild.
+    """
+    Product = apps.get_model('TechShopApp', 'Product')
+    ProductPackage = apps.get_model('TechShopApp', 'ProductPackage')
+    Comment = apps.get_model('TechShopApp', 'Comment')
+    ProductSummary = apps.get_model('TechShopApp', 'ProductSummary')
+    last_id = 0
+    while True:
+        ids = list(Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:2000])
+        if not ids:
+            break
+        last_id = ids[-1]
+        packages = {
+            row['product_id']: row
+            for row in ProductPackage.objects.filter(is_active_package=True, product_id__in=ids)
+            .order_by().values('product_id').annotate(
+                min_price=Min('final_price'), max_price=Max('final_price'),
+                discount=Max('discount', filter=Q(is_active_discount=True)), quantity=Sum('quantity'),
+            )
+        }
+        reviews = {
+            row['product_id']: row
+            for row in Comment.objects.filter(is_approved=True, parent__isnull=True, product_id__in=ids)
+            .order_by().values('product_id').annotate(total=Sum('rating'), count=Count('id'))
+        }
+        summaries = []
+        for pk in ids:
+            package = packages.get(pk, {})
+            review = reviews.get(pk, {})
+            quantity = package.get('quantity') or 0
+            count = review.get('count') or 0
+            average = Decimal(review.get('total') or 0) / count if count else Decimal(0)
+            summaries.append(ProductSummary(
+                product_id=pk,
+                min_final_price=package.get('min_price') or 0,
+                max_final_price=package.get('max_price') or 0,
+                max_discount=package.get('discount') or 0,
+                total_quantity=quantity,
+                in_stock=quantity > 0,
+                rating_avg=float(average.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)),
+                review_count=count,
+            ))
+        ProductSummary.objects.bulk_create(summaries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='TechShopApp.product', verbose_name='محصول')),
+                ('min_final_price', models.BigIntegerField(default=0, verbose_name='کمترین قیمت نهایی')),
+                ('max_final_price', models.BigIntegerField(default=0, verbose_name='بیشترین قیمت نهایی')),
+                ('max_discount', models.PositiveSmallIntegerField(default=0, verbose_name='بیشترین تخفیف فعال')),
+                ('total_quantity', models.PositiveIntegerField(default=0, verbose_name='موجودی کل')),
+                ('in_stock', models.BooleanField(default=False, verbose_name='موجود')),
+                ('rating_avg', models.FloatField(default=0, verbose_name='میانگین امتیاز')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='تعداد نظرات')),
+                ('updated_date', models.DateTimeField(auto_now=True, verbose_name='آخرین بروزرسانی')),
+            ],
+            options={
+                'verbose_name': 'خلاصه محصول',
+                'verbose_name_plural': 'خلاصه محصولات',
+                'indexes': [models.Index(fields=['min_final_price', 'product'], name='summary_price_idx'), models.Index(fields=['max_final_price', 'product'], name='summary_max_price_idx'), models.Index(fields=['rating_avg', 'product'], name='summary_rating_idx'), models.Index(fields=['max_discount', 'product'], name='summary_discount_idx'), models.Index(fields=['in_stock', 'min_final_price'], name='summary_stock_price_idx')],
+            },
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 07:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0006_productsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='brand',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='TechShopApp.brand', verbose_name='برند'),
+        ),
+        migrations.AddIndex(
+            model_name='productpackage',
+            index=models.Index(fields=['product', 'is_active_package', 'color'], name='package_product_color_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpackage',
+            index=models.Index(fields=['product', 'is_active_package', 'size'], name='package_product_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpackage',
+            index=models.Index(fields=['product', 'is_active_package', 'storage'], name='package_product_storage_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 07:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0007_product_brand_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='کلمه')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='وزن')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='TechShopApp.product', verbose_name='محصول')),
+            ],
+            options={
+                'verbose_name': 'ایندکس جستجو',
+                'verbose_name_plural': 'ایندکس جستجو',
+                'constraints': [models.UniqueConstraint(fields=('term', 'product'), name='search_term_product_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-18 07:07
+
+from django.db import migrations, models
+
+
+def compute_tree_paths(rows):
+    """
+    {id: (tree_path, depth)} from (id, parent_id) pairs, as of this migration
+    (a frozen copy of category_tree.compute_tree_paths()). Categories in a
+    parent cycle or under a missing parent are left out.
+    """
+    parents = dict(rows)
+    paths = {}
+    for pk in parents:
+        chain = []
+        current = pk
+        while current is not None and current not in paths:
+            if current in chain or current not in parents:
+                break
+            chain.append(current)
+            current = parents[current]
+        else:
+            prefix = paths[current][0] if current is not None else ''
+            for node in reversed(chain):
+                prefix = f"{prefix}{node}/"
+                paths[node] = (prefix, prefix.count('/') - 1)
+    return paths
+
+
+def fill_tree_paths(apps, schema_editor):
+    Category = apps.get_model('TechShopApp', 'Category')
+    paths = compute_tree_paths(Category.objects.values_list('id', 'parent_id'))
+    categories = [Category(pk=pk, tree_path=path, depth=depth) for pk, (path, depth) in paths.items()]
+    Category.objects.bulk_update(categories, ['tree_path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0008_searchindexentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='عمق'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='tree_path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255, verbose_name='مسیر درخت'),
+        ),
+        migrations.RunPython(fill_tree_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0009_category_tree_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100, verbose_name='مدل')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='شناسه ردیف')),
+                ('field_name', models.CharField(max_length=50, verbose_name='فیلد')),
+                ('file_name', models.CharField(max_length=255, verbose_name='فایل')),
+                ('width', models.PositiveIntegerField(verbose_name='عرض')),
+                ('height', models.PositiveIntegerField(verbose_name='ارتفاع')),
+                ('mode', models.CharField(choices=[('thumbnail', 'کوچک کردن با حفظ نسبت'), ('resize', 'تغییر اندازه دقیق')], default='thumbnail', max_length=10, verbose_name='نوع')),
+                ('status', models.CharField(choices=[('pending', 'در صف'), ('running', 'در حال پردازش'), ('done', 'انجام شده'), ('failed', 'خطا')], default='pending', max_length=10, verbose_name='وضعیت')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('error', models.TextField(blank=True, default='', verbose_name='خطا')),
+                ('created_date', models.DateTimeField(auto_now_add=True, verbose_name='زمان ثبت')),
+                ('updated_date', models.DateTimeField(auto_now=True, verbose_name='آخرین تغییر')),
+            ],
+            options={
+                'verbose_name': 'کار پردازش تصویر',
+                'verbose_name_plural': 'کارهای پردازش تصویر',
+                'indexes': [models.Index(fields=['status', 'id'], name='imagejob_status_idx')],
+            },
+        ),
+    ]
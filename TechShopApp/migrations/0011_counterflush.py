@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0010_imagejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=100, unique=True, verbose_name='شناسه batch')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='تعداد ردیف ها')),
+                ('created_date', models.DateTimeField(auto_now_add=True, verbose_name='زمان اعمال')),
+            ],
+            options={
+                'verbose_name': 'اعمال شمارنده',
+                'verbose_name_plural': 'اعمال شمارنده ها',
+            },
+        ),
+    ]
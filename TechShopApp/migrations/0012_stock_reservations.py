@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-18 07:15
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0011_counterflush'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('reserved', 'رزرو شده'), ('confirmed', 'نهایی شده'), ('released', 'آزاد شده')], default='reserved', max_length=10, verbose_name='وضعیت')),
+                ('expires_at', models.DateTimeField(verbose_name='زمان انقضا')),
+                ('created_date', models.DateTimeField(auto_now_add=True, verbose_name='زمان ثبت')),
+                ('updated_date', models.DateTimeField(auto_now=True, verbose_name='آخرین تغییر')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_reservations', to=settings.AUTH_USER_MODEL, verbose_name='کاربر')),
+            ],
+            options={
+                'verbose_name': 'رزرو موجودی',
+                'verbose_name_plural': 'رزروهای موجودی',
+            },
+        ),
+        migrations.CreateModel(
+            name='StockReservationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='تعداد')),
+                ('package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservation_items', to='TechShopApp.productpackage', verbose_name='بسته')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='TechShopApp.stockreservation', verbose_name='رزرو')),
+            ],
+            options={
+                'verbose_name': 'قلم رزرو',
+                'verbose_name_plural': 'اقلام رزرو',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockreservationitem',
+            constraint=models.UniqueConstraint(fields=('reservation', 'package'), name='reservation_package_uniq'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 07:24
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def rating_average(rating_sum, review_count):
+    # نسخه ثابت summary.rating_average در زمان این migration (گرد کردن half-up)
+    if not review_count:
+        return 0.0
+    return float((Decimal(rating_sum) / Decimal(review_count)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def fill_rating_sums(apps, schema_editor):
+    Comment = apps.get_model('TechShopApp', 'Comment')
+    ProductSummary = apps.get_model('TechShopApp', 'ProductSummary')
+    ProductPackage = apps.get_model('TechShopApp', 'ProductPackage')
+    rows = (
+        Comment.objects.filter(is_approved=True, parent__isnull=True).order_by()
+        .values('product_id').annotate(total=Sum('rating'), count=Count('id'))
+    )
+    for row in rows:
+        average = rating_average(row['total'] or 0, row['count'])
+        ProductSummary.objects.filter(product_id=row['product_id']).update(
+            rating_sum=row['total'] or 0, review_count=row['count'], rating_avg=average,
+        )
+        # ProductPackage.rating تا الان هیچ وقت بروز نمی‌شد
+        ProductPackage.objects.filter(product_id=row['product_id']).update(rating=average)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0012_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsummary',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='مجموع امتیازها'),
+        ),
+        migrations.RunPython(fill_rating_sums, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 07:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_roots(apps, schema_editor):
+    Comment = apps.get_model('TechShopApp', 'Comment')
+    parents = dict(Comment.objects.filter(parent__isnull=False).values_list('id', 'parent_id'))
+    replies = []
+    for pk, parent_id in parents.items():
+        root = parent_id
+        while root in parents:
+            root = parents[root]
+        replies.append(Comment(pk=pk, root_id=root))
+    Comment.objects.bulk_update(replies, ['root'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0013_product_rating_sum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_replies', to='TechShopApp.comment', verbose_name='نظر اصلی'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['product', 'is_approved', 'parent', 'created_at'], name='comment_thread_idx'),
+        ),
+        migrations.RunPython(fill_roots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 07:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechShopApp', '0014_comment_threads'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['product', 'created_at'], name='comment_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['user', 'created_at'], name='comment_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'created_date'], name='product_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productattribute',
+            index=models.Index(fields=['product', 'attribute'], name='attribute_product_attr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpackage',
+            index=models.Index(fields=['product', 'final_price'], name='package_product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpackage',
+            index=models.Index(fields=['product', 'created_date'], name='package_product_created_idx'),
+        ),
+    ]
@@ -5,8 +5,10 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.crypto import get_random_string
 import os
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from PIL import Image  # pillow
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from colorfield.fields import ColorField
 
 # Create your models here.
@@ -54,31 +56,97 @@ def upload_slider_image_path(instance, filename):
     final_name = f"slider-{unique_id}{ext}"
     return f"slider-images/{final_name}"
 
+# پردازش تصویر در پس زمینه
+class ImageJobMixin:
+    """
+    مدل هایی که تصویرشان باید کوچک شود. به جای باز کردن تصویر با Pillow داخل save()،
+    فقط وقتی فایل واقعا عوض شده یک ImageJob ثبت می‌شود و بعد از commit در پس زمینه اجرا می‌شود
+    (TechShopApp/images.py).
+
+    image_jobs = {'field_name': ((width, height), 'thumbnail' | 'resize')}
+    """
+    image_jobs = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original_image_names = {
+            field: values[field_names.index(field)] for field in cls.image_jobs if field in field_names
+        }
+        return instance
+
+    def queue_image_jobs(self):
+        from .images import enqueue_image_job
+        from .metrics import timer
+
+        originals = getattr(self, '_original_image_names', {})
+        with timer('image'):
+            for field, (size, mode) in self.image_jobs.items():
+                file = getattr(self, field)
+                if file and file.name != originals.get(field):
+                    enqueue_image_job(self, field, size, mode)
+        self._original_image_names = {field: getattr(self, field).name for field in self.image_jobs}
+
+
+class ImageJob(models.Model):
+    PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (PENDING, "در صف"),
+        (RUNNING, "در حال پردازش"),
+        (DONE, "انجام شده"),
+        (FAILED, "خطا"),
+    ]
+    MODE_CHOICES = [
+        ("thumbnail", "کوچک کردن با حفظ نسبت"),
+        ("resize", "تغییر اندازه دقیق"),
+    ]
+    model_label = models.CharField(max_length=100, verbose_name="مدل")
+    object_id = models.PositiveBigIntegerField(verbose_name="شناسه ردیف")
+    field_name = models.CharField(max_length=50, verbose_name="فیلد")
+    file_name = models.CharField(max_length=255, verbose_name="فایل")
+    width = models.PositiveIntegerField(verbose_name="عرض")
+    height = models.PositiveIntegerField(verbose_name="ارتفاع")
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default="thumbnail", verbose_name="نوع")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="وضعیت")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="تعداد تلاش")
+    error = models.TextField(blank=True, default='', verbose_name="خطا")
+    created_date = models.DateTimeField(auto_now_add=True, verbose_name="زمان ثبت")
+    updated_date = models.DateTimeField(auto_now=True, verbose_name="آخرین تغییر")
+
+    class Meta:
+        verbose_name = "کار پردازش تصویر"
+        verbose_name_plural = "کارهای پردازش تصویر"
+        indexes = [
+            models.Index(fields=['status', 'id'], name='imagejob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_label}:{self.object_id} {self.file_name} ({self.status})"
+
+
 # مدل دسته‌بندی اصلی
-class BaseCategorys(models.Model):
+class BaseCategorys(ImageJobMixin, models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name="اسم  --  فارسی --  دسته بندی اصلی")
     en_name = models.CharField(max_length=50, unique=True, verbose_name="اسم- --انگلیسی-- دسته بندی اصلی")
     description = models.TextField(verbose_name="توضیحات دسته بندی اصلی")
     image = models.ImageField(upload_to=upload_BaseCategory_image_path, verbose_name="عکس دسته بندی اصلی", blank=True, null=True)
     brands = models.ManyToManyField('Brand', verbose_name="برند های دسته بندی", related_name='base_categories', blank=True)
 
+    image_jobs = {'image': ((300, 300), 'thumbnail')}
+
     class Meta:
         verbose_name = "دسته بندی  اصلی "
         verbose_name_plural = "دسته بندی های اصلی"
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.image and hasattr(self.image, 'path') and os.path.isfile(self.image.path):
-            img = Image.open(self.image.path)
-            output_size = (300,300)
-            img.thumbnail(output_size, Image.LANCZOS)
-            img.save(self.image.path)
+        self.queue_image_jobs()
 
     def __str__(self):
         return self.name
 
 # مدل دسته بندی
-class Category(models.Model):
+class Category(ImageJobMixin, models.Model):
     parent = models.ForeignKey('self', on_delete=models.CASCADE, blank=True, null=True, verbose_name="دسته بندی والد", related_name='subcategories')
     base_catgory = models.ForeignKey(BaseCategorys, verbose_name="دسته بندی اصلی", on_delete=models.CASCADE, related_name='categories')
     
@@ -87,40 +155,78 @@ class Category(models.Model):
     en_name = models.CharField(max_length=20, unique=True, verbose_name="نام دسته بندی ---انگلیسی")
     description = models.TextField(verbose_name="توضیحات دسته بندی")
     image = models.ImageField(upload_to=upload_cat_image_path, verbose_name="عکس دسته بندی", blank=True, null=True)
+    # مسیر materialized درخت: شناسه همه اجداد و خود دسته، مثلا "1/5/12/"
+    # زیر درخت هر دسته با یک کوئری tree_path__startswith پیدا می‌شود
+    tree_path = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True, verbose_name="مسیر درخت")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="عمق")
+
+    image_jobs = {'image': ((300, 300), 'thumbnail')}
 
     class Meta:
         verbose_name = "دسته بندی"
         verbose_name_plural = "دسته بندی ها"
 
+    def clean(self):
+        super().clean()
+        if self.pk and self.parent_id and self.parent_id in self.get_descendant_ids(include_self=True):
+            raise ValidationError({'parent': "دسته بندی نمی‌تواند زیر مجموعه خودش باشد"})
+
+    def get_descendant_ids(self, include_self=False):
+        queryset = Category.objects.filter(tree_path__startswith=self.tree_path) if self.tree_path else Category.objects.filter(pk=self.pk)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return set(queryset.values_list('pk', flat=True))
+
     def save(self, *args, **kwargs):
+        parent_path = ''
+        if self.parent_id:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('tree_path', flat=True).first() or ''
+        if self.pk:
+            # مسیر ذخیره شده را دوباره می‌خوانیم چون ممکن است یکی از اجداد جابجا شده باشد
+            self.tree_path = Category.objects.filter(pk=self.pk).values_list('tree_path', flat=True).first() or ''
+            if self.parent_id == self.pk or (self.tree_path and parent_path.startswith(self.tree_path)):
+                raise ValidationError({'parent': "دسته بندی نمی‌تواند زیر مجموعه خودش باشد"})
         super().save(*args, **kwargs)
-        if self.image and hasattr(self.image, 'path') and os.path.isfile(self.image.path):
-            img = Image.open(self.image.path)
-            output_size = (300,300)
-            img.thumbnail(output_size, Image.LANCZOS)
-            img.save(self.image.path)
+        self.move_tree_path(parent_path)
+        self.queue_image_jobs()
+
+    def move_tree_path(self, parent_path):
+        """
+        Store this category's path and rewrite the paths of its whole subtree
+        with one UPDATE when the category was moved.
+        """
+        old_path = self.tree_path
+        new_path = f"{parent_path}{self.pk}/"
+        if new_path == old_path:
+            return
+        depth = new_path.count('/') - 1
+        Category.objects.filter(pk=self.pk).update(tree_path=new_path, depth=depth)
+        if old_path:
+            Category.objects.filter(tree_path__startswith=old_path).exclude(pk=self.pk).update(
+                tree_path=Concat(Value(new_path), Substr('tree_path', len(old_path) + 1)),
+                depth=F('depth') + (depth - (old_path.count('/') - 1)),
+            )
+        self.tree_path, self.depth = new_path, depth
 
     def __str__(self):
         return self.name
 
 # مدل برند
-class Brand(models.Model):
+class Brand(ImageJobMixin, models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name="نام ---فارسی")
     en_name = models.CharField(max_length=50, unique=True, verbose_name="نام ---انگلیسی")
     logo = models.ImageField(upload_to=upload_brand_image_path, verbose_name="لوگو برند", blank=True, null=True)
     category = models.ManyToManyField(Category, blank=True, verbose_name="دسته بندی")
 
+    image_jobs = {'logo': ((300, 300), 'thumbnail')}
+
     class Meta:
         verbose_name = "برند"
         verbose_name_plural = "برندها"
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.logo and hasattr(self.logo, 'path') and os.path.isfile(self.logo.path):
-            img = Image.open(self.logo.path)
-            output_size = (300,300)
-            img.thumbnail(output_size, Image.LANCZOS)
-            img.save(self.logo.path)
+        self.queue_image_jobs()
 
     def __str__(self):
         return self.en_name
@@ -206,11 +312,12 @@ class CategoryAttribute(models.Model):
     def __str__(self):
         return f"{self.title} - {self.category.name}"
 
-class Product(models.Model):
+class Product(ImageJobMixin, models.Model):
     name = models.CharField(max_length=150, unique= True, verbose_name="نام محصول")
     description = models.TextField(verbose_name="توضیحات")
     is_active = models.BooleanField(default=False, verbose_name="موجود")
     categories = models.ManyToManyField('Category', verbose_name="دسته بندی")
+    brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, blank=True, related_name='products', verbose_name="برند")
     attributes = models.ManyToManyField('ProductAttribute', verbose_name="ویژگی ها", related_name='products', blank=True)
 # _________________________________________________*price*_____________________________________________________
     
@@ -218,24 +325,25 @@ class Product(models.Model):
     updated_date = models.DateTimeField(auto_now=True, verbose_name="آخرین تغییر")
     image = models.ImageField(upload_to='uploads/', verbose_name="عکس", blank=True, null=True)  # مسیر بارگذاری تصویر را تنظیم کنید
 
+    image_jobs = {'image': ((800, 800), 'resize')}
+
     class Meta:
         verbose_name = "محصول"
         verbose_name_plural = "محصولات"
+        indexes = [
+            # کلیدهای صفحه بندی keyset
+            models.Index(fields=['created_date', 'id'], name='product_created_id_idx'),
+            # محصولات فعال به ترتیب جدیدترین
+            models.Index(fields=['is_active', 'created_date'], name='product_active_created_idx'),
+        ]
 
     def __str__(self):
         return f"نام محصول: {self.name}"
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        # باز کردن تصویر
-        if self.image and hasattr(self.image, 'path') and os.path.isfile(self.image.path):
-            img = Image.open(self.image.path)
-            # تنظیم ابعاد جدید
-            output_size = (800, 800)
-            # تغییر اندازه تصویر به ابعاد مشخص
-            img = img.resize(output_size, Image.LANCZOS)  # استفاده از LANCZOS برای کیفیت بهتر
-            # ذخیره تصویر با ابعاد جدید
-            img.save(self.image.path)
+        # تغییر اندازه تصویر به 800x800 در پس زمینه انجام می‌شود
+        self.queue_image_jobs()
 
 class ProductPackage(models.Model):
     product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='product_packages')
@@ -281,6 +389,18 @@ class ProductPackage(models.Model):
     class Meta:
         verbose_name = " ویژگی های محصول"
         verbose_name_plural = " ویژگی های محصولات"
+        indexes = [
+            # کلیدهای صفحه بندی keyset
+            models.Index(fields=['created_date', 'id'], name='package_created_id_idx'),
+            models.Index(fields=['final_price', 'id'], name='package_price_id_idx'),
+            # فیلتر و شمارش facet ها روی بسته های هر محصول
+            models.Index(fields=['product', 'is_active_package', 'color'], name='package_product_color_idx'),
+            models.Index(fields=['product', 'is_active_package', 'size'], name='package_product_size_idx'),
+            models.Index(fields=['product', 'is_active_package', 'storage'], name='package_product_storage_idx'),
+            # بسته های یک محصول (?product_id=) مرتب شده با کلیدهای صفحه بندی
+            models.Index(fields=['product', 'final_price'], name='package_product_price_idx'),
+            models.Index(fields=['product', 'created_date'], name='package_product_created_idx'),
+        ]
 
     def __str__(self):
         size_str = self.size.size if self.size else "بدون سایز"
@@ -292,13 +412,15 @@ class ProductPackage(models.Model):
     def discounted_price(self):
         return (self.price * self.discount) / 100
     
+    @staticmethod
+    def calculate_final_price(price, discount, is_active_discount):
+        # محاسبه قیمت نهایی با توجه به تخفیف (برای save و نوشتن های bulk)
+        if is_active_discount and discount and discount > 0:
+            return price - int((price * discount) / 100)
+        return price
+
     def save(self, *args, **kwargs):
-        # محاسبه قیمت نهایی با توجه به تخفیف
-        if self.is_active_discount and self.discount > 0:
-            self.final_price = self.price - int((self.price * self.discount) / 100)
-        else:
-            self.final_price = self.price
-            
+        self.final_price = self.calculate_final_price(self.price, self.discount, self.is_active_discount)
         super().save(*args, **kwargs)
     
 class ProductAttribute(models.Model):
@@ -309,16 +431,22 @@ class ProductAttribute(models.Model):
     class Meta:
         verbose_name = "ویژگی محصول"
         verbose_name_plural = "ویژگی های محصول"
+        indexes = [
+            # مقدار یک ویژگی از یک محصول (ورود گروهی و فیلترها)
+            models.Index(fields=['product', 'attribute'], name='attribute_product_attr_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.attribute.title} - {self.value}"
 
-class Gallery(models.Model):
+class Gallery(ImageJobMixin, models.Model):
 
     product = models.ForeignKey(Product,on_delete=models.CASCADE,verbose_name="محصول")
 
     image = models.ImageField(upload_to=upload_image_path,verbose_name="عکس", blank=True, null=True)
 
+    image_jobs = {'image': ((800, 800), 'resize')}
+
     class Meta :
         verbose_name ="عکس"
         verbose_name_plural = "گالری"
@@ -328,16 +456,14 @@ class Gallery(models.Model):
         
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if self.image and hasattr(self.image, 'path') and os.path.isfile(self.image.path):
-            img = Image.open(self.image.path)
-            output_size = (800, 800)
-            img = img.resize(output_size, Image.LANCZOS)
-            img.save(self.image.path)
+        self.queue_image_jobs()
 
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="کاربر")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="محصول")
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies', verbose_name="پاسخ به")
+    # نظر اصلی (سطح اول) رشته؛ کل درخت پاسخ ها با یک کوئری روی root خوانده می‌شود
+    root = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name='thread_replies', verbose_name="نظر اصلی")
     text = models.TextField(verbose_name="متن نظر")
     rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)], verbose_name="امتیاز")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="زمان ثبت")
@@ -349,10 +475,169 @@ class Comment(models.Model):
         verbose_name = "نظر"
         verbose_name_plural = "نظرات"
         ordering = ['-created_at']
+        indexes = [
+            # کلیدهای صفحه بندی keyset
+            models.Index(fields=['created_at', 'id'], name='comment_created_id_idx'),
+            # نظرات اصلی تایید شده هر محصول به ترتیب زمان (id در InnoDB خودش انتهای index است)
+            models.Index(fields=['product', 'is_approved', 'parent', 'created_at'], name='comment_thread_idx'),
+            # نظرات یک محصول / یک کاربر، جدیدترین اول
+            models.Index(fields=['product', 'created_at'], name='comment_product_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='comment_user_created_idx'),
+        ]
         
     def __str__(self):
         return f"{self.user.username} - {self.product.name} - {self.rating}★"
 
+    def save(self, *args, **kwargs):
+        adding, old_root_id = self._state.adding, self.root_id
+        if self.parent_id:
+            parent_root = Comment.objects.filter(pk=self.parent_id).values_list('root_id', flat=True).first()
+            self.root_id = parent_root or self.parent_id
+        else:
+            self.root_id = None
+        super().save(*args, **kwargs)
+        if not adding and self.root_id != old_root_id:
+            self.move_thread()
+
+    def move_thread(self):
+        """
+        Point every reply below this comment at its new root (only after a re-parent).
+        """
+        new_root = self.root_id or self.pk
+        level = [self.pk]
+        while level:
+            level = list(Comment.objects.filter(parent_id__in=level).values_list('pk', flat=True))
+            Comment.objects.filter(pk__in=level).update(root_id=new_root)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # وضعیت ذخیره شده برای بروزرسانی افزایشی امتیاز محصول (TechShopApp/ratings.py)
+        if all(name in field_names for name in ('product_id', 'rating', 'is_approved', 'parent_id')):
+            instance._review_state = instance.review_state()
+        return instance
+
+    def review_state(self):
+        """
+        (product_id, rating) when this comment counts in the product rating, otherwise None.
+        """
+        if self.is_approved and self.parent_id is None:
+            return (self.product_id, self.rating)
+        return None
+
+
+class ProductSummary(models.Model):
+    """
+    جدول خلاصه (denormalized) هر محصول برای فیلتر و مرتب سازی سریع لیست محصولات.
+    مقادیر از روی ProductPackage و Comment محاسبه می‌شوند و نباید دستی ویرایش شوند
+    (به TechShopApp/summary.py و دستور rebuild_product_summaries مراجعه کنید).
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='summary', verbose_name="محصول")
+    min_final_price = models.BigIntegerField(default=0, verbose_name="کمترین قیمت نهایی")
+    max_final_price = models.BigIntegerField(default=0, verbose_name="بیشترین قیمت نهایی")
+    max_discount = models.PositiveSmallIntegerField(default=0, verbose_name="بیشترین تخفیف فعال")
+    total_quantity = models.PositiveIntegerField(default=0, verbose_name="موجودی کل")
+    in_stock = models.BooleanField(default=False, verbose_name="موجود")
+    rating_avg = models.FloatField(default=0, verbose_name="میانگین امتیاز")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="مجموع امتیازها")
+    review_count = models.PositiveIntegerField(default=0, verbose_name="تعداد نظرات")
+    updated_date = models.DateTimeField(auto_now=True, verbose_name="آخرین بروزرسانی")
+
+    class Meta:
+        verbose_name = "خلاصه محصول"
+        verbose_name_plural = "خلاصه محصولات"
+        indexes = [
+            models.Index(fields=['min_final_price', 'product'], name='summary_price_idx'),
+            models.Index(fields=['max_final_price', 'product'], name='summary_max_price_idx'),
+            models.Index(fields=['rating_avg', 'product'], name='summary_rating_idx'),
+            models.Index(fields=['max_discount', 'product'], name='summary_discount_idx'),
+            models.Index(fields=['in_stock', 'min_final_price'], name='summary_stock_price_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.min_final_price} - {self.total_quantity}"
+
+
+class SearchIndexEntry(models.Model):
+    """
+    ایندکس معکوس جستجو: هر ردیف یعنی «کلمه term در محصول product با وزن weight آمده است».
+    توسط TechShopApp/search.py ساخته می‌شود و نباید دستی ویرایش شود.
+    """
+    term = models.CharField(max_length=64, verbose_name="کلمه")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_entries', verbose_name="محصول")
+    weight = models.PositiveIntegerField(default=1, verbose_name="وزن")
+
+    class Meta:
+        verbose_name = "ایندکس جستجو"
+        verbose_name_plural = "ایندکس جستجو"
+        constraints = [
+            # index (term, product) هم برای جستجوی دقیق و هم پیشوندی استفاده می‌شود
+            models.UniqueConstraint(fields=['term', 'product'], name='search_term_product_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} - {self.product_id} ({self.weight})"
+
 
+class CounterFlush(models.Model):
+    """
+    هر batch از شمارنده های بافر شده (TechShopApp/counters.py) فقط یک بار روی دیتابیس اعمال می‌شود؛
+    batch_id در همان تراکنش UPDATE ها ثبت می‌شود تا اعمال دوباره بعد از crash ممکن نباشد.
+    """
+    batch_id = models.CharField(max_length=100, unique=True, verbose_name="شناسه batch")
+    rows = models.PositiveIntegerField(default=0, verbose_name="تعداد ردیف ها")
+    created_date = models.DateTimeField(auto_now_add=True, verbose_name="زمان اعمال")
 
+    class Meta:
+        verbose_name = "اعمال شمارنده"
+        verbose_name_plural = "اعمال شمارنده ها"
 
+    def __str__(self):
+        return f"{self.batch_id} ({self.rows})"
+
+
+class StockReservation(models.Model):
+    """
+    رزرو موجودی بسته ها (TechShopApp/inventory.py). موجودی در لحظه رزرو کم می‌شود و اگر رزرو
+    تا expires_at نهایی (checkout) نشود، با دستور release_expired_reservations برگردانده می‌شود.
+    """
+    RESERVED = 'reserved'
+    CONFIRMED = 'confirmed'
+    RELEASED = 'released'
+    STATUS_CHOICES = [
+        (RESERVED, "رزرو شده"),
+        (CONFIRMED, "نهایی شده"),
+        (RELEASED, "آزاد شده"),
+    ]
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_reservations', verbose_name="کاربر")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=RESERVED, verbose_name="وضعیت")
+    expires_at = models.DateTimeField(verbose_name="زمان انقضا")
+    created_date = models.DateTimeField(auto_now_add=True, verbose_name="زمان ثبت")
+    updated_date = models.DateTimeField(auto_now=True, verbose_name="آخرین تغییر")
+
+    class Meta:
+        verbose_name = "رزرو موجودی"
+        verbose_name_plural = "رزروهای موجودی"
+        indexes = [
+            # پیدا کردن رزروهای منقضی شده
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} - {self.get_status_display()} - {self.expires_at}"
+
+
+class StockReservationItem(models.Model):
+    reservation = models.ForeignKey(StockReservation, on_delete=models.CASCADE, related_name='items', verbose_name="رزرو")
+    package = models.ForeignKey(ProductPackage, on_delete=models.CASCADE, related_name='reservation_items', verbose_name="بسته")
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)], verbose_name="تعداد")
+
+    class Meta:
+        verbose_name = "قلم رزرو"
+        verbose_name_plural = "اقلام رزرو"
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'package'], name='reservation_package_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.reservation_id} - {self.package_id} x {self.quantity}"
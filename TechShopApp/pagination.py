@@ -0,0 +1,209 @@
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over (ordering field, id).
+
+    Every page is fetched with `WHERE (field, id) > (last_field, last_id)
+    ORDER BY field, id LIMIT n`, so the cost stays O(page size) at any depth
+    and rows inserted while a client pages through the list never shift or
+    duplicate the rows it has not seen yet.
+
+    The view chooses the allowed keys:
+    - cursor_ordering_fields: fields allowed in ?ordering= (default: ('id',))
+    - cursor_ordering: default ordering, e.g. '-created_date' (default: 'id')
+
+    Query params:
+    - ?cursor=<opaque>      position returned in next/previous
+    - ?ordering=-final_price
+    - ?page_size=50         capped by max_page_size
+    - ?with_count=1         add a cached total `count` to the response
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size_query_param = 'page_size'
+    count_query_param = 'with_count'
+    page_size = getattr(settings, 'REST_FRAMEWORK', {}).get('PAGE_SIZE') or 20
+    max_page_size = 200
+    count_cache_timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        self.count = self.get_count(queryset) if self.wants_count(request) else None
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views: the page is read with aiterator().
+        Prefetches are left to the caller (aprefetch_related_objects()).
+        """
+        page_queryset = self.page_queryset(queryset, request, view)
+        self.count = await self.aget_count(queryset) if self.wants_count(request) else None
+        return self.set_page([row async for row in page_queryset.aiterator()])
+
+    def page_queryset(self, queryset, request, view):
+        """
+        The filtered and ordered slice of limit + 1 rows of the requested page.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, view)
+
+        self.cursor = self.decode_cursor(request)
+        self.backwards = bool(self.cursor and self.cursor['r'])
+        # وقتی به عقب می‌رویم ترتیب را برعکس می‌کنیم و در پایان نتیجه را برمی‌گردانیم
+        descending = self.descending != self.backwards
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self.after(self.cursor['v'], self.cursor['id'], descending))
+        prefix = '-' if descending else ''
+        return queryset.order_by(prefix + self.field, prefix + 'id')[:self.limit + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.backwards:
+            rows.reverse()
+
+        self.page = rows
+        if self.backwards:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return rows
+
+    def get_paginated_response(self, data):
+        fields = []
+        if self.count is not None:
+            fields.append(('count', self.count))
+        fields += [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]
+        return Response(OrderedDict(fields))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # _______________________________________ ordering / size _______________________________________
+
+    def get_ordering(self, request, view):
+        allowed = getattr(view, 'cursor_ordering_fields', ('id',))
+        default = getattr(view, 'cursor_ordering', 'id')
+        ordering = request.query_params.get(self.ordering_query_param) or default
+        field = ordering.lstrip('-')
+        if field not in allowed and field != 'id':
+            ordering = default
+            field = ordering.lstrip('-')
+        return field, ordering.startswith('-')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def after(self, value, pk, descending):
+        """
+        Row-value comparison `(field, id) > (value, pk)` spelled out for the ORM.
+        """
+        op = 'lt' if descending else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{op}': pk})
+        return Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+
+    # _______________________________________ count _______________________________________
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_count(self, queryset):
+        """
+        COUNT(*) is only computed once per filtered query and cache window.
+        """
+        key = self.count_key(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.order_by().count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    async def aget_count(self, queryset):
+        key = self.count_key(queryset)
+        count = await cache.aget(key)
+        if count is None:
+            count = await queryset.order_by().acount()
+            await cache.aset(key, count, self.count_cache_timeout)
+        return count
+
+    def count_key(self, queryset):
+        sql = str(queryset.order_by().query)
+        return 'keyset-count:' + hashlib.md5(sql.encode()).hexdigest()
+
+    # _______________________________________ cursor encoding _______________________________________
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            cursor['id'] = int(cursor['id'])
+            cursor['r'] = bool(cursor.get('r'))
+            if cursor.get('f') != self.field:
+                raise ValueError
+            if isinstance(cursor['v'], str):
+                cursor['v'] = parse_datetime(cursor['v']) or cursor['v']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, row, reverse):
+        # ردیف ها می‌توانند نمونه مدل یا dict حاصل values() باشند (fast_serializers)
+        if isinstance(row, dict):
+            value, pk = row[self.field], row['pk']
+        else:
+            value, pk = getattr(row, self.field), row.pk
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps({'f': self.field, 'v': value, 'id': pk, 'r': reverse}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
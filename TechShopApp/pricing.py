@@ -0,0 +1,98 @@
+"""
+Set-based price and discount changes for ProductPackage.
+
+bulk_update_prices() changes price / discount / is_active_discount of every
+selected package with one UPDATE and recomputes final_price in the same
+statement, with the same rounding as ProductPackage.calculate_final_price():
+
+    final_price = price - FLOOR(price * discount / 100)   if the discount is active
+    final_price = price                                    otherwise
+
+final_price is computed from the *new* values as expressions over the old
+columns and is the first column in the SET list: MySQL evaluates SET
+assignments left to right and would otherwise read the already updated price.
+"""
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Exists, F, OuterRef, Q, Value, When
+from django.db.models.functions import Floor, Round
+
+from .facets import category_descendants
+from .models import Product, ProductPackage
+from .summary import refresh_product_summaries
+
+SUMMARY_BATCH = 2000
+
+
+def final_price_expression(price, discount, is_active_discount):
+    """
+    SQL for final_price. `discount` / `is_active_discount` are either Python
+    values (the new constant) or None to use the row's current column.
+    """
+    discount_sql = F('discount') if discount is None else Value(discount)
+    discounted = price - Floor(price * discount_sql / 100, output_field=BigIntegerField())
+
+    condition = Q()
+    if is_active_discount is None:
+        condition &= Q(is_active_discount=True)
+    elif not is_active_discount:
+        return price
+    if discount is None:
+        condition &= Q(discount__gt=0)
+    elif discount <= 0:
+        return price
+    if not condition:
+        return discounted
+    return Case(When(condition, then=discounted), default=price, output_field=BigIntegerField())
+
+
+def select_packages(ids=None, categories=None, brands=None, products=None):
+    """
+    Packages matching every given selector. Conditions are subqueries on other
+    tables (never joins) so the UPDATE stays a single statement on MySQL.
+    """
+    queryset = ProductPackage.objects.all()
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    if products:
+        queryset = queryset.filter(product_id__in=products)
+    if brands:
+        queryset = queryset.filter(product_id__in=Product.objects.filter(brand_id__in=brands).values('pk'))
+    if categories:
+        queryset = queryset.filter(Exists(Product.categories.through.objects.filter(
+            product_id=OuterRef('product_id'), category_id__in=category_descendants(categories),
+        )))
+    return queryset
+
+
+def bulk_update_prices(queryset, price=None, percent=None, discount=None, is_active_discount=None):
+    """
+    Apply the changes to every package of `queryset` in one transaction and
+    return the number of updated packages.
+
+    price      new absolute price
+    percent    relative change, e.g. 10 or -7.5 (rounded to whole units)
+    discount / is_active_discount   new values
+    """
+    if price is not None:
+        new_price = Value(price, output_field=BigIntegerField())
+    elif percent is not None:
+        new_price = Round(F('price') * (100 + percent) / 100, output_field=BigIntegerField())
+    else:
+        new_price = F('price')
+
+    # final_price باید اولین ستون SET باشد (ترتیب ارزیابی MySQL)
+    changes = {'final_price': final_price_expression(new_price, discount, is_active_discount)}
+    if price is not None or percent is not None:
+        changes['price'] = new_price
+    if discount is not None:
+        changes['discount'] = discount
+    if is_active_discount is not None:
+        changes['is_active_discount'] = is_active_discount
+
+    with transaction.atomic():
+        product_ids = list(queryset.order_by().values_list('product_id', flat=True).distinct())
+        updated = queryset.update(**changes)
+        # سیگنال ها برای update اجرا نمی‌شوند؛ خلاصه قیمت محصولات دستی بروز می‌شود
+        for start in range(0, len(product_ids), SUMMARY_BATCH):
+            refresh_product_summaries(product_ids[start:start + SUMMARY_BATCH])
+    return updated
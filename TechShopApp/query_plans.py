@@ -0,0 +1,122 @@
+"""
+EXPLAIN checks for the hot ORM queries.
+
+critical_queries() lists the access patterns the API depends on (package and
+comment lists of a product, review threads, keyset pages, ...). plan_problems()
+runs EXPLAIN on a queryset and reports a full table scan or a sort that the
+index does not cover (filesort / temp B-tree), so a dropped or reordered index
+shows up as a failing test (TechShopApp/tests.py) or as a non-zero exit of
+`manage.py check_query_plans` against the real database.
+
+The literal ids and values in the queries do not matter: the plan is chosen
+from the shape of the query and the indexes. Only sqlite and MySQL plans are
+parsed; on other databases nothing is checked and the command says so.
+"""
+import json
+import re
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import (
+    Comment, Gallery, Product, ProductAttribute, ProductPackage, ProductSummary, StockReservation
+)
+
+PAGE = 20
+# جستجو با چند مقدار (IN) همیشه مرتب سازی دارد؛ اینجا فقط پاسخ های یک صفحه مرتب می‌شوند
+SORT_ALLOWED = {'reply trees of a page'}
+SUPPORTED_VENDORS = ('sqlite', 'mysql')
+
+
+def supported():
+    return connection.vendor in SUPPORTED_VENDORS
+
+
+def critical_queries():
+    """
+    {name: queryset} of the queries that must stay index-only.
+    """
+    now = timezone.now()
+    return {
+        'packages of a product': ProductPackage.objects.filter(product_id=1).order_by('id'),
+        'packages of a product by price': ProductPackage.objects.filter(product_id=1).order_by('-final_price', '-id')[:PAGE],
+        'package keyset page by price': ProductPackage.objects.filter(final_price__gt=1000).order_by('final_price', 'id')[:PAGE],
+        'active products newest first': Product.objects.filter(is_active=True).order_by('-created_date', '-id')[:PAGE],
+        'comments of a product newest first': Comment.objects.filter(product_id=1).order_by('-created_at', '-id')[:PAGE],
+        'comments of a user newest first': Comment.objects.filter(user_id=1).order_by('-created_at', '-id')[:PAGE],
+        'review page of a product': Comment.objects.filter(
+            product_id=1, is_approved=True, parent__isnull=True,
+        ).order_by('-created_at', '-id')[:PAGE],
+        'reply trees of a page': Comment.objects.filter(
+            root_id__in=[1, 2, 3], is_approved=True,
+        ).order_by('created_at', 'id'),
+        'gallery of a product': Gallery.objects.filter(product_id=1).order_by('id'),
+        'attribute values of a product': ProductAttribute.objects.filter(product_id=1, attribute_id=1),
+        'categories of a product': Product.categories.through.objects.filter(product_id=1),
+        'products of categories': Product.categories.through.objects.filter(category_id__in=[1, 2]),
+        'attribute links of a product': Product.attributes.through.objects.filter(product_id=1),
+        'cheapest products': ProductSummary.objects.order_by('min_final_price', 'product')[:PAGE],
+        'expired reservations': StockReservation.objects.filter(
+            status=StockReservation.RESERVED, expires_at__lte=now,
+        ).order_by('expires_at')[:PAGE],
+    }
+
+
+def plan_problems(queryset, allow_sort=False):
+    """
+    List of problems in the plan of `queryset` (empty when it is fine or the
+    database vendor is not supported, see supported()).
+    """
+    if connection.vendor == 'sqlite':
+        problems = sqlite_problems(queryset.explain())
+    elif connection.vendor == 'mysql':
+        problems = mysql_problems(json.loads(queryset.explain(format='json')))
+    else:
+        return []
+    if allow_sort:
+        problems = [problem for problem in problems if not problem.startswith('sort')]
+    return problems
+
+
+def check_critical_queries():
+    """
+    {name: problems} of every critical query whose plan has problems.
+    """
+    report = {}
+    for name, queryset in critical_queries().items():
+        problems = plan_problems(queryset, allow_sort=name in SORT_ALLOWED)
+        if problems:
+            report[name] = problems
+    return report
+
+
+def sqlite_problems(plan):
+    problems = []
+    for line in plan.splitlines():
+        # «SCAN table» بدون USING یعنی خواندن کل جدول
+        match = re.search(r'\bSCAN (\S+)(.*)', line)
+        if match and 'USING' not in match.group(2):
+            problems.append(f"full scan of {match.group(1)}")
+        if 'USE TEMP B-TREE' in line:
+            problems.append(f"sort without index ({line.split('USE TEMP B-TREE', 1)[1].strip()})")
+    return problems
+
+
+def mysql_problems(plan):
+    problems = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            table = node.get('table')
+            if isinstance(table, dict) and table.get('access_type') == 'ALL':
+                problems.append(f"full scan of {table.get('table_name')}")
+            if node.get('using_filesort'):
+                problems.append("sort without index (filesort)")
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return problems
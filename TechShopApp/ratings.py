@@ -0,0 +1,116 @@
+"""
+Incremental product rating aggregates.
+
+ProductSummary keeps rating_sum and review_count of the reviews that count
+(approved, top-level: COUNTED_REVIEWS) and the derived rating_avg; every
+package of the product carries a copy of rating_avg in ProductPackage.rating.
+
+A comment remembers the state it was loaded with (Comment.review_state()), so
+when it is created, approved, edited or deleted the signal handlers only apply
+the difference: one UPDATE of `rating_sum + d, review_count + c` on the summary
+and one UPDATE copying the new average to the packages. No aggregate over
+Comment runs on writes or reads.
+
+Writes that bypass signals (QuerySet.update(), raw SQL) are repaired by
+reconcile_ratings() / `manage.py reconcile_ratings`, which recomputes every
+product from one grouped query and fixes only the rows that drifted.
+"""
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Round
+
+from .models import Comment, ProductSummary
+from .summary import (
+    COUNTED_REVIEWS, rating_average, refresh_product_summaries, refresh_product_summary, sync_package_ratings,
+)
+
+RECONCILE_BATCH = 1000
+
+
+def apply_rating_delta(product_id, rating_delta, count_delta):
+    total = F('rating_sum') + rating_delta
+    count = F('review_count') + count_delta
+    updated = ProductSummary.objects.filter(product_id=product_id).update(
+        # rating_avg اول: MySQL ستون های SET را به ترتیب و با مقدار جدید ارزیابی می‌کند
+        rating_avg=Case(
+            When(Q(review_count__gt=-count_delta), then=Round(total * 1.0 / count, 2, output_field=FloatField())),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        rating_sum=total,
+        review_count=count,
+    )
+    if not updated:
+        # محصول بدون ردیف خلاصه (مثلا داده قدیمی): یک بار کامل محاسبه می‌شود
+        refresh_product_summary(product_id)
+    sync_package_ratings([product_id])
+
+
+def review_changed(comment, created=False):
+    """
+    Apply the difference between the stored and the current state of `comment`.
+    """
+    if created:
+        old = None
+    elif hasattr(comment, '_review_state'):
+        old = comment._review_state
+    else:
+        # وضعیت قبلی معلوم نیست (مثلا فیلدها defer شده بودند): محاسبه کامل
+        comment._review_state = comment.review_state()
+        refresh_product_summary(comment.product_id)
+        return
+    new = comment.review_state()
+    comment._review_state = new
+    if old == new:
+        return
+    if old and new and old[0] == new[0]:
+        apply_rating_delta(new[0], new[1] - old[1], 0)
+        return
+    if old:
+        apply_rating_delta(old[0], -old[1], -1)
+    if new:
+        apply_rating_delta(new[0], new[1], 1)
+
+
+def review_deleted(comment):
+    old = getattr(comment, '_review_state', comment.review_state())
+    if old:
+        apply_rating_delta(old[0], -old[1], -1)
+
+
+def reconcile_ratings():
+    """
+    Recompute rating_sum / review_count / rating_avg of every product from one
+    grouped query over Comment and fix the summaries (and their packages) that
+    differ. Returns the number of repaired products.
+    """
+    actual = {
+        row['product_id']: (row['total'] or 0, row['count'])
+        for row in Comment.objects.filter(COUNTED_REVIEWS).order_by().values('product_id')
+        .annotate(total=Sum('rating'), count=Count('id'))
+    }
+    stored = ProductSummary.objects.filter(
+        Q(review_count__gt=0) | Q(rating_sum__gt=0) | Q(rating_avg__gt=0),
+    ).values_list('product_id', 'rating_sum', 'review_count', 'rating_avg')
+
+    repaired = []
+    seen = set()
+    for product_id, rating_sum, review_count, rating_avg in stored.iterator():
+        seen.add(product_id)
+        total, count = actual.get(product_id, (0, 0))
+        if (rating_sum, review_count, rating_avg) != (total, count, rating_average(total, count)):
+            repaired.append(ProductSummary(
+                product_id=product_id, rating_sum=total, review_count=count,
+                rating_avg=rating_average(total, count),
+            ))
+    for start in range(0, len(repaired), RECONCILE_BATCH):
+        batch = repaired[start:start + RECONCILE_BATCH]
+        ProductSummary.objects.bulk_update(batch, ['rating_sum', 'review_count', 'rating_avg'])
+        sync_package_ratings([summary.product_id for summary in batch])
+
+    # محصولاتی که نظر دارند ولی خلاصه شان صفر است یا اصلا ردیف خلاصه ندارند
+    missing = [product_id for product_id in actual if product_id not in seen]
+    for start in range(0, len(missing), RECONCILE_BATCH):
+        batch = missing[start:start + RECONCILE_BATCH]
+        refresh_product_summaries(batch)
+        sync_package_ratings(batch)
+    return len(repaired) + len(missing)
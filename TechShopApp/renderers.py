@@ -0,0 +1,123 @@
+"""
+Faster / more compact response renderers, chosen through the Accept header.
+
+    Accept: application/json                  DRF's JSONRenderer (unchanged default)
+    Accept: application/json; encoder=orjson  ORJSONRenderer, same JSON encoded by orjson
+    Accept: application/msgpack               MessagePackRenderer (mobile apps)
+
+`?format=orjson` and `?format=msgpack` do the same from a browser. Values the
+serializers leave as Python objects (datetimes, Decimals, image fields, lazy
+translations, querysets) are converted exactly like DRF's JSON encoder does,
+so every format carries the same data.
+
+orjson and msgpack are optional: a renderer whose library is not installed is
+skipped by AvailableRendererNegotiation, so such a request gets JSON (or 406
+when it accepts nothing else) instead of an error while rendering.
+"""
+from django.db.models.fields.files import FieldFile
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - وابستگی اختیاری
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def builtin_converter(renderer_context):
+    """
+    default= hook of the encoders: image / file fields become their URL (absolute
+    when there is a request), everything else goes through DRF's JSONEncoder.
+    """
+    request = (renderer_context or {}).get('request')
+    encoder = JSONEncoder()
+
+    def convert(obj):
+        if isinstance(obj, FieldFile):
+            if not obj:
+                return None
+            return request.build_absolute_uri(obj.url) if request is not None else obj.url
+        return encoder.default(obj)
+    return convert
+
+
+def json_keys(data):
+    """
+    Copy of `data` with the non-string dict keys (facet counts by id) turned into
+    strings the way json / orjson write them, so MessagePack clients get the same maps.
+    """
+    if isinstance(data, dict):
+        return {key if isinstance(key, str) else json_key(key): json_keys(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [json_keys(value) for value in data]
+    return data
+
+
+def json_key(key):
+    if key is True or key is False or key is None:
+        return {True: 'true', False: 'false', None: 'null'}[key]
+    return str(key)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON encoded with orjson: compact UTF-8 like JSONRenderer with the default
+    settings, `indent` (browsable API, `; indent=`) gives two spaces.
+    """
+    media_type = 'application/json; encoder=orjson'
+    format = 'orjson'
+    charset = None
+    available = orjson is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if (renderer_context or {}).get('indent') or 'indent=' in (accepted_media_type or ''):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=builtin_converter(renderer_context), option=option)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack with the same values as the JSON output (datetimes stay ISO strings).
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    available = msgpack is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(json_keys(data), default=builtin_converter(renderer_context), use_bin_type=True, datetime=False)
+
+
+class AvailableRendererNegotiation(DefaultContentNegotiation):
+    """
+    DRF's negotiation over the renderers whose optional library is installed.
+
+    Renderers with media type parameters (`; encoder=orjson`) are tried first:
+    they only match an Accept header that names the parameter, so they never
+    take over a plain application/json or */* request, while JSONRenderer can
+    stay first in DEFAULT_RENDERER_CLASSES (DRF renders errors of a failed
+    negotiation with the first one). `?format=orjson` picks its renderer
+    whatever the Accept header says.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderers = [renderer for renderer in renderers if getattr(renderer, 'available', True)]
+        renderers.sort(key=lambda renderer: ';' not in renderer.media_type)
+        format = format_suffix or request.query_params.get(self.settings.URL_FORMAT_OVERRIDE)
+        if format:
+            renderers = self.filter_renderers(renderers, format)
+            if len(renderers) == 1:
+                return renderers[0], renderers[0].media_type
+        return super().select_renderer(request, renderers, format_suffix)
@@ -0,0 +1,233 @@
+"""
+Read replicas: catalog reads go to a pool of replicas, writes to the primary.
+
+    DATABASES = {'default': {...primary...}, 'replica1': {...}, 'replica2': {...}}
+    DATABASE_REPLICAS = ['replica1', 'replica2']
+
+ReplicaRoutingMiddleware marks GET / HEAD / OPTIONS requests as replica
+reads; ReplicaRouter then sends their queries to the next healthy replica
+(round robin). Everything else reads from and writes to `default`: unsafe
+methods, management commands, background threads, queries inside a
+transaction on the primary and writes from a GET (select_for_update,
+get_or_create).
+
+Read-your-writes: a response to an unsafe method carries a
+`primary_until=<unix time>` cookie and an `X-Primary-Until` header for
+REPLICA_STICKY_SECONDS. A client that sends either back (apps without
+cookies echo the header) reads from the primary until then, so it sees its
+own write before the replicas catch up.
+
+Health: each replica is probed with `SELECT 1` at most every
+REPLICA_CHECK_INTERVAL seconds when it is picked, and a replica whose probe
+or query fails with a connection error is out of the pool for
+REPLICA_RETRY_SECONDS. With no healthy replica the reads fall back to the
+primary. The state is per process.
+
+Settings:
+- DATABASE_REPLICAS (default []: no replicas, everything on `default`)
+- REPLICA_STICKY_SECONDS (default 5)
+- REPLICA_CHECK_INTERVAL (default 10 seconds)
+- REPLICA_RETRY_SECONDS (default 30 seconds)
+"""
+import itertools
+import logging
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, InterfaceError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = DEFAULT_DB_ALIAS
+STICKY_COOKIE = 'primary_until'
+STICKY_HEADER = 'X-Primary-Until'
+
+# آیا کوئری های خواندنی درخواست جاری می‌توانند به replica بروند
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary inside the block, whatever the request is (used for
+    data that outlives the request, like cached responses).
+    """
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+class ReplicaPool:
+    """
+    Round robin over the healthy replicas; {alias: time it may come back} for the others.
+    """
+
+    def __init__(self):
+        self.down_until = {}
+        self.checked_at = {}
+        self.turn = itertools.count()
+
+    def choose(self):
+        healthy = [alias for alias in replica_aliases() if self.is_healthy(alias)]
+        if not healthy:
+            return None
+        return healthy[next(self.turn) % len(healthy)]
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        if self.down_until.get(alias, 0) > now:
+            return False
+        if now - self.checked_at.get(alias, -math.inf) >= getattr(settings, 'REPLICA_CHECK_INTERVAL', 10):
+            self.checked_at[alias] = now
+            return self.check(alias)
+        return True
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError as exc:
+            self.mark_down(alias, exc)
+            connection.close()
+            return False
+        self.down_until.pop(alias, None)
+        return True
+
+    def mark_down(self, alias, error=None):
+        retry = getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+        if self.down_until.get(alias, 0) <= time.monotonic():
+            logger.warning("replica %s removed from the pool for %ss: %s", alias, retry, error)
+        self.down_until[alias] = time.monotonic() + retry
+        # بعد از برگشتن، اول دوباره بررسی می‌شود
+        self.checked_at.pop(alias, None)
+
+
+pool = ReplicaPool()
+
+
+class ReplicaRouter:
+    """
+    DATABASE_ROUTERS entry: reads of replica requests go to `pool`, the rest to
+    Django's default choice (the primary, or the database of a hinted instance).
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # رابطه های یک شیء از همان دیتابیسی خوانده می‌شوند که شیء از آن آمده
+            return instance._state.db
+        if connections[PRIMARY].in_atomic_block:
+            return None
+        return pool.choose()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replica ها schema را از primary با replication می‌گیرند
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def report_failure(execute, sql, params, many, context):
+    try:
+        return execute(sql, params, many, context)
+    except (OperationalError, InterfaceError) as exc:
+        pool.mark_down(context['connection'].alias, exc)
+        raise
+
+
+def watch_replica(connection, **kwargs):
+    if connection.alias in replica_aliases() and report_failure not in connection.execute_wrappers:
+        connection.execute_wrappers.append(report_failure)
+
+
+def install():
+    """
+    Watch the queries of replica connections for connection errors (called from AppConfig.ready()).
+    """
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(watch_replica, dispatch_uid='replica-health')
+
+
+def sticky(request):
+    """
+    True while the client's last write is younger than REPLICA_STICKY_SECONDS.
+    The value comes from the client: one further ahead than a fresh write
+    would set is ignored, so it cannot pin a client to the primary for good.
+    """
+    value = request.COOKIES.get(STICKY_COOKIE) or request.headers.get(STICKY_HEADER)
+    try:
+        until = float(value)
+    except (TypeError, ValueError):
+        return False
+    now = time.time()
+    # finish() مقدار را به ثانیه بالا گرد می‌کند
+    return now < until <= math.ceil(now + getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of safe, non-sticky requests to the replicas; pin the client
+    to the primary after a write. Sync and async capable like RequestMetricsMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def reads_from_replicas(self, request):
+        return request.method in SAFE_METHODS and bool(replica_aliases()) and not sticky(request)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = _replica_reads.set(self.reads_from_replicas(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = _replica_reads.set(self.reads_from_replicas(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        if request.method not in SAFE_METHODS and replica_aliases():
+            window = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+            until = str(math.ceil(time.time() + window))
+            response.set_cookie(STICKY_COOKIE, until, max_age=window, httponly=True, samesite='Lax')
+            response[STICKY_HEADER] = until
+        return response
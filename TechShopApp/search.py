@@ -0,0 +1,151 @@
+"""
+Bilingual (Persian / English) product search over an inverted index.
+
+Every product is tokenized from its own name and description plus the names
+of its brand and categories. Tokens are normalized so that Arabic and Persian
+spellings, ZWNJ and Persian digits all meet on the same term, and stored in
+SearchIndexEntry with a weight per source field.
+
+A query is answered from the (term, product) index only: every query word must
+match (the last one as a prefix, for search-as-you-type) and products are
+ranked by the summed weight of the matched terms. No `icontains` table scan.
+"""
+import re
+from collections import Counter
+
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+
+from .models import Product, SearchIndexEntry
+
+# وزن هر فیلد در رتبه بندی نتایج
+FIELD_WEIGHTS = {
+    'name': 10,
+    'brand': 6,
+    'category': 4,
+    'description': 1,
+}
+MAX_TERM_LENGTH = SearchIndexEntry._meta.get_field('term').max_length
+MIN_PREFIX_LENGTH = 2
+
+# یکسان سازی حروف عربی و فارسی
+CHARACTER_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ؤ': 'و',
+    '‌': '',  # ZWNJ (نیم فاصله) - «می‌خواهم» و «میخواهم» یکی می‌شوند
+    '‏': '', '‎': '',
+    'ـ': '',  # کشیده
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # ارقام فارسی
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # ارقام عربی
+})
+DIACRITICS = re.compile('[ً-ٰٟ]')
+TOKEN = re.compile(r'\w+')
+
+
+def normalize(text):
+    text = (text or '').translate(CHARACTER_MAP)
+    return DIACRITICS.sub('', text).lower()
+
+
+def tokenize(text):
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN.findall(normalize(text))]
+
+
+# _______________________________________ indexing _______________________________________
+
+def product_terms(product):
+    """
+    Weighted terms of one product. Expects brand and categories to be loaded
+    (select_related / prefetch_related) when called in bulk.
+    """
+    weights = Counter()
+    sources = [
+        ('name', [product.name]),
+        ('description', [product.description]),
+        ('brand', [product.brand.name, product.brand.en_name] if product.brand else []),
+        ('category', [text for c in product.categories.all() for text in (c.name, c.en_name)]),
+    ]
+    for field, texts in sources:
+        for text in texts:
+            for token in set(tokenize(text)):
+                weights[token] += FIELD_WEIGHTS[field]
+    return weights
+
+
+def index_queryset():
+    return Product.objects.select_related('brand').prefetch_related('categories')
+
+
+def index_products(product_ids):
+    """
+    Replace the index entries of the given products.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    entries = [
+        SearchIndexEntry(term=term, product_id=product.id, weight=weight)
+        for product in index_queryset().filter(id__in=product_ids)
+        for term, weight in product_terms(product).items()
+    ]
+    SearchIndexEntry.objects.filter(product_id__in=product_ids).delete()
+    SearchIndexEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def rebuild_search_index(batch_size=1000):
+    """
+    Rebuild the whole index, `batch_size` products at a time. Returns the number
+    of indexed products.
+    """
+    SearchIndexEntry.objects.all().delete()
+    total = 0
+    last_id = 0
+    while True:
+        products = list(index_queryset().filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not products:
+            break
+        last_id = products[-1].id
+        SearchIndexEntry.objects.bulk_create(
+            [
+                SearchIndexEntry(term=term, product_id=product.id, weight=weight)
+                for product in products
+                for term, weight in product_terms(product).items()
+            ],
+            batch_size=1000,
+        )
+        total += len(products)
+    return total
+
+
+# _______________________________________ querying _______________________________________
+
+def search_product_ids(query, limit=20):
+    """
+    Return up to `limit` (product_id, score) pairs, best match first.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return []
+    conditions = [Q(term=token) for token in tokens[:-1]]
+    last = tokens[-1]
+    conditions.append(Q(term__startswith=last) if len(last) >= MIN_PREFIX_LENGTH else Q(term=last))
+
+    matches = Q()
+    for condition in conditions:
+        matches |= condition
+    # برای هر کلمه جستجو یک ستون «پیدا شد» می‌سازیم تا فقط محصولاتی که همه کلمات را دارند بمانند
+    hits = {
+        f'hit_{i}': Max(Case(When(condition, then=1), default=0, output_field=IntegerField()))
+        for i, condition in enumerate(conditions)
+    }
+    rows = (
+        SearchIndexEntry.objects.filter(matches)
+        .values('product_id')
+        .annotate(score=Sum('weight'), **hits)
+        .filter(**{name: 1 for name in hits})
+        .order_by('-score', 'product_id')
+        .values_list('product_id', 'score')[:limit]
+    )
+    return list(rows)
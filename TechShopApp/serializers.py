@@ -2,9 +2,26 @@ from rest_framework.serializers import ModelSerializer,HyperlinkedModelSerialize
 from .models import (
     BaseCategorys, Category, Brand, BaseColor, Color, Size,
     CategoryAttribute, ProductAttribute, Product, ProductPackage,
-    Gallery, Comment
+    Gallery, Comment, ProductSummary, StockReservation, StockReservationItem
 )
 from rest_framework import serializers
+from .image_variants import variant_urls
+from . import counters
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only srcset-style map of the responsive variants of an image field:
+    {"webp": {"320w": url, "640w": url}, "avif": {...}}
+    """
+
+    def __init__(self, group, **kwargs):
+        self.group = group
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return variant_urls(value, self.group, self.context.get('request'))
 
 
 
@@ -22,17 +39,33 @@ class ProductAttributeSerializer(ModelSerializer):
     class Meta:
         model = ProductAttribute
         fields = ['id', 'product', 'attribute', 'attribute_name', 'attribute_title', 'value']
+        expandable_fields = {'attribute': (CategoryAttributeSerializer, {})}  # ?expand= (sparse_fields.py)
 
 
 class CategorySerializer(ModelSerializer):
-    category_attributes = CategoryAttributeSerializer(many=True, read_only=True, source='category_attributes')
+    category_attributes = CategoryAttributeSerializer(many=True, read_only=True, source='categoryattribute_set')
     
     class Meta:
         model = Category
         fields = '__all__'
+        expandable_fields = {'attributes': (CategoryAttributeSerializer, {'many': True})}
+
+    def validate_parent(self, parent):
+        # جلوگیری از ایجاد حلقه در درخت دسته بندی ها
+        if parent and self.instance and parent.pk in self.instance.get_descendant_ids(include_self=True):
+            raise serializers.ValidationError("دسته بندی نمی‌تواند زیر مجموعه خودش باشد")
+        return parent
+
+
+class CategoryTreeSerializer(ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'parent', 'name', 'en_name', 'image', 'depth']
 
 
 class BrandSerializer(ModelSerializer):
+    logo_variants = ImageVariantsField(group='thumbnail', source='logo')
+
     class Meta:
         model = Brand
         fields = '__all__'
@@ -58,10 +91,29 @@ class SizeSerializer(ModelSerializer):
 
 class ProductSerializer(ModelSerializer):
     attributes = ProductAttributeSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField(group='product', source='image')
     
     class Meta:
         model = Product
         fields = '__all__'
+        expandable_fields = {
+            'brand': (BrandSerializer, {}),
+            'categories': (CategorySerializer, {'many': True}),
+        }
+
+
+class ProductSummarySerializer(ModelSerializer):
+    class Meta:
+        model = ProductSummary
+        exclude = ['product', 'updated_date']
+
+
+class ProductListSerializer(ProductSerializer):
+    """
+    Product list row with its denormalized price / stock / rating summary.
+    The view must select_related('summary') to keep this one query per page.
+    """
+    summary = ProductSummarySerializer(read_only=True)
 
 
 class PPackageSerializer(ModelSerializer):
@@ -70,9 +122,50 @@ class PPackageSerializer(ModelSerializer):
         model = ProductPackage
         fields = '__all__'
         read_only_fields = ['final_price']
+        expandable_fields = {
+            'color': (ColorSerializer, {}),
+            'size': (SizeSerializer, {}),
+        }
+
+    def to_representation(self, instance):
+        return self.finalize_representation(super().to_representation(instance), instance.pk)
+
+    @staticmethod
+    def finalize_representation(data, pk):
+        # شمارنده های بافر شده ای که هنوز در دیتابیس نوشته نشده اند
+        for field in counters.FIELDS:
+            if field in data:
+                data[field] += counters.pending(pk, field)
+        return data
+
+
+class BulkPriceUpdateSerializer(serializers.Serializer):
+    """
+    Input of POST /product-packages/bulk-price/: a selector (ids and/or
+    category / brand / product ids) plus the changes to apply.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    category = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    brand = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    product = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    price = serializers.IntegerField(min_value=0, required=False)
+    price_change_percent = serializers.FloatField(min_value=-100, max_value=1000, required=False)
+    discount = serializers.IntegerField(min_value=0, max_value=99, required=False)
+    is_active_discount = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if not any(attrs.get(name) for name in ('ids', 'category', 'brand', 'product')):
+            raise serializers.ValidationError("یکی از ids، category، brand یا product لازم است.")
+        if 'price' in attrs and 'price_change_percent' in attrs:
+            raise serializers.ValidationError("price و price_change_percent را با هم نفرستید.")
+        if not any(name in attrs for name in ('price', 'price_change_percent', 'discount', 'is_active_discount')):
+            raise serializers.ValidationError("هیچ تغییری ارسال نشده است.")
+        return attrs
 
 
 class GallerySerializer(ModelSerializer):
+    image_variants = ImageVariantsField(group='product', source='image')
+
     class Meta:
         model = Gallery
         fields = '__all__'
@@ -92,6 +185,48 @@ class CommentSerializer(ModelSerializer):
 
 
 
+class ReviewThreadSerializer(ModelSerializer):
+    """
+    An approved comment with its approved replies nested below it. The replies
+    are not queried here: the view passes them in context['replies'] as
+    {parent_id: [comment, ...]}, loaded with one query for the whole page.
+    """
+    user_name = serializers.CharField(source='user.username', read_only=True)
+    replies = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'product', 'user', 'user_name', 'text', 'rating', 'created_at', 'replies']
+
+    def get_replies(self, obj):
+        children = self.context.get('replies', {}).get(obj.id, [])
+        return ReviewThreadSerializer(children, many=True, context=self.context).data
+
+
+class StockReservationItemSerializer(ModelSerializer):
+    class Meta:
+        model = StockReservationItem
+        fields = ['package', 'quantity']
+
+
+class StockReservationSerializer(ModelSerializer):
+    """
+    Input: {"items": [{"package": id, "quantity": n}, ...]}. The stock itself is
+    taken by inventory.reserve() in the view, not by create().
+    """
+    items = StockReservationItemSerializer(many=True)
+
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'status', 'expires_at', 'created_date', 'items']
+        read_only_fields = ['status', 'expires_at', 'created_date']
+
+    def validate_items(self, items):
+        if not items:
+            raise serializers.ValidationError("حداقل یک قلم لازم است.")
+        return items
+
+
 class BaseCategorysDetailSerializer(ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
     brands = BrandSerializer(many=True, read_only=True)
@@ -103,7 +238,7 @@ class BaseCategorysDetailSerializer(ModelSerializer):
 
 class CategoryNestedSerializer(ModelSerializer):
     subcategories = CategorySerializer(many=True, read_only=True)
-    category_attributes = CategoryAttributeSerializer(many=True, read_only=True, source='category_attributes')
+    category_attributes = CategoryAttributeSerializer(many=True, read_only=True, source='categoryattribute_set')
     class Meta:
         model = Category
         fields = '__all__'
@@ -112,10 +247,13 @@ class CategoryNestedSerializer(ModelSerializer):
 class ProductDetailSerializer(ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
     brand = BrandSerializer(read_only=True)
-    product_packages = PPackageSerializer(many=True, read_only=True, source='product_packages')
+    product_packages = PPackageSerializer(many=True, read_only=True)
     gallery_images = GallerySerializer(many=True, read_only=True, source='gallery_set')
     comments = CommentSerializer(many=True, read_only=True, source='comment_set')
     product_attributes = ProductAttributeSerializer(many=True, read_only=True, source='attributes')
+    image_variants = ImageVariantsField(group='product', source='image')
+    # امتیاز و تعداد نظرات ذخیره شده؛ هیچ aggregate روی Comment اجرا نمی‌شود
+    summary = ProductSummarySerializer(read_only=True)
     class Meta:
         model = Product
         fields = '__all__'
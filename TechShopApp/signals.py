@@ -0,0 +1,142 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import (
+    BaseCategorys, BaseColor, Brand, Category, CategoryAttribute, Color, Comment,
+    Product, ProductPackage, ProductSummary, Size
+)
+from .ratings import review_changed, review_deleted
+from .search import index_products
+from .summary import refresh_product_summary
+
+
+# _______________________________________ product summary _______________________________________
+
+@receiver(post_save, sender=Product)
+def create_product_summary(sender, instance, created, raw=False, **kwargs):
+    # هر محصول جدید یک ردیف خلاصه خالی می‌گیرد تا در لیست قابل مرتب سازی باشد
+    if created and not raw:
+        ProductSummary.objects.get_or_create(product=instance)
+
+
+def deleted_with_product(origin):
+    """
+    True when the row is being removed by a CASCADE from deleting its product.
+    """
+    model = getattr(origin, 'model', type(origin))
+    return model is Product
+
+
+@receiver(post_save, sender=ProductPackage)
+def update_product_summary(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_product_summary(instance.product_id)
+
+
+@receiver(post_delete, sender=ProductPackage)
+def update_product_summary_on_delete(sender, instance, origin=None, **kwargs):
+    # وقتی خود محصول حذف می‌شود، خلاصه آن هم با CASCADE حذف می‌شود
+    if not deleted_with_product(origin):
+        refresh_product_summary(instance.product_id)
+
+
+@receiver(post_save, sender=Comment)
+def update_product_rating(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        review_changed(instance, created=created)
+
+
+@receiver(post_delete, sender=Comment)
+def update_product_rating_on_delete(sender, instance, origin=None, **kwargs):
+    if not deleted_with_product(origin):
+        review_deleted(instance)
+
+
+# _______________________________________ search index _______________________________________
+
+def reindex_in_batches(product_ids, batch_size=500):
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), batch_size):
+        index_products(product_ids[start:start + batch_size])
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_products([instance.id])
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def index_product_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        index_products([instance.pk])
+    elif action == 'post_clear':
+        # در post_clear از سمت دسته بندی، pk_set خالی است؛ لیست از pre_clear نگه داشته شده
+        reindex_in_batches(getattr(instance, '_search_product_ids', ()))
+    else:
+        reindex_in_batches(pk_set or ())
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def remember_cleared_category_products(sender, instance, action, reverse, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._search_product_ids = list(instance.product_set.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Brand)
+def index_brand_products(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        reindex_in_batches(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        reindex_in_batches(instance.product_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Brand)
+def remember_brand_products(sender, instance, **kwargs):
+    instance._search_product_ids = list(instance.products.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_products(sender, instance, **kwargs):
+    instance._search_product_ids = list(instance.product_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def index_after_taxonomy_delete(sender, instance, **kwargs):
+    # محصولات حذف شده (CASCADE) دیگر ردیفی در ایندکس ندارند و index_products آنها را نادیده می‌گیرد
+    reindex_in_batches(getattr(instance, '_search_product_ids', ()))
+
+
+# _______________________________________ taxonomy response cache _______________________________________
+
+TAXONOMY_MODELS = (BaseCategorys, Category, CategoryAttribute, Brand, Color, BaseColor, Size)
+# جدول واسط -> مدلی که این M2M را در serializer خود نشان می‌دهد
+TAXONOMY_M2M = {
+    BaseCategorys.brands.through: BaseCategorys,
+    Brand.category.through: Brand,
+    Category.attributes.through: Category,
+}
+
+
+def invalidate_taxonomy(sender, **kwargs):
+    invalidate(sender)
+
+
+def invalidate_taxonomy_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(TAXONOMY_M2M[sender])
+
+
+for model in TAXONOMY_MODELS:
+    post_save.connect(invalidate_taxonomy, sender=model, dispatch_uid=f'taxonomy-cache-save-{model.__name__}')
+    post_delete.connect(invalidate_taxonomy, sender=model, dispatch_uid=f'taxonomy-cache-delete-{model.__name__}')
+for through in TAXONOMY_M2M:
+    m2m_changed.connect(invalidate_taxonomy_m2m, sender=through, dispatch_uid=f'taxonomy-cache-m2m-{through.__name__}')
@@ -0,0 +1,219 @@
+"""
+Sparse fieldsets (?fields=) and on-demand expansion (?expand=) for every ViewSet.
+
+    GET /products/12/?fields=id,name,image_variants,summary
+    GET /products/12/?fields=id,name,product_packages.final_price,product_packages.color
+    GET /products/?expand=brand,categories
+    GET /product-packages/?fields=id,final_price,product.name&expand=color
+
+`fields` keeps only the listed fields; a dotted name selects inside a nested
+serializer (a nested field listed without a dot keeps all of its fields).
+`expand` replaces a primary key field by the nested object, for the fields a
+serializer lists in `Meta.expandable_fields = {name: (serializer, kwargs)}`.
+Unknown names are ignored.
+
+The queryset follows the serializer: select_related / prefetch_related
+lookups of fields that are not returned are dropped (also inside Prefetch
+querysets of nested serializers), and expanded relations are joined or
+prefetched, so a product card costs one query instead of the whole product
+page graph. Only safe methods are affected; writes always use the full
+serializer.
+"""
+from django.db.models import Prefetch
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    """
+    'a, b.c,,a' -> ('a', 'b.c'): sorted and unique, so it can be a cache key.
+    """
+    return tuple(sorted({name.strip() for name in (value or '').split(',') if name.strip()}))
+
+
+def name_tree(names):
+    """
+    ('a', 'b.c', 'b.d') -> {'a': {}, 'b': {'c': {}, 'd': {}}}; {} means "all fields".
+    """
+    tree = {}
+    for name in names:
+        node = tree
+        for part in name.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def target(serializer):
+    return serializer.child if isinstance(serializer, ListSerializer) else serializer
+
+
+def apply_sparse(serializer, fields=(), expand=()):
+    """
+    Expand then trim the fields of `serializer` (in place) and return it.
+    """
+    expand_fields(target(serializer), name_tree(expand))
+    if fields:
+        trim_fields(target(serializer), name_tree(fields))
+    return serializer
+
+
+def known_names(serializer_class, fields=(), expand=()):
+    """
+    (fields, expand) without the names that do not resolve against
+    `serializer_class` (after expansion), so unknown names cannot grow the
+    compiled plan cache one entry per request.
+    """
+    if not fields and not expand:
+        return (), ()
+    serializer = target(apply_sparse(serializer_class(context={}), (), expand))
+    return (
+        tuple(name for name in fields if resolves(serializer, name)),
+        tuple(name for name in expand if resolves(serializer, name, expandable=True)),
+    )
+
+
+def resolves(serializer, name, expandable=False):
+    *path, last = name.split('.')
+    for part in path:
+        field = serializer.fields.get(part)
+        if not isinstance(field, BaseSerializer):
+            return False
+        serializer = target(field)
+    if expandable:
+        return last in getattr(getattr(serializer, 'Meta', None), 'expandable_fields', {}) and last in serializer.fields
+    return last in serializer.fields
+
+
+def expand_fields(serializer, tree):
+    expandable = getattr(getattr(serializer, 'Meta', None), 'expandable_fields', {})
+    for name, subtree in tree.items():
+        if name in expandable and name in serializer.fields:
+            serializer_class, kwargs = expandable[name]
+            kwargs = dict(kwargs, read_only=True)
+            if serializer.fields[name].source != name:
+                kwargs['source'] = serializer.fields[name].source
+            serializer.fields[name] = serializer_class(**kwargs)
+        field = serializer.fields.get(name)
+        if subtree and isinstance(field, BaseSerializer):
+            expand_fields(target(field), subtree)
+
+
+def trim_fields(serializer, tree):
+    for name in list(serializer.fields):
+        if name not in tree:
+            serializer.fields.pop(name)
+    for name, subtree in tree.items():
+        field = serializer.fields.get(name)
+        if subtree and isinstance(field, BaseSerializer):
+            trim_fields(target(field), subtree)
+
+
+# _______________________________________ queries _______________________________________
+
+def fields_by_source(serializer):
+    """
+    {first source attribute: [fields]} of the (trimmed) serializer.
+    """
+    sources = {}
+    for field in target(serializer).fields.values():
+        if field.source_attrs:
+            sources.setdefault(field.source_attrs[0], []).append(field)
+    return sources
+
+
+def prune_queryset(queryset, serializer):
+    """
+    Drop the select_related / prefetch_related lookups no field of `serializer`
+    reads. A Prefetch read by a single nested serializer is pruned recursively.
+    """
+    sources = fields_by_source(serializer)
+
+    select = queryset.query.select_related
+    if isinstance(select, dict):
+        kept = [path for path in flatten(select) if path.split('__')[0] in sources]
+        queryset = queryset.select_related(None)
+        if kept:
+            queryset = queryset.select_related(*kept)
+
+    lookups = []
+    for lookup in queryset._prefetch_related_lookups:
+        through = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+        readers = sources.get(through.split('__')[0])
+        if not readers:
+            continue
+        if isinstance(lookup, Prefetch) and lookup.queryset is not None and '__' not in through \
+                and len(readers) == 1 and isinstance(readers[0], BaseSerializer):
+            lookup = Prefetch(through, queryset=prune_queryset(lookup.queryset, readers[0]), to_attr=lookup.to_attr)
+        lookups.append(lookup)
+    return queryset.prefetch_related(None).prefetch_related(*lookups)
+
+
+def flatten(select, prefix=''):
+    paths = []
+    for name, nested in select.items():
+        path = prefix + name
+        deeper = flatten(nested, path + '__') if nested else []
+        paths.extend(deeper or [path])
+    return paths
+
+
+def expand_queryset(queryset, serializer, expand):
+    """
+    Join (FK) or prefetch (many) the top level relations named in `expand`.
+    """
+    expandable = getattr(getattr(target(serializer), 'Meta', None), 'expandable_fields', {})
+    model = queryset.model
+    for name in name_tree(expand):
+        field = target(serializer).fields.get(name)
+        if name not in expandable or field is None:
+            continue
+        relation = model._meta.get_field(field.source)
+        if relation.many_to_one or relation.one_to_one:
+            queryset = queryset.select_related(field.source)
+        else:
+            queryset = queryset.prefetch_related(field.source)
+    return queryset
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= / ?expand= for a ViewSet: trims get_serializer() and prunes the
+    queryset in filter_queryset() (used by list, retrieve and get_object()).
+    """
+
+    def sparse_params(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return (), ()
+        params = request.query_params
+        return parse_names(params.get(FIELDS_PARAM)), parse_names(params.get(EXPAND_PARAM))
+
+    def get_serializer(self, *args, **kwargs):
+        return apply_sparse(super().get_serializer(*args, **kwargs), *self.sparse_params())
+
+    def sparse(self, serializer):
+        """
+        Apply ?fields= / ?expand= to a serializer an action built itself.
+        """
+        return apply_sparse(serializer, *self.sparse_params())
+
+    def sparse_queryset(self, queryset, serializer):
+        """
+        Prune / extend `queryset` for what `serializer` returns under ?fields= / ?expand=.
+        """
+        fields, expand = self.sparse_params()
+        if not fields and not expand:
+            return queryset
+        apply_sparse(serializer, fields, expand)
+        if fields:
+            queryset = prune_queryset(queryset, serializer)
+        return expand_queryset(queryset, serializer, expand)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not any(self.sparse_params()):
+            return queryset
+        return self.sparse_queryset(queryset, super().get_serializer())
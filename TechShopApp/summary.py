@@ -0,0 +1,141 @@
+"""
+Maintenance of the ProductSummary read model.
+
+refresh_product_summary() recomputes one product from its own rows (a couple of
+indexed aggregates) and is called from signals whenever a package changes.
+Comment changes update the rating columns incrementally (see ratings.py).
+rebuild_product_summaries() recomputes every product with grouped queries and
+is used by the rebuild_product_summaries management command.
+
+ProductPackage.rating is a copy of its product's rating_avg, written by
+sync_package_ratings() whenever the summary's rating changes.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, FloatField, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Product, ProductPackage, ProductSummary
+
+SUMMARY_FIELDS = [
+    'min_final_price', 'max_final_price', 'max_discount',
+    'total_quantity', 'in_stock', 'rating_avg', 'rating_sum', 'review_count',
+]
+
+# فقط بسته های فعال در قیمت و موجودی حساب می‌شوند
+ACTIVE_PACKAGES = Q(is_active_package=True)
+# فقط نظرات تایید شده و اصلی (نه پاسخ ها) در امتیاز حساب می‌شوند
+COUNTED_REVIEWS = Q(is_approved=True, parent__isnull=True)
+
+PACKAGE_AGGREGATES = {
+    'min_price': Min('final_price'),
+    'max_price': Max('final_price'),
+    'discount': Max('discount', filter=Q(is_active_discount=True)),
+    'quantity': Sum('quantity'),
+}
+REVIEW_AGGREGATES = {
+    'sum': Sum('rating'),
+    'count': Count('id'),
+}
+
+
+def rating_average(rating_sum, review_count):
+    # گرد کردن half-up مثل ROUND() دیتابیس (round پایتون bankers است)
+    if not review_count:
+        return 0.0
+    return float((Decimal(rating_sum) / Decimal(review_count)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def sync_package_ratings(product_ids):
+    """
+    Copy rating_avg of the products' summaries onto their packages (one UPDATE).
+    """
+    stored = ProductSummary.objects.filter(product_id=OuterRef('product_id')).values('rating_avg')[:1]
+    ProductPackage.objects.filter(product_id__in=product_ids).update(
+        rating=Coalesce(Subquery(stored), Value(0.0), output_field=FloatField()),
+    )
+
+
+def build_summary(product_id, packages, reviews):
+    packages = packages or {}
+    reviews = reviews or {}
+    quantity = packages.get('quantity') or 0
+    rating_sum = reviews.get('sum') or 0
+    review_count = reviews.get('count') or 0
+    return ProductSummary(
+        product_id=product_id,
+        min_final_price=packages.get('min_price') or 0,
+        max_final_price=packages.get('max_price') or 0,
+        max_discount=packages.get('discount') or 0,
+        total_quantity=quantity,
+        in_stock=quantity > 0,
+        rating_avg=rating_average(rating_sum, review_count),
+        rating_sum=rating_sum,
+        review_count=review_count,
+    )
+
+
+def refresh_product_summary(product_id):
+    """
+    Recompute the summary row of a single product.
+    """
+    packages = ProductPackage.objects.filter(ACTIVE_PACKAGES, product_id=product_id).aggregate(**PACKAGE_AGGREGATES)
+    reviews = Comment.objects.filter(COUNTED_REVIEWS, product_id=product_id).aggregate(**REVIEW_AGGREGATES)
+    summary = build_summary(product_id, packages, reviews)
+    ProductSummary.objects.update_or_create(
+        product_id=product_id,
+        defaults={field: getattr(summary, field) for field in SUMMARY_FIELDS},
+    )
+    # بسته جدید هم امتیاز محصول را می‌گیرد
+    ProductPackage.objects.filter(product_id=product_id).exclude(rating=summary.rating_avg).update(rating=summary.rating_avg)
+    return summary
+
+
+def refresh_product_summaries(product_ids):
+    """
+    Recompute the summaries of many products with two GROUP BY queries and
+    one bulk upsert (used by bulk writers that bypass the signals).
+    """
+    ids = list(product_ids)
+    if not ids:
+        return
+    packages = {
+        row.pop('product_id'): row
+        for row in ProductPackage.objects.filter(ACTIVE_PACKAGES, product_id__in=ids)
+        .order_by().values('product_id').annotate(**PACKAGE_AGGREGATES)
+    }
+    reviews = {
+        row.pop('product_id'): row
+        for row in Comment.objects.filter(COUNTED_REVIEWS, product_id__in=ids)
+        .order_by().values('product_id').annotate(**REVIEW_AGGREGATES)
+    }
+    ProductSummary.objects.bulk_create(
+        [build_summary(pk, packages.get(pk), reviews.get(pk)) for pk in ids],
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=SUMMARY_FIELDS + ['updated_date'],
+    )
+
+
+def rebuild_product_summaries(batch_size=2000):
+    """
+    Recompute every summary, `batch_size` products at a time.
+
+    Each batch costs two GROUP BY queries and one bulk upsert, so memory stays
+    bounded by the batch size and not by the catalog size. Returns the number
+    of products processed.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        refresh_product_summaries(ids)
+        sync_package_ratings(ids)
+        total += len(ids)
+    # خلاصه محصولات حذف شده با CASCADE پاک می‌شوند، پس نیازی به حذف دستی نیست
+    return total
@@ -0,0 +1,368 @@
+"""
+Seeded synthetic catalog for load tests and local profiling.
+
+generate_catalog() fills the whole schema with a realistically shaped catalog:
+base categories with three level category trees, brands, colors, sizes,
+category attributes, products with a skewed number of packages, attribute
+values, gallery rows, users and comments whose count per product follows a
+long-tail (Pareto) distribution, with reply threads.
+
+Everything is drawn from one random.Random(seed), so the same seed and scale
+always give the same data, and every name carries the `s<seed>-` prefix so
+runs with different seeds can share a database. Rows are written with
+bulk_create() in batches of products (ids are read back by name, since MySQL
+does not return them), which skips the signals; each batch therefore refreshes
+its ProductSummary rows, package ratings and search index itself.
+
+Gallery and product images point at a few shared placeholder files under
+MEDIA_ROOT/synthetic/, written only when `images=True`.
+"""
+import os
+import random
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from PIL import Image
+
+from .cache import invalidate
+from .category_tree import rebuild_category_tree
+from .models import (
+    BaseCategorys, BaseColor, Brand, Category, CategoryAttribute, Color, Comment, Gallery, Product,
+    ProductAttribute, ProductPackage, Size
+)
+from .search import index_products
+from .summary import refresh_product_summaries, sync_package_ratings
+
+PLACEHOLDER_DIRECTORY = 'synthetic'
+PLACEHOLDER_COUNT = 8
+WORDS = [
+    'حرفه ای', 'اقتصادی', 'هوشمند', 'سبک', 'مقاوم', 'بی سیم', 'گیمینگ', 'اداری', 'ورزشی', 'کلاسیک',
+    'pro', 'max', 'lite', 'plus', 'ultra', 'mini', 'air', 'neo',
+]
+ATTRIBUTE_TITLES = ['وزن', 'جنس', 'ابعاد', 'گارانتی', 'کشور سازنده', 'باتری', 'پردازنده', 'رم', 'صفحه نمایش', 'مدل']
+SHOE_SIZES = range(36, 47)
+# مدل هایی که Taxonomy با bulk_create می‌نویسد (وابستگی های پاسخ های cache شده، cache.py)
+TAXONOMY_MODELS = (BaseCategorys, Category, CategoryAttribute, Brand, BaseColor, Color, Size)
+
+
+@dataclass
+class GenerateStats:
+    counts: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def add(self, model, count):
+        name = model._meta.model_name
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    @property
+    def rows_per_second(self):
+        total = sum(self.counts.values())
+        return round(total / self.seconds, 1) if self.seconds else 0.0
+
+
+def prefix_for(seed):
+    return f"s{seed}-"
+
+
+def long_tail(rng, mean, cap):
+    """
+    Integer >= 0 from a Pareto tail with roughly the given mean: most draws are
+    small, a few are large (capped).
+    """
+    if mean <= 0:
+        return 0
+    alpha = 1.5
+    # میانگین pareto(alpha) برابر alpha/(alpha-1) است؛ بعد از کم کردن 1 مقیاس می‌شود
+    value = (rng.paretovariate(alpha) - 1) * mean * (alpha - 1)
+    return min(int(value + 0.5), cap)
+
+
+def weighted_choice(rng, items):
+    # توزیع zipf: چند مورد اول (برندهای پرفروش) بیشتر انتخاب می‌شوند
+    return rng.choices(items, weights=[1 / (rank + 1) for rank in range(len(items))])[0]
+
+
+def write_placeholder_images():
+    directory = os.path.join(settings.MEDIA_ROOT, PLACEHOLDER_DIRECTORY)
+    os.makedirs(directory, exist_ok=True)
+    for index in range(PLACEHOLDER_COUNT):
+        path = os.path.join(directory, f'placeholder-{index}.png')
+        if not os.path.exists(path):
+            shade = 40 + index * 25
+            Image.new('RGB', (800, 800), (shade, 255 - shade, 128)).save(path)
+
+
+def placeholder_name(index):
+    return f'{PLACEHOLDER_DIRECTORY}/placeholder-{index % PLACEHOLDER_COUNT}.png'
+
+
+# _______________________________________ taxonomy _______________________________________
+
+class Taxonomy:
+    """
+    The reference rows every product points to, created once per run.
+    """
+
+    def __init__(self, rng, prefix, stats, base_categories=4, brands=60):
+        bases = [
+            BaseCategorys(name=f"{prefix}base{i}", en_name=f"{prefix}base{i}", description="-")
+            for i in range(base_categories)
+        ]
+        BaseCategorys.objects.bulk_create(bases)
+        base_ids = dict(BaseCategorys.objects.filter(name__in=[b.name for b in bases]).values_list('name', 'id'))
+
+        # درخت سه سطحی: ریشه ها، زیر دسته ها و برگ ها
+        self.leaves = []
+        level = [(None, base_ids[b.name], f"{prefix}c{i}") for i, b in enumerate(bases)]
+        for width in (3, 3, 0):
+            categories = [
+                Category(parent_id=parent, base_catgory_id=base, name=name, en_name=name, description="-")
+                for parent, base, name in level
+            ]
+            Category.objects.bulk_create(categories)
+            stats.add(Category, len(categories))
+            ids = dict(Category.objects.filter(name__in=[c.name for c in categories]).values_list('name', 'id'))
+            if not width:
+                self.leaves = [(ids[name], base) for _, base, name in level]
+                break
+            level = [
+                (ids[name], base, f"{name}.{j}")
+                for _, base, name in level
+                for j in range(rng.randint(1, width))
+            ]
+        rebuild_category_tree()
+
+        # ویژگی های هر دسته برگ
+        attributes = [
+            CategoryAttribute(category_id=category_id, title=title, description="-")
+            for category_id, _ in self.leaves
+            for title in rng.sample(ATTRIBUTE_TITLES, 4)
+        ]
+        CategoryAttribute.objects.bulk_create(attributes)
+        stats.add(CategoryAttribute, len(attributes))
+        self.attributes = {}
+        leaf_ids = [category_id for category_id, _ in self.leaves]
+        for pk, category_id in CategoryAttribute.objects.filter(category_id__in=leaf_ids).order_by('id').values_list('id', 'category_id'):
+            self.attributes.setdefault(category_id, []).append(pk)
+        through = Category.attributes.through
+        through.objects.bulk_create([
+            through(category_id=category_id, categoryattribute_id=pk)
+            for category_id, pks in self.attributes.items() for pk in pks
+        ])
+
+        names = [f"{prefix}brand{i}" for i in range(brands)]
+        Brand.objects.bulk_create(Brand(name=name, en_name=name) for name in names)
+        stats.add(Brand, brands)
+        self.brands = list(Brand.objects.filter(name__in=names).order_by('id').values_list('id', flat=True))
+        Brand.category.through.objects.bulk_create([
+            Brand.category.through(brand_id=brand, category_id=rng.choice(leaf_ids))
+            for brand in self.brands
+        ], ignore_conflicts=True)
+        BaseCategorys.brands.through.objects.bulk_create([
+            BaseCategorys.brands.through(basecategorys_id=base_ids[rng.choice(bases).name], brand_id=brand)
+            for brand in self.brands
+        ], ignore_conflicts=True)
+
+        palette = BaseColor.COLOR_PALETTE
+        base_colors = [BaseColor(name=f"{prefix}{name}", color=code) for code, name in palette]
+        BaseColor.objects.bulk_create(base_colors)
+        base_color_ids = list(
+            BaseColor.objects.filter(name__in=[c.name for c in base_colors]).order_by('id').values_list('id', flat=True)
+        )
+        colors = [
+            Color(name=f"{prefix}color{i}", hex_code=f"#{rng.randrange(0x1000000):06X}", base_color_id=base_color_ids[i % len(palette)])
+            for i in range(24)
+        ]
+        Color.objects.bulk_create(colors)
+        stats.add(Color, len(colors))
+        self.colors = list(Color.objects.filter(name__startswith=f"{prefix}color").order_by('id').values_list('id', flat=True))
+
+        # سایزها جدول مرجع مشترک هستند؛ فقط سایزهای موجود نیستند ساخته می‌شوند
+        wanted = [Size(size=code, category='clothing') for code, _ in Size.SIZE_CHOICES]
+        wanted += [Size(number_size=number, category='shoes') for number in SHOE_SIZES]
+        existing_letters = set(Size.objects.exclude(size=None).values_list('size', flat=True))
+        existing_numbers = set(Size.objects.exclude(number_size=None).values_list('number_size', flat=True))
+        Size.objects.bulk_create(
+            size for size in wanted
+            if (size.size and size.size not in existing_letters) or (size.number_size and size.number_size not in existing_numbers)
+        )
+        self.sizes = list(Size.objects.order_by('id').values_list('id', flat=True))
+        self.storages = [code for code, _ in ProductPackage.STORAGE_CHOICES]
+
+
+# _______________________________________ products _______________________________________
+
+def package_variants(rng, taxonomy, count):
+    """
+    `count` distinct (color, size, storage) combinations for one product.
+    """
+    kind = rng.choice(('storage', 'size', 'color'))
+    color_offset = rng.randrange(len(taxonomy.colors))
+    variants = []
+    for j in range(count):
+        color = taxonomy.colors[(color_offset + j) % len(taxonomy.colors)]
+        step = j // len(taxonomy.colors)
+        if kind == 'storage':
+            variants.append((color, None, taxonomy.storages[step % len(taxonomy.storages)]))
+        elif kind == 'size':
+            variants.append((color, taxonomy.sizes[step % len(taxonomy.sizes)], None))
+        else:
+            variants.append((color, None, None))
+    return variants
+
+
+def write_product_batch(rng, taxonomy, prefix, start, package_counts, options, stats):
+    names = [f"{prefix}p{start + i} {rng.choice(WORDS)}" for i in range(len(package_counts))]
+    rows = []
+    for name in names:
+        category, _ = rng.choice(taxonomy.leaves)
+        rows.append((name, category, weighted_choice(rng, taxonomy.brands)))
+    Product.objects.bulk_create(
+        Product(
+            name=name, description=' '.join(rng.choices(WORDS, k=12)), is_active=rng.random() < 0.9,
+            brand_id=brand, image=placeholder_name(rng.randrange(PLACEHOLDER_COUNT)),
+        )
+        for name, _, brand in rows
+    )
+    ids = dict(Product.objects.filter(name__in=names).values_list('name', 'id'))
+    product_ids = [ids[name] for name in names]
+    stats.add(Product, len(names))
+
+    through = Product.categories.through
+    through.objects.bulk_create([
+        through(product_id=product_id, category_id=category)
+        for product_id, (_, category, _) in zip(product_ids, rows)
+    ])
+
+    packages = []
+    for product_id, count in zip(product_ids, package_counts):
+        base_price = rng.randrange(200_000, 80_000_000, 10_000)
+        for color, size, storage in package_variants(rng, taxonomy, count):
+            price = base_price + rng.randrange(0, base_price // 2 + 1, 10_000)
+            discount = rng.choice((0, 0, 0, 5, 10, 15, 30))
+            is_active_discount = discount > 0 and rng.random() < 0.7
+            packages.append(ProductPackage(
+                product_id=product_id, price=price, discount=discount, is_active_discount=is_active_discount,
+                final_price=ProductPackage.calculate_final_price(price, discount, is_active_discount),
+                quantity=rng.choice((0, 0, 1, 3, 10, 50, 200)), weight=rng.randrange(50, 5000),
+                is_active_package=rng.random() < 0.9, color_id=color, size_id=size, storage=storage,
+                sold_count=long_tail(rng, 20, 10_000), views_count=long_tail(rng, 500, 1_000_000),
+            ))
+    ProductPackage.objects.bulk_create(packages, batch_size=options['batch_size'])
+    stats.add(ProductPackage, len(packages))
+
+    values = [
+        ProductAttribute(product_id=product_id, attribute_id=attribute, value=f"{rng.choice(WORDS)} {rng.randrange(100)}")
+        for product_id, (_, category, _) in zip(product_ids, rows)
+        for attribute in taxonomy.attributes.get(category, [])
+    ]
+    ProductAttribute.objects.bulk_create(values, batch_size=options['batch_size'])
+    stats.add(ProductAttribute, len(values))
+    through = Product.attributes.through
+    through.objects.bulk_create(
+        [
+            through(product_id=product_id, productattribute_id=pk)
+            for pk, product_id in ProductAttribute.objects.filter(product_id__in=product_ids).values_list('id', 'product_id')
+        ],
+        batch_size=options['batch_size'],
+    )
+
+    gallery = [
+        Gallery(product_id=product_id, image=placeholder_name(rng.randrange(PLACEHOLDER_COUNT)))
+        for product_id in product_ids
+        for _ in range(long_tail(rng, options['gallery'], 12))
+    ]
+    Gallery.objects.bulk_create(gallery, batch_size=options['batch_size'])
+    stats.add(Gallery, len(gallery))
+
+    write_comments(rng, product_ids, options, stats)
+
+    refresh_product_summaries(product_ids)
+    sync_package_ratings(product_ids)
+    index_products(product_ids)
+
+
+def write_comments(rng, product_ids, options, stats):
+    users = options['user_ids']
+    reviews = [
+        Comment(
+            product_id=product_id, user_id=rng.choice(users), rating=rng.choices((1, 2, 3, 4, 5), (1, 1, 2, 4, 6))[0],
+            text=' '.join(rng.choices(WORDS, k=8)), is_approved=rng.random() < 0.85,
+        )
+        for product_id in product_ids
+        for _ in range(long_tail(rng, options['comments'], 2000))
+    ]
+    Comment.objects.bulk_create(reviews, batch_size=options['batch_size'])
+    stats.add(Comment, len(reviews))
+    if not reviews:
+        return
+    # پاسخ ها: حدود یک پنجم نظرات اصلی یک یا چند پاسخ می‌گیرند (root مستقیم پر می‌شود، save اجرا نمی‌شود)
+    roots = Comment.objects.filter(product_id__in=product_ids, parent=None).values_list('id', 'product_id')
+    replies = [
+        Comment(
+            product_id=product_id, user_id=rng.choice(users), parent_id=root, root_id=root, rating=5,
+            text=' '.join(rng.choices(WORDS, k=6)), is_approved=rng.random() < 0.9,
+        )
+        for root, product_id in roots.order_by('id')
+        if rng.random() < 0.2
+        for _ in range(rng.randint(1, 3))
+    ]
+    Comment.objects.bulk_create(replies, batch_size=options['batch_size'])
+    stats.add(Comment, len(replies))
+
+
+def generate_catalog(packages=10_000, packages_per_product=5, comments=3, gallery=3, users=1000,
+                     seed=1, batch_size=5000, images=False, on_batch=None):
+    """
+    Generate about `packages` ProductPackage rows (whole products, so the total
+    can exceed it by less than one product) and everything around them.
+
+    packages_per_product / comments / gallery are means of skewed distributions.
+    Returns GenerateStats with the number of rows per model.
+    """
+    rng = random.Random(seed)
+    prefix = prefix_for(seed)
+    if BaseCategorys.objects.filter(name__startswith=prefix).exists():
+        raise ValueError(f"data for seed {seed} already exists")
+    stats = GenerateStats()
+    started = time.perf_counter()
+    if images:
+        write_placeholder_images()
+
+    with transaction.atomic():
+        taxonomy = Taxonomy(rng, prefix, stats)
+        # bulk_create سیگنال ندارد؛ پاسخ های cache شده taxonomy باید باطل شوند
+        for model in TAXONOMY_MODELS:
+            invalidate(model)
+        usernames = [f"{prefix}user{i}" for i in range(max(users, 1))]
+        # رمز غیر قابل استفاده برای همه؛ hash کردن رمز برای هر کاربر دقیقه ها طول می‌کشد
+        password = make_password(None)
+        User.objects.bulk_create((User(username=name, password=password) for name in usernames), batch_size=batch_size)
+        stats.add(User, len(usernames))
+    options = {
+        'batch_size': batch_size,
+        'comments': comments,
+        'gallery': gallery,
+        'user_ids': list(User.objects.filter(username__in=usernames).values_list('id', flat=True)),
+    }
+
+    # هر دسته محصول حدود batch_size بسته دارد
+    written = 0
+    product_index = 0
+    while written < packages:
+        counts = []
+        while written + sum(counts) < packages and sum(counts) < batch_size:
+            counts.append(1 + long_tail(rng, packages_per_product - 1, 60))
+        with transaction.atomic():
+            write_product_batch(rng, taxonomy, prefix, product_index, counts, options, stats)
+        product_index += len(counts)
+        written += sum(counts)
+        stats.seconds = time.perf_counter() - started
+        if on_batch:
+            on_batch(stats)
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -1,3 +1,1605 @@
-from django.test import TestCase
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+import unittest
+from unittest import mock, skipUnless
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.utils import load_backend
+from django.db.models import Max
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .models import (
+    BaseCategorys, Category, Brand, BaseColor, Color, CategoryAttribute, ProductAttribute, Product,
+    ProductPackage, Gallery, Comment, ProductSummary, SearchIndexEntry, ImageJob,
+    StockReservation, StockReservationItem
+)
+from . import counters
+from .benchmark import measure, reservation_stress
+from .cache import get_cache
+from .catalog_export import export_rows
+from .catalog_import import import_catalog
+from .endpoint_benchmark import compare_results, endpoint_routes, run_endpoint_benchmark, run_renderer_benchmark
+from .fast_serializers import compile_serializer
+from .image_variants import variant_path
+from . import async_views, metrics, replicas
+from .query_plans import SORT_ALLOWED, critical_queries, plan_problems
+from .ratings import reconcile_ratings
+from .renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from .search import normalize
+from .serializers import CategorySerializer, PPackageSerializer, ProductListSerializer, ReviewThreadSerializer
+from .synthetic import generate_catalog
+from .summary import SUMMARY_FIELDS
+
+
+def setUpModule():
+    # cache فایلی taxonomy در پوشه موقت، تا اجرای قبلی تست ها پاسخ کهنه نگذارد
+    directory = tempfile.TemporaryDirectory()
+    taxonomy = dict(settings.CACHES[settings.TAXONOMY_CACHE_ALIAS], LOCATION=directory.name)
+    override = override_settings(CACHES={**settings.CACHES, settings.TAXONOMY_CACHE_ALIAS: taxonomy})
+    override.enable()
+    unittest.addModuleCleanup(directory.cleanup)
+    unittest.addModuleCleanup(override.disable)
+
+
+def make_catalog():
+    """
+    یک دسته بندی، یک ویژگی و یک محصول ساده برای تست ها می‌سازد.
+    """
+    base = BaseCategorys.objects.create(name="دیجیتال", en_name="digital", description="-")
+    category = Category.objects.create(base_catgory=base, name="موبایل", en_name="mobile", description="-")
+    attribute = CategoryAttribute.objects.create(title="باتری", category=category, description="-")
+    category.attributes.add(attribute)
+    product = Product.objects.create(name="گوشی", description="-", is_active=True)
+    product.categories.add(category)
+    return category, attribute, product
+
+
+def use_temp_counters(test):
+    """
+    شمارنده های بازدید را در یک پوشه موقت و بدون thread بافر می‌کند.
+    """
+    journal = tempfile.TemporaryDirectory()
+    test.addCleanup(journal.cleanup)
+    buffer = counters.CounterBuffer(directory=journal.name, interval=0)
+    previous, counters._buffer = counters._buffer, buffer
+    test.addCleanup(setattr, counters, "_buffer", previous)
+    return buffer
+
+
+class ProductRetrieveQueryCountTests(TestCase):
+    """
+    GET /store/products/{id}/ must cost the same number of queries whatever
+    the size of the product's packages, gallery and comments.
+    """
+    MAX_QUERIES = 8
+
+    def setUp(self):
+        use_temp_counters(self)
+        self.client = APIClient()
+        self.category, self.attribute, self.product = make_catalog()
+        self.user = User.objects.create_user(username="buyer", password="pass")
+
+    def grow(self, count):
+        for i in range(count):
+            ProductPackage.objects.create(product=self.product, price=1000 + i, quantity=i)
+            Gallery.objects.create(product=self.product)
+            Comment.objects.create(user=self.user, product=self.product, text="-", rating=5)
+            value = ProductAttribute.objects.create(product=self.product, attribute=self.attribute, value=str(i))
+            self.product.attributes.add(value)
+
+    def retrieve(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/store/products/{self.product.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), self.MAX_QUERIES)
+        return response.json()
+
+    def test_query_count_is_constant(self):
+        self.grow(1)
+        data = self.retrieve()
+        self.assertEqual(len(data["product_packages"]), 1)
+
+        self.grow(25)
+        data = self.retrieve()
+        self.assertEqual(len(data["product_packages"]), 26)
+        self.assertEqual(len(data["gallery_images"]), 26)
+        self.assertEqual(len(data["comments"]), 26)
+        self.assertEqual(len(data["product_attributes"]), 26)
+        self.assertEqual(data["product_packages"][0]["product"]["id"], self.product.id)
+        self.assertEqual(data["categories"][0]["category_attributes"][0]["id"], self.attribute.id)
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Walking the cursor links must visit every row exactly once, even when
+    rows are inserted between two page requests.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        _, _, self.product = make_catalog()
+        for i in range(7):
+            ProductPackage.objects.create(product=self.product, price=1000 * (i % 3))
+
+    def walk(self, url, insert_after_first=False):
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            seen += [row["id"] for row in data["results"]]
+            url = data["next"]
+            if insert_after_first:
+                ProductPackage.objects.create(product=self.product, price=0)
+                insert_after_first = False
+        return seen
+
+    def test_pages_cover_every_row_once(self):
+        seen = self.walk("/store/product-packages/?page_size=3&ordering=-final_price")
+        expected = list(
+            ProductPackage.objects.order_by("-final_price", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_concurrent_insert_does_not_shift_pages(self):
+        before = set(ProductPackage.objects.values_list("id", flat=True))
+        seen = self.walk("/store/product-packages/?page_size=2&ordering=-final_price", insert_after_first=True)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertTrue(before <= set(seen))
+
+    def test_previous_link_returns_same_page(self):
+        first = self.client.get("/store/product-packages/?page_size=3").json()
+        second = self.client.get(first["next"]).json()
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual(back["results"], first["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_count_is_opt_in(self):
+        self.assertNotIn("count", self.client.get("/store/product-packages/").json())
+        data = self.client.get("/store/product-packages/?with_count=1").json()
+        self.assertEqual(data["count"], 7)
+
+
+class ProductSummaryTests(TestCase):
+    """
+    ProductSummary must follow package and comment writes and match a full rebuild.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        _, _, self.product = make_catalog()
+        self.user = User.objects.create_user(username="buyer", password="pass")
+
+    def summary(self):
+        return ProductSummary.objects.get(product=self.product)
+
+    def test_incremental_updates(self):
+        cheap = ProductPackage.objects.create(
+            product=self.product, price=1000, quantity=2, is_active_package=True,
+            discount=10, is_active_discount=True,
+        )
+        ProductPackage.objects.create(product=self.product, price=5000, quantity=3, is_active_package=True)
+        ProductPackage.objects.create(product=self.product, price=10, quantity=9)  # غیر فعال
+        summary = self.summary()
+        self.assertEqual((summary.min_final_price, summary.max_final_price), (900, 5000))
+        self.assertEqual((summary.max_discount, summary.total_quantity, summary.in_stock), (10, 5, True))
+
+        review = Comment.objects.create(user=self.user, product=self.product, text="-", rating=4, is_approved=True)
+        Comment.objects.create(user=self.user, product=self.product, text="-", rating=1)  # تایید نشده
+        Comment.objects.create(user=self.user, product=self.product, parent=review, text="-", rating=1, is_approved=True)
+        summary = self.summary()
+        self.assertEqual((summary.rating_avg, summary.review_count), (4, 1))
+
+        cheap.delete()
+        self.assertEqual(self.summary().min_final_price, 5000)
+
+    def test_rebuild_matches_incremental(self):
+        ProductPackage.objects.create(product=self.product, price=700, quantity=1, is_active_package=True)
+        Comment.objects.create(user=self.user, product=self.product, text="-", rating=5, is_approved=True)
+        expected = {f: getattr(self.summary(), f) for f in SUMMARY_FIELDS}
+        ProductSummary.objects.all().delete()
+        call_command("rebuild_product_summaries", stdout=StringIO())
+        self.assertEqual({f: getattr(self.summary(), f) for f in SUMMARY_FIELDS}, expected)
+
+    def test_list_filters_and_sorts_on_summary(self):
+        other = Product.objects.create(name="لپ تاپ", description="-")
+        ProductPackage.objects.create(product=self.product, price=3000, quantity=1, is_active_package=True)
+        ProductPackage.objects.create(product=other, price=2000, quantity=0, is_active_package=True)
+
+        data = self.client.get("/store/products/?ordering=min_price").json()
+        self.assertEqual([row["id"] for row in data["results"]], [other.id, self.product.id])
+        self.assertEqual(data["results"][0]["summary"]["min_final_price"], 2000)
+
+        data = self.client.get("/store/products/?in_stock=1").json()
+        self.assertEqual([row["id"] for row in data["results"]], [self.product.id])
+
+
+class ProductFacetTests(TestCase):
+    """
+    Filters narrow the page while each facet ignores its own dimension.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.parent, _, self.phone = make_catalog()
+        self.child = Category.objects.create(
+            base_catgory=self.parent.base_catgory, parent=self.parent, name="گیمینگ", en_name="gaming", description="-",
+        )
+        self.apple = Brand.objects.create(name="اپل", en_name="apple")
+        self.sony = Brand.objects.create(name="سونی", en_name="sony")
+        red = BaseColor.objects.create(name="red", color="#FF0000")
+        self.red = Color.objects.create(name="قرمز", hex_code="#FF0000", base_color=red)
+
+        self.phone.brand = self.apple
+        self.phone.save()
+        self.laptop = Product.objects.create(name="لپ تاپ", description="-", brand=self.sony)
+        self.laptop.categories.add(self.child)
+        ProductPackage.objects.create(product=self.phone, price=2_000_000, quantity=1, is_active_package=True, storage="256", color=self.red)
+        ProductPackage.objects.create(product=self.laptop, price=30_000_000, quantity=0, is_active_package=True, storage="512")
+
+    def get(self, query):
+        response = self.client.get("/store/products/" + query)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row["id"] for row in data["results"]], data["facets"]
+
+    def test_category_includes_descendants(self):
+        ids, facets = self.get(f"?category={self.parent.id}")
+        self.assertEqual(sorted(ids), sorted([self.phone.id, self.laptop.id]))
+        self.assertEqual(facets["category"], {str(self.parent.id): 1, str(self.child.id): 1})
+
+    def test_facets_ignore_their_own_dimension(self):
+        ids, facets = self.get(f"?brand={self.apple.id}&storage=256")
+        self.assertEqual(ids, [self.phone.id])
+        self.assertEqual(facets["brand"], {str(self.apple.id): 1})
+        self.assertEqual(facets["storage"], {"256": 1})
+
+        ids, facets = self.get(f"?brand={self.sony.id}")
+        self.assertEqual(ids, [self.laptop.id])
+        self.assertEqual(facets["brand"], {str(self.apple.id): 1, str(self.sony.id): 1})
+        self.assertEqual(facets["in_stock"], {"in_stock": 0, "out_of_stock": 1})
+        self.assertEqual(facets["price"]["20000000-50000000"], 1)
+
+    def test_package_filters_match_the_same_package(self):
+        ids, facets = self.get(f"?base_color={self.red.base_color_id}&storage=512")
+        self.assertEqual(ids, [])
+        self.assertEqual(facets["storage"], {"256": 1})
+
+    def test_query_count_is_bounded(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get(f"?category={self.parent.id}&brand={self.apple.id}&base_color={self.red.base_color_id}&in_stock=1")
+        self.assertLessEqual(len(queries), 12)
+
+
+class ProductSearchTests(TestCase):
+    """
+    Search normalizes Persian / Arabic spellings and follows catalog edits.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category, _, self.phone = make_catalog()
+        self.brand = Brand.objects.create(name="سامسونگ", en_name="Samsung")
+        self.phone.name = "گوشی گلکسی ۱۲۸ گیگ"
+        self.phone.brand = self.brand
+        self.phone.save()
+        Product.objects.create(name="کیف لپ‌تاپ", description="کیف مناسب لپ تاپ")
+
+    def search(self, query):
+        data = self.client.get("/store/products/search/", {"q": query}).json()
+        return [row["id"] for row in data["results"]]
+
+    def test_normalization(self):
+        self.assertEqual(normalize("كيف لپ‌تاپ ١٢٨"), "کیف لپتاپ 128")
+        self.assertEqual(self.search("گوشي 128"), [self.phone.id])  # ی عربی و ارقام لاتین
+        self.assertEqual(len(self.search("لپتاپ")), 1)
+
+    def test_brand_category_and_prefix(self):
+        self.assertEqual(self.search("samsung گلک"), [self.phone.id])
+        self.assertEqual(self.search("mobile"), [self.phone.id])
+        self.assertEqual(self.search("samsung کیف"), [])
+
+    def test_index_follows_edits(self):
+        self.brand.en_name = "Galaxy-Corp"
+        self.brand.save()
+        self.assertEqual(self.search("samsung"), [])
+        self.assertEqual(self.search("corp"), [self.phone.id])
+
+        self.phone.categories.clear()
+        self.assertEqual(self.search("mobile"), [])
+        self.category.product_set.add(self.phone)
+        self.assertEqual(self.search("mobile"), [self.phone.id])
+
+    def test_ranking_prefers_name(self):
+        case = Product.objects.create(name="قاب", description="قاب مناسب گوشی")
+        self.assertEqual(self.search("گوشی"), [self.phone.id, case.id])
+
+    def test_rebuild(self):
+        expected = sorted(SearchIndexEntry.objects.values_list("term", "product_id", "weight"))
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(sorted(SearchIndexEntry.objects.values_list("term", "product_id", "weight")), expected)
+
+
+class TaxonomyCacheTests(TestCase):
+    """
+    Taxonomy responses are served from cache until a dependent model changes.
+    """
+
+    def setUp(self):
+        caches[settings.TAXONOMY_CACHE_ALIAS].clear()
+        use_temp_counters(self)
+        self.client = APIClient()
+        self.category, self.attribute, _ = make_catalog()
+        self.brand = Brand.objects.create(name="اپل", en_name="apple")
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_after_miss(self):
+        self.assertEqual(self.get("/store/brands/")["X-Cache"], "MISS")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get("/store/brands/")["X-Cache"], "HIT")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.get("/store/brands/?page_size=1")["X-Cache"], "MISS")
+
+    def test_precise_invalidation(self):
+        self.get("/store/brands/")
+        self.get("/store/colors/")
+        Brand.objects.create(name="سونی", en_name="sony")
+        response = self.get("/store/brands/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertEqual(self.get("/store/colors/")["X-Cache"], "HIT")
+
+    def test_m2m_invalidation(self):
+        base = self.category.base_catgory
+        self.get(f"/store/base-categories/{base.id}/")
+        base.brands.add(self.brand)
+        response = self.get(f"/store/base-categories/{base.id}/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual([b["id"] for b in response.json()["brands"]], [self.brand.id])
+
+        self.get(f"/store/brands/{self.brand.id}/")
+        self.brand.category.add(self.category)
+        self.assertEqual(self.get(f"/store/brands/{self.brand.id}/").json()["category"], [self.category.id])
+
+    def test_related_model_invalidation(self):
+        self.get("/store/categories/")
+        self.attribute.title = "دوربین"
+        self.attribute.save()
+        data = self.get("/store/categories/").json()
+        self.assertEqual(data["results"][0]["category_attributes"][0]["title"], "دوربین")
+
+    def test_stats(self):
+        self.get("/store/sizes/")
+        self.get("/store/sizes/")
+        admin = User.objects.create_superuser(username="admin", password="pass")
+        self.client.force_authenticate(admin)
+        stats = self.get("/store/cache-stats/").json()
+        self.assertEqual(stats["sizes"], {"hits": 1, "misses": 1})
+
+
+class CategoryTreeTests(TestCase):
+    """
+    Category.tree_path follows creates and moves and serves subtree queries.
+    """
+
+    def setUp(self):
+        caches[settings.TAXONOMY_CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.root, _, self.phone = make_catalog()
+        base = self.root.base_catgory
+        self.child = Category.objects.create(base_catgory=base, parent=self.root, name="c", en_name="c", description="-")
+        self.leaf = Category.objects.create(base_catgory=base, parent=self.child, name="l", en_name="l", description="-")
+        self.other = Category.objects.create(base_catgory=base, name="o", en_name="o", description="-")
+        self.laptop = Product.objects.create(name="لپ تاپ", description="-")
+        self.laptop.categories.add(self.leaf)
+
+    def test_paths(self):
+        self.assertEqual(self.leaf.tree_path, f"{self.root.id}/{self.child.id}/{self.leaf.id}/")
+        self.assertEqual(self.leaf.depth, 2)
+
+    def test_move_rewrites_subtree(self):
+        self.child.parent = self.other
+        self.child.save()
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.tree_path, f"{self.other.id}/{self.child.id}/{self.leaf.id}/")
+        self.assertEqual(self.leaf.depth, 2)
+        self.assertEqual(self.root.get_descendant_ids(), set())
+
+        with self.assertRaises(ValidationError):
+            self.other.parent = self.leaf
+            self.other.save()
+
+    def test_products_with_descendants(self):
+        url = f"/store/categories/{self.root.id}/products/"
+        self.assertEqual([p["id"] for p in self.client.get(url).json()], [self.phone.id])
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url + "?include_descendants=1").json()
+        self.assertEqual(sorted(p["id"] for p in data), sorted([self.phone.id, self.laptop.id]))
+        self.assertLessEqual(len(queries), 4)
+
+        Category.objects.filter(pk=self.root.pk).update(tree_path="")
+        other = Product.objects.create(name="other", description="-")
+        other.categories.add(self.other)
+        caches[settings.TAXONOMY_CACHE_ALIAS].clear()
+        data = self.client.get(url + "?include_descendants=1").json()
+        self.assertEqual([p["id"] for p in data], [self.phone.id])
+
+    def test_tree_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            tree = self.client.get("/store/categories/tree/").json()
+        self.assertEqual(len(queries), 1)
+        root = next(node for node in tree if node["id"] == self.root.id)
+        self.assertEqual(root["children"][0]["children"][0]["id"], self.leaf.id)
+
+    def test_rebuild_and_check(self):
+        Category.objects.update(tree_path="", depth=0)
+        url = f"/store/categories/{self.leaf.id}/"
+        self.assertEqual(self.client.get(url).json()["tree_path"], "")
+        with self.assertRaises(CommandError):
+            call_command("rebuild_category_tree", "--check", stdout=StringIO(), stderr=StringIO())
+        call_command("rebuild_category_tree", stdout=StringIO())
+        call_command("rebuild_category_tree", "--check", stdout=StringIO())
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.tree_path, f"{self.root.id}/{self.child.id}/{self.leaf.id}/")
+        # پاسخ cache شده هم باطل شده است
+        self.assertEqual(self.client.get(url).json()["tree_path"], self.leaf.tree_path)
+
+
+def make_png(size=(1000, 600)):
+    buffer = BytesIO()
+    PILImage.new("RGB", size, "red").save(buffer, format="PNG")
+    return SimpleUploadedFile("logo.png", buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(IMAGE_JOBS_ASYNC=False)
+class ImageJobTests(TestCase):
+    """
+    save() only queues a job when the image changed; the job resizes after commit.
+    """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_job_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            brand = Brand.objects.create(name="اپل", en_name="apple", logo=make_png())
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.width, job.height), (ImageJob.PENDING, 300, 300))
+        with PILImage.open(brand.logo.path) as img:
+            self.assertEqual(img.size, (1000, 600))  # هنوز پردازش نشده
+
+        for callback in callbacks:
+            callback()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+        with PILImage.open(brand.logo.path) as img:
+            self.assertEqual(img.size, (300, 180))
+
+    def test_unchanged_image_is_not_requeued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="گوشی", description="-", image=make_png())
+        product = Product.objects.get(pk=product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = "گوشی ۲"
+            product.save()
+        self.assertEqual(ImageJob.objects.count(), 1)
+        with PILImage.open(product.image.path) as img:
+            self.assertEqual(img.size, (800, 800))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = make_png()
+            product.save()
+        self.assertEqual(ImageJob.objects.filter(status=ImageJob.DONE).count(), 2)
+
+    def test_command_drains_backlog(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            brand = Brand.objects.create(name="اپل", en_name="apple", logo=make_png())
+        call_command("process_image_jobs", "--workers", "0", stdout=StringIO())
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.DONE)
+        with PILImage.open(brand.logo.path) as img:
+            self.assertEqual(img.size, (300, 180))
+
+
+@override_settings(IMAGE_JOBS_ASYNC=False)
+class ImageVariantTests(TestCase):
+    """
+    Serializers expose variant URLs; variants are generated once and then read from disk.
+    """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        caches[settings.TAXONOMY_CACHE_ALIAS].clear()
+        self.client = APIClient()
+
+    def test_brand_variants(self):
+        brand = Brand.objects.create(name="اپل", en_name="apple", logo=make_png())
+        data = self.client.get(f"/store/brands/{brand.id}/").json()
+        url = data["logo_variants"]["webp"]["128w"]
+        self.assertEqual(set(data["logo_variants"]["webp"]), {"64w", "128w", "300w"})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        with PILImage.open(BytesIO(b"".join(response.streaming_content))) as img:
+            self.assertEqual((img.format, img.width), ("WEBP", 128))
+        path = variant_path(brand.logo.name, 128, "webp")
+        self.assertTrue(os.path.isfile(path))
+
+        # دومین درخواست از دیسک خوانده می‌شود
+        mtime = os.path.getmtime(path)
+        self.client.get(url)
+        self.assertEqual(os.path.getmtime(path), mtime)
+
+    def test_rejects_unknown_sizes_and_paths(self):
+        brand = Brand.objects.create(name="اپل", en_name="apple", logo=make_png())
+        self.assertEqual(self.client.get(f"/store/image-variants/123/webp/{brand.logo.name}").status_code, 404)
+        self.assertEqual(self.client.get(f"/store/image-variants/128/tiff/{brand.logo.name}").status_code, 404)
+        self.assertEqual(self.client.get("/store/image-variants/128/webp/brands/../../etc/passwd").status_code, 404)
+
+    def test_product_without_image(self):
+        _, _, product = make_catalog()
+        data = self.client.get(f"/store/products/{product.id}/").json()
+        self.assertIsNone(data["image_variants"])
+
+
+class CounterBufferTests(TestCase):
+    """
+    Buffered counters are applied exactly once, also after a crash.
+    """
+
+    def setUp(self):
+        self.buffer = use_temp_counters(self)
+        _, _, self.product = make_catalog()
+        self.package = ProductPackage.objects.create(product=self.product, price=1000)
+        self.other = ProductPackage.objects.create(product=self.product, price=2000)
+
+    def views(self, package):
+        package.refresh_from_db()
+        return package.views_count
+
+    def test_flush_applies_batched_update(self):
+        for _ in range(3):
+            self.buffer.increment(self.package.id, "views_count")
+        self.buffer.increment(self.other.id, "sold_count", 2)
+        self.assertEqual(self.views(self.package), 0)
+        self.assertEqual(self.buffer.get_counts([self.package.id])[self.package.id]["views_count"], 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.buffer.flush()
+        self.assertEqual(sum(1 for q in queries if q["sql"].startswith("UPDATE")), 1)
+        self.assertEqual(self.views(self.package), 3)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.sold_count, 2)
+        self.assertEqual(self.buffer.pending(self.package.id, "views_count"), 0)
+        self.assertEqual(os.listdir(self.buffer.directory), [])
+
+    def test_dead_process_journal_is_recovered_once(self):
+        dead = os.path.join(self.buffer.directory, "journal-999999999-1-1.log")
+        with open(dead, "w") as journal:
+            journal.write(f"{self.package.id} views_count 4\n{self.package.id} views_coun")  # خط ناقص
+        self.assertEqual(counters.recover(self.buffer.directory), 1)
+        self.assertEqual(self.views(self.package), 4)
+
+        # crash بعد از commit: فایل pending دوباره اعمال نمی‌شود
+        with open(os.path.join(self.buffer.directory, "journal-999999999-1-1.pending"), "w") as journal:
+            journal.write(f"{self.package.id} views_count 4\n")
+        counters.recover(self.buffer.directory)
+        self.assertEqual(self.views(self.package), 4)
+
+    def test_api_reads_include_pending_views(self):
+        client = APIClient()
+        client.get(f"/store/product-packages/{self.package.id}/")
+        client.get(f"/store/product-packages/{self.package.id}/")
+        data = client.get(f"/store/product-packages/{self.package.id}/").json()
+        self.assertEqual(data["views_count"], 2)
+        self.assertEqual(self.views(self.package), 0)
+        self.buffer.flush()
+        self.assertEqual(self.views(self.package), 3)
+
+
+class StockReservationTests(TestCase):
+    """
+    Reservations take stock atomically and give it back exactly once.
+    """
+
+    def setUp(self):
+        use_temp_counters(self)
+        _, _, self.product = make_catalog()
+        self.first = ProductPackage.objects.create(product=self.product, price=1000, quantity=3, is_active_package=True)
+        self.second = ProductPackage.objects.create(product=self.product, price=2000, quantity=1, is_active_package=True)
+        self.user = User.objects.create_user(username="buyer", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def reserve(self, *items):
+        return self.client.post(
+            "/store/reservations/",
+            {"items": [{"package": package.id, "quantity": quantity} for package, quantity in items]},
+            format="json",
+        )
+
+    def stock(self, package):
+        package.refresh_from_db()
+        return package.quantity, package.sold_count
+
+    def test_reserve_decrements_and_bumps_sold_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.reserve((self.first, 2), (self.second, 1))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["status"], "reserved")
+        self.assertEqual(self.stock(self.first), (1, 2))
+        self.assertEqual(self.stock(self.second), (0, 1))
+        self.assertEqual(ProductSummary.objects.get(product=self.product).total_quantity, 1)
+
+    def test_short_package_rolls_back_every_item(self):
+        response = self.reserve((self.first, 1), (self.second, 2))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["package"], self.second.id)
+        self.assertEqual(self.stock(self.first), (3, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_and_release(self):
+        kept = self.reserve((self.first, 1)).json()["id"]
+        dropped = self.reserve((self.first, 1)).json()["id"]
+        self.assertEqual(self.client.post(f"/store/reservations/{kept}/checkout/").json()["status"], "confirmed")
+        self.assertEqual(self.client.post(f"/store/reservations/{dropped}/release/").json()["status"], "released")
+        self.assertEqual(self.client.post(f"/store/reservations/{dropped}/release/").status_code, 409)
+        self.assertEqual(self.client.post(f"/store/reservations/{kept}/release/").status_code, 409)
+        self.assertEqual(self.stock(self.first), (2, 1))
+
+    def test_expired_reservations_are_released(self):
+        reservation_id = self.reserve((self.first, 3)).json()["id"]
+        StockReservation.objects.filter(pk=reservation_id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.post(f"/store/reservations/{reservation_id}/checkout/").status_code, 409)
+        call_command("release_expired_reservations", stdout=StringIO())
+        self.assertEqual(self.stock(self.first), (3, 0))
+        self.assertEqual(StockReservation.objects.get(pk=reservation_id).status, StockReservation.RELEASED)
+
+    def test_reservations_are_private(self):
+        reservation_id = self.reserve((self.first, 1)).json()["id"]
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="pass"))
+        self.assertEqual(other.get(f"/store/reservations/{reservation_id}/").status_code, 404)
+        self.assertEqual(other.post(f"/store/reservations/{reservation_id}/release/").status_code, 404)
+
+
+class StockReservationStressTests(TransactionTestCase):
+    """
+    Many threads racing for the same units never oversell.
+    """
+
+    def setUp(self):
+        # sqlite قفل جدول ProductSummary را در callback بعد از commit گزارش می‌کند؛ رزرو موفق است
+        logger = logging.getLogger("django.db.backends.base")
+        level, logger.level = logger.level, logging.CRITICAL
+        self.addCleanup(setattr, logger, "level", level)
+
+    def test_concurrent_reservations_never_oversell(self):
+        product = Product.objects.create(name="flash", description="-", is_active=True)
+        packages = [
+            ProductPackage.objects.create(product=product, price=1000, quantity=25, is_active_package=True)
+            for _ in range(2)
+        ]
+        results = reservation_stress([p.id for p in packages], threads=6, attempts=15)
+
+        self.assertEqual(results["reserved"], 50)
+        self.assertEqual(results["rejected"], 6 * 15 - 50)
+        self.assertGreater(results["reservations_per_second"], 0)
+        for package in packages:
+            package.refresh_from_db()
+            self.assertEqual((package.quantity, package.sold_count), (0, 25))
+        self.assertEqual(StockReservationItem.objects.count(), 50)
+
+
+class CatalogImportTests(TestCase):
+    """
+    The bulk importer upserts rows in batches with a fixed number of queries.
+    """
+
+    def setUp(self):
+        self.category, self.attribute, _ = make_catalog()
+        self.brand = Brand.objects.create(name="سامسونگ", en_name="Samsung")
+        self.color = Color.objects.create(name="مشکی", hex_code="#000000")
+
+    def jsonl(self, count, price=1000, discount=10):
+        return StringIO("".join(
+            json.dumps({
+                "name": f"galaxy {i}", "description": "-", "is_active": True, "brand": "samsung",
+                "categories": ["mobile"], "attributes": {"باتری": f"{4000 + i}"},
+                "price": price, "discount": discount, "is_active_discount": True,
+                "quantity": 5, "color": "مشکی", "storage": "256",
+            }) + "\n"
+            for i in range(count)
+        ))
+
+    def test_import_creates_rows_with_final_price(self):
+        stats = import_catalog(self.jsonl(3), "jsonl", batch_size=2)
+        self.assertEqual((stats.rows, stats.error_count), (3, 0))
+        self.assertEqual((stats.products_created, stats.packages_created), (3, 3))
+        package = ProductPackage.objects.get(product__name="galaxy 1")
+        self.assertEqual((package.final_price, package.color_id, package.storage), (900, self.color.id, "256"))
+        product = package.product
+        self.assertEqual(product.brand_id, self.brand.id)
+        self.assertEqual(list(product.categories.all()), [self.category])
+        self.assertEqual([a.value for a in product.attributes.all()], ["4001"])
+        self.assertEqual(product.summary.min_final_price, 900)
+        self.assertTrue(SearchIndexEntry.objects.filter(product=product, term="galaxy").exists())
+
+    def test_reimport_updates_in_place(self):
+        import_catalog(self.jsonl(3), "jsonl")
+        stats = import_catalog(self.jsonl(3, price=2000, discount=0), "jsonl")
+        self.assertEqual((stats.products_updated, stats.packages_updated), (3, 3))
+        self.assertEqual(Product.objects.filter(name__startswith="galaxy").count(), 3)
+        self.assertEqual(ProductPackage.objects.count(), 3)
+        self.assertEqual(ProductAttribute.objects.count(), 3)
+        self.assertEqual(set(ProductPackage.objects.values_list("final_price", flat=True)), {2000})
+
+    def test_queries_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            import_catalog(self.jsonl(5), "jsonl", batch_size=100)
+        ProductPackage.objects.all().delete()
+        Product.objects.filter(name__startswith="galaxy").delete()
+        with CaptureQueriesContext(connection) as large:
+            import_catalog(self.jsonl(50), "jsonl", batch_size=100)
+        self.assertLessEqual(len(large), len(small) + 2)
+
+    def test_csv_and_invalid_rows(self):
+        data = StringIO(
+            "name,categories,price,discount,is_active_discount,color,attr:باتری\n"
+            "tab,mobile,5000,20,1,مشکی,8000\n"
+            "bad,mobile,abc,,,,\n"
+            "worse,unknown,100,,,,\n"
+            f"long,mobile,100,,,,{'9' * 51}\n"
+            f"{'n' * 151},mobile,100,,,,\n"
+        )
+        stats = import_catalog(data, "csv")
+        self.assertEqual(stats.error_count, 4)
+        self.assertEqual([line for line, _ in stats.errors], [3, 4, 5, 6])
+        self.assertIn("longer than 50", stats.errors[2][1])
+        self.assertIn("name is longer than 150", stats.errors[3][1])
+        package = ProductPackage.objects.get(product__name="tab")
+        self.assertEqual(package.final_price, 4000)
+        self.assertEqual(ProductAttribute.objects.get(product=package.product).value, "8000")
+
+    def test_command_reports_rate(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as file:
+            file.write(self.jsonl(2).getvalue())
+        self.addCleanup(os.unlink, file.name)
+        out = StringIO()
+        call_command("import_catalog", file.name, stdout=out)
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(Product.objects.filter(name__startswith="galaxy").count(), 2)
+
+
+class CatalogExportTests(TestCase):
+    """
+    The export streams one row per package with a query count independent of the catalog size.
+    """
+
+    def setUp(self):
+        self.category, self.attribute, self.product = make_catalog()
+        value = ProductAttribute.objects.create(product=self.product, attribute=self.attribute, value="5000")
+        self.product.attributes.add(value)
+        ProductPackage.objects.create(product=self.product, price=1000, discount=10, is_active_discount=True, storage="128")
+        ProductPackage.objects.create(product=self.product, price=2000)
+        Product.objects.create(name="بدون بسته", description="-")
+        self.admin = User.objects.create_user(username="admin", password="pass", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def rows(self, response):
+        self.assertTrue(response.streaming)
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+    def test_jsonl_rows(self):
+        rows = self.rows(self.client.get("/store/products/export/"))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["final_price"], 900)
+        self.assertEqual(rows[0]["categories"], ["موبایل"])
+        self.assertEqual(rows[0]["attributes"], {"باتری": "5000"})
+        self.assertNotIn("price", rows[2])
+
+    def test_queries_per_chunk(self):
+        for i in range(10):
+            product = Product.objects.create(name=f"p{i}", description="-")
+            ProductPackage.objects.create(product=product, price=i + 1)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export_rows(chunk_size=100))
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(len(queries), 5)  # یک chunk محصول + بسته ها + دسته بندی ها + ویژگی ها + chunk خالی
+
+    def test_csv_round_trips_through_import(self):
+        response = self.client.get("/store/products/export/?type=csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        data = b"".join(response.streaming_content).decode()
+        self.assertTrue(data.startswith("product_id,name,"))
+        self.assertIn("attr:باتری", data.splitlines()[0])
+        stats = import_catalog(StringIO(data), "csv")
+        self.assertEqual((stats.error_count, stats.packages_created, stats.products_created), (0, 0, 0))
+        self.assertEqual(ProductPackage.objects.count(), 2)
+
+    def test_export_requires_admin(self):
+        self.assertIn(APIClient().get("/store/products/export/").status_code, (401, 403))
+        self.assertEqual(self.client.get("/store/products/export/?type=xml").status_code, 400)
+
+
+class BulkPriceUpdateTests(TestCase):
+    """
+    Batch price changes run as one UPDATE and keep final_price identical to save().
+    """
+
+    def setUp(self):
+        self.category, _, self.product = make_catalog()
+        self.brand = Brand.objects.create(name="اپل", en_name="Apple")
+        self.child = Category.objects.create(
+            base_catgory=self.category.base_catgory, parent=self.category, name="گوشی", en_name="phone", description="-",
+        )
+        self.phone = Product.objects.create(name="آیفون", description="-", brand=self.brand)
+        self.phone.categories.add(self.child)
+        self.packages = [
+            ProductPackage.objects.create(product=self.product, price=1999, discount=15, is_active_discount=True, is_active_package=True),
+            ProductPackage.objects.create(product=self.product, price=1000, is_active_package=True),
+            ProductPackage.objects.create(product=self.phone, price=5555, discount=0, is_active_package=True),
+        ]
+        self.other = ProductPackage.objects.create(
+            product=Product.objects.create(name="other", description="-"), price=700,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="admin", password="pass", is_staff=True))
+
+    def post(self, body):
+        return self.client.post("/store/product-packages/bulk-price/", body, format="json")
+
+    def assert_matches_save(self):
+        for package in ProductPackage.objects.all():
+            expected = ProductPackage.calculate_final_price(package.price, package.discount, package.is_active_discount)
+            self.assertEqual(package.final_price, expected, package.id)
+
+    def test_percent_change_by_category_subtree(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({"category": [self.category.id], "price_change_percent": 10})
+        self.assertEqual(response.json(), {"updated": 3})
+        self.assertEqual(sum(1 for q in queries if q["sql"].startswith("UPDATE")), 1)
+        prices = [p.price for p in ProductPackage.objects.filter(pk__in=[p.pk for p in self.packages]).order_by("id")]
+        self.assertEqual(prices, [2199, 1100, 6111])
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.price, 700)
+        self.assert_matches_save()
+        self.assertEqual(ProductSummary.objects.get(product=self.phone).min_final_price, 6111)
+
+    def test_discount_by_brand_uses_new_values(self):
+        response = self.post({"brand": [self.brand.id], "price": 10001, "discount": 33, "is_active_discount": True})
+        self.assertEqual(response.json(), {"updated": 1})
+        package = ProductPackage.objects.get(product=self.phone)
+        self.assertEqual((package.price, package.final_price), (10001, 10001 - 3300))
+        self.assert_matches_save()
+
+    def test_toggle_discount_by_ids(self):
+        self.post({"ids": [self.packages[0].id, self.packages[1].id], "is_active_discount": False})
+        self.assert_matches_save()
+        self.post({"product": [self.product.id], "is_active_discount": True, "discount": 20})
+        self.assertEqual(
+            list(ProductPackage.objects.filter(product=self.product).order_by("id").values_list("final_price", flat=True)),
+            [1600, 800],
+        )
+
+    def test_validation_and_permissions(self):
+        self.assertEqual(self.post({"price": 10}).status_code, 400)
+        self.assertEqual(self.post({"ids": [1]}).status_code, 400)
+        self.assertEqual(self.post({"ids": [1], "price": 1, "price_change_percent": 5}).status_code, 400)
+        self.assertEqual(self.post({"ids": [1], "discount": 150}).status_code, 400)
+        anonymous = APIClient().post("/store/product-packages/bulk-price/", {"ids": [1], "price": 1}, format="json")
+        self.assertIn(anonymous.status_code, (401, 403))
+
+
+class RatingAggregateTests(TestCase):
+    """
+    Comment writes move the stored sum / count / average without aggregating.
+    """
+
+    def setUp(self):
+        use_temp_counters(self)
+        _, _, self.product = make_catalog()
+        self.package = ProductPackage.objects.create(product=self.product, price=1000)
+        self.user = User.objects.create_user(username="buyer", password="pass")
+
+    def review(self, rating, **kwargs):
+        return Comment.objects.create(user=self.user, product=self.product, text="-", rating=rating, **kwargs)
+
+    def stored(self):
+        summary = ProductSummary.objects.get(product=self.product)
+        self.package.refresh_from_db()
+        return summary.rating_sum, summary.review_count, summary.rating_avg, self.package.rating
+
+    def test_only_approved_top_level_reviews_count(self):
+        first = self.review(5, is_approved=True)
+        self.review(1)  # تایید نشده
+        self.review(1, is_approved=True, parent=first)  # پاسخ
+        self.assertEqual(self.stored(), (5, 1, 5.0, 5.0))
+
+    def test_approve_edit_and_delete(self):
+        self.review(4, is_approved=True)
+        pending = self.review(3)
+        self.assertEqual(self.stored()[:2], (4, 1))
+
+        pending = Comment.objects.get(pk=pending.pk)
+        pending.is_approved = True
+        with CaptureQueriesContext(connection) as queries:
+            pending.save()
+        self.assertFalse(any("SUM(" in q["sql"] or "AVG(" in q["sql"] for q in queries))
+        self.assertEqual(self.stored(), (7, 2, 3.5, 3.5))
+
+        pending.rating = 1
+        pending.save()
+        self.assertEqual(self.stored(), (5, 2, 2.5, 2.5))
+
+        pending.delete()
+        self.assertEqual(self.stored(), (4, 1, 4.0, 4.0))
+        Comment.objects.all().delete()
+        self.assertEqual(self.stored(), (0, 0, 0.0, 0.0))
+
+    def test_reconcile_repairs_bypassed_writes(self):
+        self.review(2, is_approved=True)
+        self.review(5)
+        Comment.objects.update(is_approved=True)  # بدون سیگنال
+        self.assertEqual(self.stored()[:2], (2, 1))
+        out = StringIO()
+        call_command("reconcile_ratings", stdout=out)
+        self.assertIn("1 products", out.getvalue())
+        self.assertEqual(self.stored(), (7, 2, 3.5, 3.5))
+        self.assertEqual(reconcile_ratings(), 0)
+
+    def test_detail_serializer_reads_stored_rating(self):
+        self.review(3, is_approved=True)
+        with CaptureQueriesContext(connection) as queries:
+            data = APIClient().get(f"/store/products/{self.product.id}/").json()
+        self.assertEqual((data["summary"]["rating_avg"], data["summary"]["review_count"]), (3.0, 1))
+        self.assertEqual(data["product_packages"][0]["rating"], 3.0)
+        self.assertFalse(any("AVG(" in q["sql"] for q in queries))
+
+
+class ReviewThreadTests(TestCase):
+    """
+    A page of review threads costs the same queries however many replies exist.
+    """
+
+    def setUp(self):
+        _, _, self.product = make_catalog()
+        self.user = User.objects.create_user(username="buyer", password="pass")
+        self.client = APIClient()
+
+    def comment(self, parent=None, approved=True, rating=5):
+        return Comment.objects.create(
+            user=self.user, product=self.product, text="-", rating=rating, parent=parent, is_approved=approved,
+        )
+
+    def test_tree_is_nested_and_filtered(self):
+        review = self.comment()
+        reply = self.comment(parent=review)
+        nested = self.comment(parent=reply)
+        hidden = self.comment(parent=review, approved=False)
+        self.comment(parent=hidden)  # زیر پاسخ تایید نشده: دیده نمی‌شود
+        self.comment(approved=False)
+        self.assertEqual(nested.root_id, review.id)
+
+        data = self.client.get(f"/store/reviews/?product_id={self.product.id}").json()
+        self.assertEqual([r["id"] for r in data["results"]], [review.id])
+        replies = data["results"][0]["replies"]
+        self.assertEqual([r["id"] for r in replies], [reply.id])
+        self.assertEqual([r["id"] for r in replies[0]["replies"]], [nested.id])
+        self.assertEqual(replies[0]["user_name"], "buyer")
+
+        thread = self.client.get(f"/store/reviews/{review.id}/").json()
+        self.assertEqual(thread["replies"][0]["replies"][0]["id"], nested.id)
+
+    def test_constant_queries_per_page(self):
+        def page_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"/store/reviews/?product_id={self.product.id}&page_size=5")
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        reviews = [self.comment() for _ in range(8)]
+        baseline = page_queries()
+        for review in reviews:
+            parent = review
+            for _ in range(4):
+                parent = self.comment(parent=parent)
+        self.assertEqual(page_queries(), baseline)
+        self.assertEqual(baseline, 2)
+
+    def test_reparent_moves_the_subtree(self):
+        first, second = self.comment(), self.comment()
+        reply = self.comment(parent=first)
+        nested = self.comment(parent=reply)
+        reply.parent = second
+        reply.save()
+        nested.refresh_from_db()
+        self.assertEqual(nested.root_id, second.id)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'mysql'), "plan checks exist for sqlite and mysql only")
+class QueryPlanTests(TestCase):
+    def test_critical_queries_use_indexes(self):
+        for name, queryset in critical_queries().items():
+            with self.subTest(name):
+                self.assertEqual(plan_problems(queryset, allow_sort=name in SORT_ALLOWED), [])
+
+    def test_detects_full_scan_and_unindexed_sort(self):
+        self.assertTrue(any(
+            problem.startswith('full scan') for problem in plan_problems(Product.objects.filter(description='x'))
+        ))
+        self.assertTrue(any(
+            problem.startswith('sort') for problem in plan_problems(Comment.objects.filter(product_id=1).order_by('rating'))
+        ))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn("All query plans use indexes", out.getvalue())
+
+    def test_unsupported_vendor(self):
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            self.assertEqual(plan_problems(Product.objects.filter(description='x')), [])
+            out = StringIO()
+            call_command('check_query_plans', stdout=out)
+        self.assertIn("Unsupported vendor postgresql", out.getvalue())
+
+
+class SyntheticCatalogTests(TestCase):
+    def snapshot(self, seed):
+        prefix = f"s{seed}-"
+        return (
+            list(ProductPackage.objects.filter(product__name__startswith=prefix).order_by('id')
+                 .values_list('product__name', 'price', 'final_price', 'color__name', 'storage')),
+            list(Comment.objects.filter(product__name__startswith=prefix).order_by('id')
+                 .values_list('product__name', 'rating', 'is_approved')),
+        )
+
+    def test_same_seed_same_data(self):
+        snapshots = []
+        for _ in range(2):
+            with transaction.atomic():
+                generate_catalog(packages=200, users=10, seed=7, batch_size=50)
+                snapshots.append(self.snapshot(7))
+                transaction.set_rollback(True)
+        self.assertEqual(snapshots[0], snapshots[1])
+        self.assertGreaterEqual(len(snapshots[0][0]), 200)
+
+    def test_fills_the_schema(self):
+        stats = generate_catalog(packages=300, users=10, comments=5, seed=3, batch_size=100)
+        products = Product.objects.filter(name__startswith="s3-")
+        self.assertEqual(products.count(), stats.counts['product'])
+        self.assertEqual(ProductPackage.objects.filter(product__in=products).count(), stats.counts['productpackage'])
+        self.assertFalse(Category.objects.filter(name__startswith="s3-", tree_path='').exists())
+        self.assertEqual(Category.objects.filter(name__startswith="s3-").aggregate(Max('depth'))['depth__max'], 2)
+        self.assertTrue(ProductAttribute.objects.filter(product__in=products).exists())
+        self.assertTrue(Gallery.objects.filter(product__in=products).exists())
+        self.assertFalse(Comment.objects.filter(parent__isnull=False, root__isnull=True).exists())
+        # بسته های حجیم بدون سیگنال نوشته می‌شوند ولی خلاصه ها و ایندکس جستجو کامل هستند
+        self.assertEqual(ProductSummary.objects.filter(product__in=products).count(), products.count())
+        self.assertEqual(reconcile_ratings(), 0)
+        self.assertTrue(SearchIndexEntry.objects.filter(product__in=products).exists())
+        with self.assertRaises(ValueError):
+            generate_catalog(packages=10, seed=3)
+
+    def test_invalidates_cached_taxonomy(self):
+        generate_catalog(packages=10, users=2, seed=11)
+        self.client.get("/store/brands/?page_size=500")
+        self.assertEqual(self.client.get("/store/brands/?page_size=500")["X-Cache"], "HIT")
+        generate_catalog(packages=10, users=2, seed=12)
+        response = self.client.get("/store/brands/?page_size=500")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn("s12-", response.content.decode())
+
+    def test_command_writes_placeholders(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            out = StringIO()
+            call_command('generate_catalog', packages=20, users=5, seed=4, images=True, stdout=out)
+            self.assertIn("productpackage", out.getvalue())
+            image = Gallery.objects.filter(product__name__startswith="s4-").first().image
+            self.assertTrue(os.path.isfile(os.path.join(media, image.name)))
+
+
+class EndpointBenchmarkTests(TestCase):
+    def test_every_get_route_is_measured(self):
+        generate_catalog(packages=60, users=5, seed=9, batch_size=30)
+        results = run_endpoint_benchmark(repeat=1)
+        self.assertEqual(set(results), {name for name, *_ in endpoint_routes()})
+        for name in ('product-gallery', 'category-products', 'comment-my-comments', 'review-list'):
+            self.assertIn('queries', results[name])
+        self.assertEqual(
+            set(results['product-detail']), {'path', 'queries', 'db_ms', 'serialize_ms', 'p50_ms', 'p95_ms'},
+        )
+        # دسته ها و ویژگی های محصولات برند prefetch می‌شوند (بدون N+1)
+        self.assertLessEqual(results['brand-products']['queries'], 4)
+
+    def test_compare_fails_on_more_queries(self):
+        baseline = {'a': {'queries': 2, 'p95_ms': 10.0}, 'b': {'queries': 5, 'p95_ms': 10.0}}
+        current = {'a': {'queries': 7, 'p95_ms': 10.0}, 'b': {'queries': 4, 'p95_ms': 40.0}, 'c': {'queries': 1, 'p95_ms': 1.0}}
+        failures, warnings = compare_results(current, baseline)
+        self.assertEqual(failures, ["a: 2 -> 7 queries"])
+        self.assertEqual(len(warnings), 2)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        use_temp_counters(self)
+        self.client = APIClient()
+        _, _, self.product = make_catalog()
+
+    def count(self, histograms, metric, view, action):
+        values = histograms.get((metric, (('view', view), ('action', action))))
+        return sum(values[:-1]) if values else 0
+
+    def test_server_timing_and_histograms(self):
+        self.client.force_login(User.objects.create_user("metrics-staff", password="x", is_staff=True))
+        before = metrics.registry.snapshot()
+        response = self.client.get(f"/store/products/{self.product.id}/")
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        for phase in ("db;dur=", "queries", "serializer;dur=", "render;dur=", "image;dur=", "total;dur="):
+            self.assertIn(phase, timing)
+
+        after = metrics.registry.snapshot()
+        for metric in ("request_duration_seconds", "request_queries", "request_serializer_seconds"):
+            self.assertEqual(
+                self.count(after, metric, "ProductViewSet", "retrieve")
+                - self.count(before, metric, "ProductViewSet", "retrieve"),
+                1,
+            )
+        queries = after[("request_queries", (("view", "ProductViewSet"), ("action", "retrieve")))]
+        self.assertGreater(queries[-1], 0)
+
+        text = self.client.get("/metrics").content.decode()
+        self.assertIn("# TYPE techshop_request_duration_seconds histogram", text)
+        self.assertIn('techshop_request_duration_seconds_bucket{view="ProductViewSet",action="retrieve",le="+Inf"}', text)
+
+    def test_threads_write_separate_shards(self):
+        registry = metrics.Registry()
+
+        def work():
+            for _ in range(100):
+                registry.observe("request_duration_seconds", (("view", "x"),), 0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        values = registry.snapshot()[("request_duration_seconds", (("view", "x"),))]
+        self.assertEqual(sum(values[:-1]), 400)
+        # shard های thread های تمام شده در یک مجموع ادغام و حذف می‌شوند
+        self.assertEqual(registry.shards, [])
+        registry.observe("request_duration_seconds", (("view", "x"),), 0.02)
+        self.assertEqual(len(registry.shards), 1)
+        self.assertIn('le="0.025"} 401', metrics.render_prometheus(registry.snapshot()))
+
+    def test_multiprocess_files_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            other = [["request_queries", [["view", "w"], ["action", "list"]], [0, 2, 0, 0, 0, 0, 0, 0, 0, 0, 4]]]
+            with open(os.path.join(directory, "metrics-999999.json"), "w") as stream:
+                json.dump(other, stream)
+            registry = metrics.Registry()
+            registry.observe("request_queries", (("view", "w"), ("action", "list")), 2)
+            merged = registry.collect()
+            self.assertEqual(merged[("request_queries", (("view", "w"), ("action", "list")))][1], 3)
+            self.assertTrue(os.path.exists(os.path.join(directory, f"metrics-{os.getpid()}.json")))
+
+    def test_hidden_from_anonymous_clients(self):
+        response = self.client.get(f"/store/products/{self.product.id}/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with override_settings(SERVER_TIMING_HEADER=True):
+            self.assertIn("Server-Timing", self.client.get(f"/store/products/{self.product.id}/"))
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret").status_code, 200)
+
+
+class FastSerializerTests(TestCase):
+    """
+    The compiled values() plans must render exactly the bytes of the DRF serializers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # تصویر های placeholder در پوشه موقت، نه در MEDIA_ROOT پروژه
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            generate_catalog(packages=150, users=5, seed=4, batch_size=50, images=True)
+
+    def setUp(self):
+        use_temp_counters(self)
+
+    def assertSameBytes(self, serializer_class, queryset):
+        plan = compile_serializer(serializer_class)
+        self.assertIsNotNone(plan)
+        request = Request(APIRequestFactory().get('/'))
+        for current in (None, request):
+            expected = JSONRenderer().render(serializer_class(queryset, many=True, context={'request': current}).data)
+            self.assertEqual(JSONRenderer().render(plan.serialize_queryset(queryset, current)), expected)
+
+    def test_product_list_rows(self):
+        self.assertSameBytes(ProductListSerializer, Product.objects.order_by('id'))
+
+    def test_package_rows_with_pending_counters(self):
+        package = ProductPackage.objects.order_by('id').first()
+        counters.increment(package.pk, 'views_count', 3)
+        self.assertSameBytes(PPackageSerializer, ProductPackage.objects.order_by('id'))
+
+    def test_category_rows(self):
+        self.assertSameBytes(CategorySerializer, Category.objects.order_by('id'))
+
+    def test_method_fields_are_not_compiled(self):
+        self.assertIsNone(compile_serializer(ReviewThreadSerializer))
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_compiled_lists_report_serializer_time(self):
+        before = metrics.registry.snapshot()
+        response = self.client.get('/store/product-packages/?page_size=50')
+        timing = dict(part.split(';')[:2] for part in response['Server-Timing'].split(', '))
+        self.assertGreater(float(timing['serializer'].split('=')[1]), 0)
+        key = ('request_serializer_seconds', (('view', 'ProductPackageViewSet'), ('action', 'list')))
+        self.assertGreater(metrics.registry.snapshot()[key][-1], before.get(key, [0])[-1])
+        result = measure(lambda: self.client.get('/store/product-packages/?page_size=50'), repeat=1)
+        self.assertGreater(result['serialize_ms'], 0)
+
+    def test_list_endpoints_match_drf(self):
+        pages = ['/store/products/?ordering=-min_price&page_size=7', '/store/product-packages/?page_size=9', '/store/categories/']
+        for url in pages:
+            for _ in range(2):
+                with override_settings(FAST_LIST_SERIALIZERS=False):
+                    get_cache().clear()
+                    expected = self.client.get(url)
+                get_cache().clear()
+                fast = self.client.get(url)
+                self.assertEqual(fast.content, expected.content, url)
+                # صفحه دوم با cursor ساخته شده از ردیف های values()
+                url = fast.json()['next']
+                if not url:
+                    break
+
+
+class RendererTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # تصویر های placeholder در پوشه موقت، نه در MEDIA_ROOT پروژه
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            generate_catalog(packages=60, users=5, seed=6, batch_size=30, images=True)
+
+    def setUp(self):
+        use_temp_counters(self)
+
+    def test_default_json_is_unchanged(self):
+        for accept in ("*/*", "application/json"):
+            response = self.client.get("/store/products/", HTTP_ACCEPT=accept)
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_orjson_on_request(self):
+        expected = self.client.get("/store/product-packages/").content
+        response = self.client.get("/store/product-packages/", HTTP_ACCEPT="application/json; encoder=orjson")
+        self.assertEqual(response["Content-Type"], "application/json; encoder=orjson")
+        self.assertEqual(response.content, expected)
+        by_format = self.client.get("/store/product-packages/?format=orjson")
+        self.assertEqual(json.loads(by_format.content)["results"], json.loads(expected)["results"])
+
+    def test_python_values_are_encoded_like_drf(self):
+        data = {"price": Decimal("12.50"), "at": timezone.now(), "ids": (1, 2), 3: "x"}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        product = Product.objects.exclude(image="").exclude(image=None).first()
+        request = APIRequestFactory().get("/")
+        body = ORJSONRenderer().render({"image": product.image}, renderer_context={"request": request})
+        self.assertEqual(json.loads(body)["image"], request.build_absolute_uri(product.image.url))
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack(self):
+        response = self.client.get("/store/products/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        expected = json.loads(self.client.get("/store/products/").content)
+        self.assertEqual(msgpack.unpackb(response.content), expected)
+
+    def test_missing_library_is_not_acceptable(self):
+        with mock.patch.object(MessagePackRenderer, "available", False):
+            response = self.client.get("/store/products/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+    def test_benchmark_reports_size_and_time(self):
+        results = run_renderer_benchmark({"json": JSONRenderer, "orjson": ORJSONRenderer}, repeat=1)
+        self.assertEqual(set(results["product-list"]), {"json", "orjson"})
+        self.assertEqual(results["product-list"]["json"]["bytes"], results["product-list"]["orjson"]["bytes"])
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(packages=80, users=5, seed=8, batch_size=40)
+        cls.product = Product.objects.filter(product_packages__isnull=False).order_by('id').first()
+
+    def setUp(self):
+        use_temp_counters(self)
+
+    def test_product_card_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/store/products/{self.product.pk}/?fields=id,name,image_variants,summary")
+        self.assertEqual(list(response.json()), ["id", "image_variants", "summary", "name"])
+        self.assertIn("min_final_price", response.json()["summary"])
+
+    def test_nested_fields_keep_only_their_prefetches(self):
+        url = f"/store/products/{self.product.pk}/?fields=id,product_packages.final_price"
+        with self.assertNumQueries(2):
+            data = self.client.get(url).json()
+        self.assertEqual(data["product_packages"][0], {"final_price": data["product_packages"][0]["final_price"]})
+
+    def test_expand_matches_drf_path(self):
+        url = "/store/product-packages/?fields=id,color,product.name&expand=color&page_size=5"
+        fast = self.client.get(url)
+        with override_settings(FAST_LIST_SERIALIZERS=False):
+            expected = self.client.get(url)
+        self.assertEqual(fast.content, expected.content)
+        row = fast.json()["results"][0]
+        self.assertEqual(set(row), {"id", "color", "product"})
+        package = ProductPackage.objects.get(pk=row["id"])
+        self.assertEqual(row["color"] and row["color"]["id"], package.color_id)
+
+    def test_unknown_names_share_one_plan(self):
+        plan = compile_serializer(PPackageSerializer, ("id", "product.name"), ("color",))
+        for index in range(3):
+            self.assertIs(
+                compile_serializer(PPackageSerializer, ("id", f"x{index}", "product.name", "product.y"),
+                                   ("color", f"z{index}", "id")),
+                plan,
+            )
+
+    def test_writes_use_the_full_serializer(self):
+        admin = User.objects.create_superuser("sparse-admin", password="x")
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.patch(f"/store/product-packages/{self.product.product_packages.first().pk}/?fields=id",
+                                {"weight": 5}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("weight", response.json())
+
+
+class AsyncReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(packages=60, users=5, seed=9, batch_size=30)
+        cls.product = Product.objects.filter(product_packages__isnull=False).order_by('id').first()
+        cls.detail_urls = [
+            f"categories/{Category.objects.order_by('id').first().pk}/",
+            f"brands/{Brand.objects.order_by('id').first().pk}/",
+            f"product-packages/{cls.product.product_packages.order_by('id').first().pk}/",
+        ]
+
+    def setUp(self):
+        use_temp_counters(self)
+
+    async def assertSameResponse(self, path):
+        response = await self.async_client.get(f"/store/async/{path}")
+        expected = await sync_to_async(self.client.get)(f"/store/{path}")
+        self.assertEqual(response.status_code, expected.status_code, path)
+        # لینک های next / previous به همان مسیر async اشاره می‌کنند
+        self.assertEqual(response.content.replace(b"/store/async/", b"/store/"), expected.content, path)
+        return response
+
+    async def test_lists_match_sync_views(self):
+        for path in ("products/", "products/?facets=0&page_size=5", "categories/", "brands/",
+                     "product-packages/?page_size=7", "products/?fields=id,name&expand=brand"):
+            await self.assertSameResponse(path)
+
+    async def test_next_page_matches(self):
+        first = (await self.async_client.get("/store/async/product-packages/?page_size=5")).json()
+        cursor = first["next"].split("cursor=")[1].split("&")[0]
+        await self.assertSameResponse(f"product-packages/?page_size=5&cursor={cursor}")
+
+    async def test_details_match_sync_views(self):
+        for path in self.detail_urls:
+            await self.assertSameResponse(path)
+        response = await self.async_client.get(f"/store/async/products/{self.product.pk}/")
+        expected = (await sync_to_async(self.client.get)(f"/store/products/{self.product.pk}/")).json()
+        data = response.json()
+        for package in data["product_packages"] + expected["product_packages"]:
+            package.pop("views_count")
+        self.assertEqual(data, expected)
+
+    async def test_missing_object_is_404(self):
+        response = await self.assertSameResponse("products/999999/")
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("detail", response.json())
+
+    async def test_server_timing_for_staff_only(self):
+        staff = await sync_to_async(User.objects.create_user)("async-staff", password="x", is_staff=True)
+        self.assertNotIn("Server-Timing", await self.async_client.get("/store/async/brands/"))
+        await self.async_client.aforce_login(staff)
+        self.assertIn("Server-Timing", await self.async_client.get("/store/async/brands/"))
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    async def test_metrics_labels(self):
+        before = metrics.registry.snapshot()
+        response = await self.async_client.get("/store/async/brands/")
+        self.assertIn("db;dur=", response["Server-Timing"])
+        key = ("request_queries", (("view", "AsyncBrandView"), ("action", "get")))
+        after = metrics.registry.snapshot()
+        self.assertEqual(sum(after[key][:-1]) - sum(before.get(key, [0])[:-1]), 1)
+        self.assertGreater(after[key][-1] - before.get(key, [0])[-1], 0)
+
+    def test_concurrency_limit(self):
+        async def run():
+            started = []
+
+            async def fake_list(view, viewset, queryset):
+                started.append(len(started))
+                await asyncio.sleep(0.01)
+                return {"running": len(started) - len(done)}
+
+            done = []
+            with mock.patch.object(async_views.AsyncBrandView, "list", fake_list):
+                view = async_views.AsyncBrandView.as_view()
+
+                async def call():
+                    response = await view(APIRequestFactory().get("/store/async/brands/"))
+                    done.append(response)
+                    return json.loads(response.content)["running"]
+                return await asyncio.gather(*(call() for _ in range(6)))
+
+        with override_settings(ASYNC_READ_CONCURRENCY=2):
+            running = asyncio.run(run())
+        self.assertLessEqual(max(running), 2)
+
+
+class ReadReplicaTests(TransactionTestCase):
+    """
+    Two sqlite files act as replicas of the test database; replicate() copies
+    the primary into them the way replication would catch up.
+    """
+    aliases = ["replica1", "replica2"]
+    def setUp(self):
+        use_temp_counters(self)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        for alias in self.aliases:
+            self.add_replica(alias, os.path.join(self.directory.name, f"{alias}.sqlite3"))
+        patcher = mock.patch.object(replicas, "pool", replicas.ReplicaPool())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        override = override_settings(DATABASE_REPLICAS=self.aliases, REPLICA_CHECK_INTERVAL=60)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        _, _, self.product = make_catalog()
+        self.replicate()
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create_superuser("replica-admin", password="x"))
+
+    def add_replica(self, alias, path):
+        # اتصالی که در DATABASES نیست؛ فقط در thread تست وجود دارد
+        configured = connections.configure_settings({
+            "default": {"ENGINE": "django.db.backends.sqlite3"},
+            alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": path},
+        })[alias]
+        connections[alias] = load_backend(configured["ENGINE"]).DatabaseWrapper(configured, alias)
+        replicas.watch_replica(connections[alias])
+
+        def remove():
+            connections[alias].close()
+            del connections[alias]
+        self.addCleanup(remove)
+
+    def replicate(self):
+        primary = connections["default"]
+        primary.ensure_connection()
+        for alias in self.aliases:
+            connections[alias].ensure_connection()
+            primary.connection.backup(connections[alias].connection)
+
+    def product_name(self, client, **headers):
+        return client.get(f"/store/products/{self.product.pk}/?fields=name", **headers).json()["name"]
+
+    def test_reads_are_spread_over_replicas(self):
+        captures = {alias: CaptureQueriesContext(connections[alias]) for alias in ["default", *self.aliases]}
+        for capture in captures.values():
+            capture.__enter__()
+        try:
+            for _ in range(4):
+                self.assertEqual(self.product_name(self.client), "گوشی")
+        finally:
+            for capture in captures.values():
+                capture.__exit__(None, None, None)
+        self.assertEqual(len(captures["default"]), 0)
+        # هر replica یک SELECT 1 برای بررسی سلامت و دو درخواست
+        self.assertEqual([len(captures[alias]) for alias in self.aliases], [3, 3])
+
+    def test_write_pins_client_to_primary(self):
+        response = self.admin.patch(f"/store/products/{self.product.pk}/", {"name": "تازه"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        until = response[replicas.STICKY_HEADER]
+        self.assertEqual(response.cookies[replicas.STICKY_COOKIE].value, until)
+
+        self.assertEqual(self.product_name(self.admin), "تازه")
+        self.assertEqual(self.product_name(APIClient(), HTTP_X_PRIMARY_UNTIL=until), "تازه")
+        # بدون cookie یا بعد از پایان بازه، replica هنوز عقب است
+        self.assertEqual(self.product_name(APIClient()), "گوشی")
+        self.assertEqual(self.product_name(APIClient(), HTTP_X_PRIMARY_UNTIL=str(int(until) - 60)), "گوشی")
+        # مقدار ساختگی دور در آینده نادیده گرفته می‌شود
+        self.assertEqual(self.product_name(APIClient(), HTTP_X_PRIMARY_UNTIL="1e12"), "گوشی")
+        self.replicate()
+        self.assertEqual(self.product_name(APIClient()), "تازه")
+
+    def test_unreachable_replica_leaves_pool(self):
+        replica = connections["replica1"]
+        replica.close()
+        self.addCleanup(replica.settings_dict.__setitem__, "NAME", replica.settings_dict["NAME"])
+        self.addCleanup(replica.close)
+        replica.settings_dict["NAME"] = self.directory.name
+        with self.assertLogs("TechShopApp.replicas", "WARNING"):
+            for _ in range(3):
+                self.assertEqual(self.product_name(self.client), "گوشی")
+        self.assertIn("replica1", replicas.pool.down_until)
+
+        with override_settings(DATABASE_REPLICAS=["replica1"]):
+            Product.objects.filter(pk=self.product.pk).update(name="تازه")
+            # هیچ replica سالمی نیست: خواندن از primary
+            self.assertEqual(self.product_name(self.client), "تازه")
+
+    def test_failed_query_marks_replica_down(self):
+        with connections["replica2"].cursor() as cursor:
+            cursor.execute("PRAGMA foreign_keys = OFF")
+            cursor.execute("DROP TABLE TechShopApp_product")
+        with self.assertRaises(OperationalError), self.assertLogs("TechShopApp.replicas", "WARNING"):
+            Product.objects.using("replica2").count()
+        self.assertIn("replica2", replicas.pool.down_until)
+        self.assertNotIn("replica1", replicas.pool.down_until)
+
+    def test_cached_responses_are_built_from_primary(self):
+        brand = Brand.objects.create(name="قدیمی", en_name="old")
+        self.replicate()
+        url = f"/store/brands/{brand.pk}/"
+        self.assertEqual(APIClient().get(url).json()["name"], "قدیمی")
+        response = self.admin.patch(url, {"name": "جدید"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        # کاربر دیگر بدون cookie: replica هنوز نام قدیمی را دارد ولی cache از primary ساخته می‌شود
+        response = APIClient().get(url)
+        self.assertEqual((response["X-Cache"], response.json()["name"]), ("MISS", "جدید"))
+        response = APIClient().get(url)
+        self.assertEqual((response["X-Cache"], response.json()["name"]), ("HIT", "جدید"))
+
+    def test_router_rules(self):
+        router = replicas.ReplicaRouter()
+        self.assertEqual(router.db_for_write(Product), "default")
+        self.assertIsNone(router.db_for_read(Product))
+        self.assertFalse(router.allow_migrate("replica1", "TechShopApp"))
+        self.assertIsNone(router.allow_migrate("default", "TechShopApp"))
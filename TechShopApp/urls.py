@@ -3,8 +3,10 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ProductViewSet, BaseCategorysViewSet, CategoryViewSet, BrandViewSet,
     ColorViewSet, BaseColorViewSet, SizeViewSet, CategoryAttributeViewSet,
-    ProductAttributeViewSet, ProductPackageViewSet, GalleryViewSet, CommentViewSet
+    ProductAttributeViewSet, ProductPackageViewSet, GalleryViewSet, CommentViewSet,
+    TaxonomyCacheStatsViewSet, ImageVariantView, StockReservationViewSet, ReviewViewSet
 )
+from .async_views import AsyncBrandView, AsyncCategoryView, AsyncProductPackageView, AsyncProductView
 
 """
 DRF Router Explanation:
@@ -45,9 +47,31 @@ router.register(r'product-attributes', ProductAttributeViewSet)
 router.register(r'product-packages', ProductPackageViewSet)
 router.register(r'gallery', GalleryViewSet)
 router.register(r'comments', CommentViewSet)
+router.register(r'reviews', ReviewViewSet, basename='review')
+router.register(r'reservations', StockReservationViewSet)
+router.register(r'cache-stats', TaxonomyCacheStatsViewSet, basename='cache-stats')
 
 urlpatterns = [
     # Include all the router-generated URLs in our urlpatterns
     # This single line creates all the necessary URL patterns for our ViewSets
     path('', include(router.urls)),
-]
\ No newline at end of file
+    # نسخه های کوچک تر / WebP / AVIF تصاویر که در اولین درخواست ساخته می‌شوند
+    path(
+        'image-variants/<int:width>/<str:fmt>/<path:name>',
+        ImageVariantView.as_view(),
+        name='image-variant',
+    ),
+]
+
+# مسیرهای async فقط خواندنی (TechShopApp/async_views.py) برای اجرا با main/asgi.py
+ASYNC_VIEWS = {
+    'products': (AsyncProductView, 'product'),
+    'categories': (AsyncCategoryView, 'category'),
+    'brands': (AsyncBrandView, 'brand'),
+    'product-packages': (AsyncProductPackageView, 'productpackage'),
+}
+for prefix, (view, basename) in ASYNC_VIEWS.items():
+    urlpatterns += [
+        path(f'async/{prefix}/', view.as_view(), name=f'async-{basename}-list'),
+        path(f'async/{prefix}/<str:pk>/', view.as_view(), name=f'async-{basename}-detail'),
+    ]
\ No newline at end of file
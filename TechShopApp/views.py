@@ -1,10 +1,23 @@
 from .models import * 
 from .serializers import * 
-from rest_framework.viewsets import ModelViewSet
+from .facets import ProductFilter
+from .search import search_product_ids
+from .cache import CachedResponseMixin, cache_stats
+from .category_tree import build_tree
+from .image_variants import CONTENT_TYPES, get_or_create_variant, is_allowed
+from . import counters, inventory
+from .catalog_export import FORMATS as EXPORT_FORMATS, export_lines
+from .pricing import bulk_update_prices, select_packages
+from .fast_serializers import FastListMixin
+from .sparse_fields import SparseFieldsMixin
+from rest_framework.viewsets import ModelViewSet, ViewSet
+from rest_framework.views import APIView
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny, BasePermission, SAFE_METHODS
+from django.db.models import Exists, F, OuterRef, Prefetch
 
 """
 DRF ModelViewSet Guide:
@@ -46,7 +59,7 @@ class IsAdminOrReadOnly(BasePermission):
         # در غیر این صورت، فقط ادمین‌ها مجوز دارند
         return request.user and request.user.is_staff
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(SparseFieldsMixin, FastListMixin, ModelViewSet):
     """
     ViewSet for Product model - handles all CRUD operations.
     
@@ -57,9 +70,12 @@ class ProductViewSet(ModelViewSet):
     - PUT/PATCH /products/{id}/ - Update a product
     - DELETE /products/{id}/ - Delete a product
     - GET /products/{id}/gallery/ - Get product gallery images (custom action)
+    - GET /products/search/?q=... - Ranked full-text search (custom action)
+    - GET /products/export/?type=jsonl|csv - Streaming catalog dump (admins only)
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    cursor_ordering_fields = ('id', 'created_date', 'min_price', 'max_price', 'discount', 'rating')  # کلیدهای مجاز برای صفحه بندی
     
     def get_permissions(self):
         """
@@ -70,7 +86,7 @@ class ProductViewSet(ModelViewSet):
         این روش نسبت به استفاده از IsAdminOrReadOnly انعطاف‌پذیری بیشتری دارد
         و می‌توان برای هر اکشن به صورت جداگانه تصمیم گرفت.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'export']:
             self.permission_classes = [IsAdminUser]
         else:
             self.permission_classes = [AllowAny]
@@ -85,10 +101,133 @@ class ProductViewSet(ModelViewSet):
         
         'self.action' is automatically set by DRF based on the HTTP method and URL pattern.
         """
-        if self.action == 'retrieve':  # in ModelViewSet action after routing finde method 
+        if self.action == 'retrieve':  # in ModelViewSet action after routing finde method
             return ProductDetailSerializer
+        if self.action == 'list':
+            return ProductListSerializer
         return ProductSerializer
-    
+
+    def get_queryset(self):
+        """
+        For 'retrieve' load the whole graph ProductDetailSerializer walks in a fixed
+        number of queries, no matter how many packages, images or comments exist.
+
+        The packages are fetched through the reverse FK prefetch, which also caches
+        `package.product` on each row, so PPackageSerializer.product reuses the
+        already prefetched parent instead of querying it again.
+        """
+        queryset = Product.objects.all()
+        if self.action == 'list':
+            # ترتیب روابط ثابت است تا خروجی با مسیر fast_serializers یکی باشد
+            queryset = self.filter_list_queryset(queryset).prefetch_related(
+                Prefetch('categories', queryset=Category.objects.order_by('id')),
+                Prefetch('attributes', queryset=ProductAttribute.objects.select_related('attribute').order_by('id')),
+            )
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('brand', 'summary').prefetch_related(
+                Prefetch(
+                    'categories',
+                    queryset=Category.objects.prefetch_related('attributes', 'categoryattribute_set'),
+                ),
+                Prefetch('attributes', queryset=ProductAttribute.objects.select_related('attribute')),
+                Prefetch('product_packages', queryset=ProductPackage.objects.order_by('id')),
+                Prefetch('gallery_set', queryset=Gallery.objects.order_by('id')),
+                Prefetch('comment_set', queryset=Comment.objects.all()),
+            )
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Product page: every package shown on it gets a (buffered) view.
+        """
+        response = super().retrieve(request, *args, **kwargs)
+        for package in response.data.get('product_packages', ()):
+            if 'id' in package:  # ?fields= ممکن است id بسته ها را حذف کرده باشد
+                counters.increment(package['id'], 'views_count')
+        return response
+
+    def filter_list_queryset(self, queryset):
+        """
+        Filter and sort the list on the ProductSummary read model and the
+        catalog facets instead of aggregating over packages on every request.
+
+        Query params (comma separated ids where it makes sense):
+        - ?category=3          (includes every sub category)
+        - ?brand=1,2
+        - ?base_color=4&size=2&storage=256   (must match the same active package)
+        - ?in_stock=1
+        - ?min_price=1000&max_price=50000  (on the cheapest active package)
+        - ?min_rating=4
+        - ?ordering=min_price | -rating | -discount | ...  (see cursor_ordering_fields)
+        """
+        self.product_filter = ProductFilter(self.request.query_params)
+        queryset = self.product_filter.apply(queryset).select_related('summary').annotate(
+            min_price=F('summary__min_final_price'),
+            max_price=F('summary__max_final_price'),
+            discount=F('summary__max_discount'),
+            rating=F('summary__rating_avg'),
+        )
+        if self.request.query_params.get('ordering', '').lstrip('-') in ('min_price', 'max_price', 'discount', 'rating'):
+            # مرتب سازی روی ستون های خلاصه فقط برای محصولاتی که ردیف خلاصه دارند معنی دارد
+            queryset = queryset.filter(summary__isnull=False)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Paginated product list plus the facet counts of every filter dimension.
+        Pass ?facets=0 to skip the counts.
+        """
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets', '1').lower() not in ('0', 'false', 'no'):
+            response.data['facets'] = self.product_filter.facets()
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked Persian / English full-text search over the inverted index.
+
+        URL: /products/search/?q=گوشی سامسونگ&limit=20
+        HTTP Method: GET
+
+        Every word must match (the last one as a prefix); results are ordered by score.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        ranked = search_product_ids(request.query_params.get('q', ''), limit=limit)
+        products = self.sparse_queryset(Product.objects.prefetch_related(
+            'categories',
+            Prefetch('attributes', queryset=ProductAttribute.objects.select_related('attribute')),
+        ), ProductSerializer()).in_bulk([pk for pk, _ in ranked])
+        results = []
+        for pk, score in ranked:
+            if pk in products:
+                row = self.sparse(ProductSerializer(products[pk])).data
+                row['score'] = score
+                results.append(row)
+        return Response({'results': results})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every product with its packages, prices and attribute values.
+
+        URL: /products/export/?type=jsonl (default) or ?type=csv
+        HTTP Method: GET
+
+        Accepts the list filters (?category=, ?brand=, ?in_stock=, ...). The rows
+        use the columns of `manage.py import_catalog`, so a dump can be imported back.
+        """
+        fmt = request.query_params.get('type', 'jsonl')
+        if fmt not in EXPORT_FORMATS:
+            return Response({'detail': f"type must be one of {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = ProductFilter(request.query_params).apply(Product.objects.all())
+        response = StreamingHttpResponse(export_lines(fmt, queryset), content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="catalog.{fmt}"'
+        return response
+
     @action(detail=True, methods=['get'])
     def gallery(self, request, pk=None):
         """
@@ -103,10 +242,10 @@ class ProductViewSet(ModelViewSet):
         """
         product = self.get_object()  # Gets the product based on the URL's pk parameter
         gallery = Gallery.objects.filter(product=product)
-        serializer = GallerySerializer(gallery, many=True)
+        serializer = self.sparse(GallerySerializer(gallery, many=True))
         return Response(serializer.data)
 
-class BaseCategorysViewSet(ModelViewSet):
+class BaseCategorysViewSet(CachedResponseMixin, SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for BaseCategorys model.
     
@@ -117,6 +256,8 @@ class BaseCategorysViewSet(ModelViewSet):
     queryset = BaseCategorys.objects.all()
     serializer_class = BaseCategorysSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
+    cache_namespace = 'base-categories'
+    cache_dependencies = (BaseCategorys, Category, CategoryAttribute, Brand)
     
     def get_serializer_class(self):
         """
@@ -127,16 +268,20 @@ class BaseCategorysViewSet(ModelViewSet):
             return BaseCategorysDetailSerializer
         return BaseCategorysSerializer
 
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, SparseFieldsMixin, FastListMixin, ModelViewSet):
     """
     ViewSet for Category model.
     
     Custom actions:
     - GET /categories/{id}/products/ - Get all products in a specific category
+      (?include_descendants=1 also returns products of every sub category)
+    - GET /categories/tree/ - The whole category tree, nested, in one query
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
+    cache_namespace = 'categories'
+    cache_dependencies = (Category, CategoryAttribute)
     
     def get_serializer_class(self):
         """
@@ -151,15 +296,46 @@ class CategoryViewSet(ModelViewSet):
         """
         Get all products that belong to this category.
         
-        URL: /categories/{id}/products/
+        URL: /categories/{id}/products/?include_descendants=1
         HTTP Method: GET
+
+        With include_descendants the whole subtree is matched through
+        Category.tree_path in the same single query (only the category itself
+        while its path is not built yet).
         """
         category = self.get_object()
-        products = Product.objects.filter(categories=category)
-        serializer = ProductSerializer(products, many=True)
+        # مسیر خالی (دسته ساخته شده با bulk_create و هنوز rebuild نشده) با همه دسته ها match می‌شود
+        if category.tree_path and request.query_params.get('include_descendants', '').lower() in ('1', 'true', 'yes'):
+            products = Product.objects.filter(Exists(Product.categories.through.objects.filter(
+                product_id=OuterRef('pk'), category__tree_path__startswith=category.tree_path,
+            )))
+        else:
+            products = Product.objects.filter(categories=category)
+        products = self.sparse_queryset(products.prefetch_related(
+            'categories',
+            Prefetch('attributes', queryset=ProductAttribute.objects.select_related('attribute')),
+        ), ProductSerializer())
+        serializer = self.sparse(ProductSerializer(products, many=True))
         return Response(serializer.data)
 
-class BrandViewSet(ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """
+        The full category tree as nested nodes with `children`.
+
+        URL: /categories/tree/
+        HTTP Method: GET
+
+        Ordering by tree_path puts every parent before its children, so the
+        tree is assembled in memory from a single query.
+        """
+        def build():
+            categories = Category.objects.order_by('tree_path')
+            rows = CategoryTreeSerializer(categories, many=True, context={'request': request}).data
+            return Response(build_tree(rows))
+        return self.cached(request, build)
+
+class BrandViewSet(CachedResponseMixin, SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for Brand model.
     
@@ -169,6 +345,8 @@ class BrandViewSet(ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
+    cache_namespace = 'brands'
+    cache_dependencies = (Brand,)
     
     @action(detail=True, methods=['get'])
     def products(self, request, pk=None):
@@ -179,11 +357,14 @@ class BrandViewSet(ModelViewSet):
         HTTP Method: GET
         """
         brand = self.get_object()
-        products = Product.objects.filter(brand=brand)
-        serializer = ProductSerializer(products, many=True)
+        products = self.sparse_queryset(Product.objects.filter(brand=brand).prefetch_related(
+            'categories',
+            Prefetch('attributes', queryset=ProductAttribute.objects.select_related('attribute')),
+        ), ProductSerializer())
+        serializer = self.sparse(ProductSerializer(products, many=True))
         return Response(serializer.data)
 
-class ColorViewSet(ModelViewSet):
+class ColorViewSet(CachedResponseMixin, SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for Color model. Provides standard CRUD operations.
     
@@ -197,24 +378,30 @@ class ColorViewSet(ModelViewSet):
     queryset = Color.objects.all()
     serializer_class = ColorSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
+    cache_namespace = 'colors'
+    cache_dependencies = (Color,)
 
-class BaseColorViewSet(ModelViewSet):
+class BaseColorViewSet(CachedResponseMixin, SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for BaseColor model. Provides standard CRUD operations.
     """
     queryset = BaseColor.objects.all()
     serializer_class = BaseColorSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
+    cache_namespace = 'base-colors'
+    cache_dependencies = (BaseColor,)
 
-class SizeViewSet(ModelViewSet):
+class SizeViewSet(CachedResponseMixin, SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for Size model. Provides standard CRUD operations.
     """
     queryset = Size.objects.all()
     serializer_class = SizeSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
+    cache_namespace = 'sizes'
+    cache_dependencies = (Size,)
 
-class CategoryAttributeViewSet(ModelViewSet):
+class CategoryAttributeViewSet(SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for CategoryAttribute model. Provides standard CRUD operations.
     """
@@ -222,7 +409,7 @@ class CategoryAttributeViewSet(ModelViewSet):
     serializer_class = CategoryAttributeSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
 
-class ProductAttributeViewSet(ModelViewSet):
+class ProductAttributeViewSet(SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for ProductAttribute model. Provides standard CRUD operations.
     """
@@ -230,16 +417,22 @@ class ProductAttributeViewSet(ModelViewSet):
     serializer_class = ProductAttributeSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
 
-class ProductPackageViewSet(ModelViewSet):
+class ProductPackageViewSet(SparseFieldsMixin, FastListMixin, ModelViewSet):
     """
     ViewSet for ProductPackage model.
     
     Supports filtering by product_id query parameter:
     GET /product-packages/?product_id=123
+
+    The list is keyset paginated and can be ordered by id, created_date or final_price:
+    GET /product-packages/?ordering=-final_price&cursor=...
+
+    Batch price changes: POST /product-packages/bulk-price/ (see bulk_price)
     """
     queryset = ProductPackage.objects.all()
     serializer_class = PPackageSerializer
     permission_classes = [IsAdminOrReadOnly]  # اعمال مجوز دسترسی - فقط ادمین می‌تواند ایجاد، ویرایش و حذف کند
+    cursor_ordering_fields = ('id', 'created_date', 'final_price')  # کلیدهای مجاز برای صفحه بندی
     
     def get_queryset(self):
         """
@@ -254,7 +447,43 @@ class ProductPackageViewSet(ModelViewSet):
             queryset = queryset.filter(product_id=product_id)
         return queryset
 
-class GalleryViewSet(ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='bulk-price')
+    def bulk_price(self, request):
+        """
+        Change price / discount of many packages at once (admins only).
+
+        URL: /product-packages/bulk-price/
+        HTTP Method: POST
+        Body: {"category": [3], "brand": [1], "price_change_percent": -10, "discount": 5, "is_active_discount": true}
+              selectors: ids, category (with sub categories), brand, product
+              changes: price | price_change_percent, discount, is_active_discount
+
+        One transaction and one UPDATE; final_price is recomputed in SQL.
+        Response: {"updated": <number of packages>}
+        """
+        serializer = BulkPriceUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = select_packages(
+            ids=data.get('ids'), categories=data.get('category'),
+            brands=data.get('brand'), products=data.get('product'),
+        )
+        updated = bulk_update_prices(
+            queryset,
+            price=data.get('price'),
+            percent=data.get('price_change_percent'),
+            discount=data.get('discount'),
+            is_active_discount=data.get('is_active_discount'),
+        )
+        return Response({'updated': updated})
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # شمارش بازدید بدون save() و بدون قفل ردیف؛ بعدا به صورت batch اعمال می‌شود
+        counters.increment(response.data['id'], 'views_count')
+        return response
+
+class GalleryViewSet(SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for Gallery model.
     
@@ -278,7 +507,7 @@ class GalleryViewSet(ModelViewSet):
             queryset = queryset.filter(product_id=product_id)
         return queryset
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(SparseFieldsMixin, ModelViewSet):
     """
     ViewSet for Comment model.
     
@@ -296,6 +525,8 @@ class CommentViewSet(ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]  # User must be logged in to interact with comments
+    cursor_ordering_fields = ('id', 'created_at')
+    cursor_ordering = '-created_at'  # همان ترتیب پیش فرض مدل Comment
     
     def get_queryset(self):
         """
@@ -337,3 +568,142 @@ class CommentViewSet(ModelViewSet):
         else:
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
+
+
+class ReviewViewSet(SparseFieldsMixin, ModelViewSet):
+    """
+    Threaded product reviews (read only, public).
+
+    - GET /reviews/?product_id=123  approved top-level reviews, newest first, keyset paginated
+    - GET /reviews/{id}/            one review thread
+
+    Each review carries its whole approved reply tree. The replies of a page are
+    loaded with one query on Comment.root and nested in memory, so a page costs
+    the same two queries however deep or large the discussion is.
+    """
+    queryset = Comment.objects.filter(is_approved=True, parent__isnull=True)
+    serializer_class = ReviewThreadSerializer
+    permission_classes = [AllowAny]
+    http_method_names = ['get', 'head', 'options']
+    cursor_ordering_fields = ('id', 'created_at')
+    cursor_ordering = '-created_at'
+
+    def get_queryset(self):
+        queryset = Comment.objects.filter(is_approved=True, parent__isnull=True).select_related('user')
+        product_id = self.request.query_params.get('product_id', None)
+        if product_id is not None:
+            queryset = queryset.filter(product_id=product_id)
+        return queryset
+
+    def load_replies(self, roots):
+        """
+        {parent_id: [approved replies in time order]} for every thread in `roots`.
+        A reply below an unapproved one is never reached from the root, so it stays hidden.
+        """
+        replies = {}
+        rows = Comment.objects.filter(
+            root_id__in=[root.id for root in roots], is_approved=True,
+        ).select_related('user').order_by('created_at', 'id')
+        for reply in rows:
+            replies.setdefault(reply.parent_id, []).append(reply)
+        return replies
+
+    def get_thread_serializer(self, roots, many=True):
+        context = {**self.get_serializer_context(), 'replies': self.load_replies(roots)}
+        return self.get_serializer(roots if many else roots[0], many=many, context=context)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(self.get_thread_serializer(page).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_thread_serializer([self.get_object()], many=False).data)
+
+
+class StockReservationViewSet(SparseFieldsMixin, ModelViewSet):
+    """
+    Stock reservations (checkout) for the current user.
+
+    - POST /reservations/ {"items": [{"package": 12, "quantity": 2}]}
+      takes the stock of every item atomically; 409 if any package is short
+    - POST /reservations/{id}/checkout/  keeps the reserved stock (before expires_at)
+    - POST /reservations/{id}/release/   gives the stock back
+    - GET /reservations/ and /reservations/{id}/
+    """
+    queryset = StockReservation.objects.all()
+    serializer_class = StockReservationSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+    cursor_ordering = '-created_date'
+    cursor_ordering_fields = ('id', 'created_date')
+
+    def get_queryset(self):
+        queryset = StockReservation.objects.prefetch_related('items')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [(item['package'].id, item['quantity']) for item in serializer.validated_data['items']]
+        try:
+            reservation = inventory.reserve(items, user=request.user)
+        except inventory.InsufficientStock as exc:
+            return Response(
+                {'detail': "موجودی کافی نیست.", 'package': exc.package_id, 'requested': exc.requested},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(reservation).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def checkout(self, request, pk=None):
+        reservation = self.get_object()
+        if not inventory.confirm(reservation.pk):
+            return Response({'detail': "این رزرو منقضی یا بسته شده است."}, status=status.HTTP_409_CONFLICT)
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        reservation = self.get_object()
+        if not inventory.release(reservation.pk):
+            return Response({'detail': "این رزرو قبلا نهایی یا آزاد شده است."}, status=status.HTTP_409_CONFLICT)
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+
+
+class TaxonomyCacheStatsViewSet(ViewSet):
+    """
+    Hit / miss counters of the taxonomy response cache (admins only).
+
+    URL: /cache-stats/
+    HTTP Method: GET
+    """
+    permission_classes = [IsAdminUser]
+    cached_viewsets = (BaseCategorysViewSet, CategoryViewSet, BrandViewSet, ColorViewSet, BaseColorViewSet, SizeViewSet)
+
+    def list(self, request):
+        return Response(cache_stats([viewset.cache_namespace for viewset in self.cached_viewsets]))
+
+
+class ImageVariantView(APIView):
+    """
+    Serve (and on first request generate) a resized WebP / AVIF variant of an uploaded image.
+
+    URL: /image-variants/<width>/<format>/<original file name>
+    HTTP Method: GET
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, width, fmt, name):
+        if not is_allowed(width, fmt, name):
+            raise Http404
+        path = get_or_create_variant(name, width, fmt)
+        if path is None:
+            raise Http404
+        response = FileResponse(open(path, 'rb'), content_type=CONTENT_TYPES[fmt])
+        # نام فایل های آپلود تصادفی است، پس variant هیچ وقت عوض نمی‌شود
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # اول از همه: زمان کل درخواست، کوئری ها، serializer و render (TechShopApp/metrics.py)
+    'TechShopApp.metrics.RequestMetricsMiddleware',
+    # خواندن های GET از replica ها، بعد از نوشتن چند ثانیه از primary (TechShopApp/replicas.py)
+    'TechShopApp.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,6 +90,15 @@ DATABASES = {
     }
 }
 
+# replica های فقط خواندنی؛ نام هایشان در DATABASES، مثلا
+#   'replica1': {'ENGINE': 'django.db.backends.mysql', 'NAME': 'drf-shop', 'HOST': 'replica1.local', ...}
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['TechShopApp.replicas.ReplicaRouter']
+# بعد از نوشتن، خواندن های همان کاربر تا این مدت از primary
+REPLICA_STICKY_SECONDS = 5
+REPLICA_CHECK_INTERVAL = 10
+REPLICA_RETRY_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,4 +153,70 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # keyset pagination for every router list endpoint (see TechShopApp/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'TechShopApp.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
+    # plain application/json stays on JSONRenderer; orjson / msgpack only when asked for (see TechShopApp/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'TechShopApp.renderers.ORJSONRenderer',
+        'TechShopApp.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS': 'TechShopApp.renderers.AvailableRendererNegotiation',
 }
+
+# Caches
+# 'taxonomy' holds the cached taxonomy responses (see TechShopApp/cache.py). Entries never
+# expire; signals invalidate them. File based, so every worker on the host shares the entries
+# and sees the invalidations of the worker that handled the write (locmem would keep one copy
+# per worker). Workers on several hosts need a shared backend such as Redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'taxonomy': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'taxonomy',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+TAXONOMY_CACHE_ALIAS = 'taxonomy'
+
+# how long (seconds) the opt-in ?with_count=1 total is cached per filtered query
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+# list actions serialize values() rows through compiled plans (see TechShopApp/fast_serializers.py)
+FAST_LIST_SERIALIZERS = True
+
+# async read views (/store/async/...): requests per worker inside a view at once (see TechShopApp/async_views.py)
+ASYNC_READ_CONCURRENCY = 32
+
+# Background image processing (see TechShopApp/images.py)
+IMAGE_JOB_WORKERS = 2
+IMAGE_JOBS_ASYNC = True  # False: run resize jobs inline right after commit
+
+# Responsive image variants generated on first request (see TechShopApp/image_variants.py)
+IMAGE_VARIANTS = {
+    'widths': {
+        'product': [160, 320, 640, 800],   # Product.image, Gallery.image
+        'thumbnail': [64, 128, 300],       # Brand.logo, Category/BaseCategorys/Color images
+    },
+    'formats': ['avif', 'webp'],
+}
+
+# Write-behind view / sale counters (see TechShopApp/counters.py)
+COUNTER_FLUSH_INTERVAL = 5  # seconds; 0 disables the background flush thread
+COUNTER_JOURNAL_DIR = BASE_DIR / '.counters'
+
+# Stock reservations (see TechShopApp/inventory.py)
+RESERVATION_TTL = 15 * 60  # seconds before an unconfirmed reservation gives its stock back
+
+# Request metrics: Server-Timing header and Prometheus /metrics (see TechShopApp/metrics.py)
+METRICS_ENABLED = True
+SERVER_TIMING_HEADER = 'staff'  # DB time / query counts only for staff users (everyone while DEBUG)
+METRICS_MULTIPROCESS_DIR = None  # e.g. '/run/techshop-metrics' with several WSGI workers
+METRICS_FLUSH_INTERVAL = 5  # seconds between writes of a worker's metrics file
+# Prometheus sends "Authorization: Bearer <token>"; without a token only staff users can read /metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
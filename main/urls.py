@@ -16,8 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path,include
+from TechShopApp.metrics import metrics_view
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
     path('store/', include('TechShopApp.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]